@@ -0,0 +1,172 @@
+# Benchmarks of the alignment and evaluation kernels
+#
+# usage: python -m <package>.bench.run [--sizes 100,1000,10000] [--kernels diff_align,...]
+#                                      [--save bench.json] [--baseline bench.json]
+#
+# Every kernel is timed on synthetic lectures (see synthetic.py) of the
+# given sizes: the peak memory allocated during a first run (tracemalloc,
+# which numpy reports to), and the best of --repeat more runs. The setup
+# (generating the lecture, building the inputs) is not timed, and the
+# kernels run without the cache. For each kernel the scaling exponent is
+# fitted on the measured sizes (time ~ size ** exponent). The results can
+# be saved as a baseline, and compared against one: a kernel slower than
+# the baseline by more than --tolerance is flagged.
+#
+# The quadratic kernels skip the sizes above their limit.
+
+from .synthetic import SyntheticLecture, SyntheticOCR, SyntheticSpeech, SyntheticLabel
+from ..system.subsystems.Align.AlignBasic import AlignBasic
+from ..eval.code.ocr import OCREval
+from ..eval.code.align import AlignEval
+from ..eval.mywer import getEditDist
+import argparse, json, os, time, tracemalloc
+import numpy as np
+
+def aligner(lecture):
+    """Return an AlignBasic on the lecture (processed, without the cache)
+    and its true pivots."""
+    align = AlignBasic(SyntheticOCR(lecture), SyntheticSpeech(lecture))
+    align.cache = {}
+    align.ocr.process()
+    align.speech.process()
+    X, Y = align.ocr_words(), align.speech.result
+    return align, [(X[i], Y[j]) for i, j in lecture.pivots]
+
+
+def diff_align_kernel(**params):
+    """Return the kernel of AlignBasic.find_diff_align with the given params:
+    its scorer and its choice of diff engine (BitLCSDiff for the default
+    params, MyDiff otherwise), without the cache."""
+    def kernel(lecture):
+        align, pivots = aligner(lecture)
+        align.set_params(**params)
+        def run():
+            align.cache = {}
+            return align.find_diff_align()
+        return run
+    return kernel
+
+
+def compute_matches_kernel(lecture):
+    align, pivots = aligner(lecture)
+    return lambda: align.compute_matches(pivots)
+
+
+def get_edit_dist_kernel(lecture):
+    hyp, ref = [x.word for x in lecture.groups.words()], list(lecture.slide_words)
+    return lambda: getEditDist(hyp, ref)
+
+
+def evaluation_kernel(Eval):
+    def kernel(lecture):
+        align, pivots = aligner(lecture)
+        align.result = align.compute_matches(pivots)
+        label = SyntheticLabel(lecture)
+        def run():
+            evaluation = Eval(label, align)
+            evaluation.cache = {}
+            return evaluation.evaluate()
+        return run
+    return kernel
+
+
+KERNELS = dict( # name -> (setup returning the timed function, largest size)
+    diff_align=(diff_align_kernel(), 20000),
+    diff_align_gauss=(diff_align_kernel(gauss=2), 20000),
+    compute_matches=(compute_matches_kernel, 10**6),
+    getEditDist=(get_edit_dist_kernel, 20000),
+    ocreval=(evaluation_kernel(OCREval), 10**6),
+    aligneval=(evaluation_kernel(AlignEval), 10**6),
+)
+
+def measure(run, repeat=3):
+    """Return the peak memory of a first run (which also warms up) and the
+    best time of repeat more runs."""
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    best = float('inf')
+    for k in range(repeat):
+        begin = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - begin)
+    return best, peak
+
+
+def exponent(sizes, times):
+    """Return the slope of log(time) against log(size), None if undefined."""
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+
+def run_benchmarks(sizes, kernels, repeat=3, seed=0, noise=0.1, ocr_error=0.05):
+    """Return dict kernel -> dict size -> dict(time, peak)."""
+    results = {name: {} for name in kernels}
+    for n in sizes:
+        lecture = SyntheticLecture(n, seed=seed, noise=noise, ocr_error=ocr_error)
+        for name in kernels:
+            setup, limit = KERNELS[name]
+            if n > limit:
+                continue
+            best, peak = measure(setup(lecture), repeat)
+            results[name][str(n)] = dict(time=best, peak=peak)
+            print('%-16s n=%-8d %10.2f ms %10.1f MB' % (name, n, best * 1000, peak / 2**20), flush=True)
+    return results
+
+
+def report(results, baseline=None, tolerance=0.2):
+    """Print the scaling of each kernel and the comparison with the baseline.
+    Return the list of (kernel, size) slower than the baseline."""
+    slower = []
+    print('\n%-16s %10s %12s %10s %10s' % ('kernel', 'size', 'time (ms)', 'peak (MB)', 'vs base'))
+    for name, by_size in results.items():
+        sizes = sorted(by_size, key=int)
+        for n in sizes:
+            r = by_size[n]
+            base = (baseline or {}).get(name, {}).get(n)
+            ratio = '' if base is None else '%.2fx' % (r['time'] / base['time'])
+            if base is not None and r['time'] > base['time'] * (1 + tolerance):
+                ratio += ' SLOWER'
+                slower.append((name, int(n)))
+            print('%-16s %10s %12.2f %10.1f %10s' % (name, n, r['time'] * 1000, r['peak'] / 2**20, ratio))
+        slope = exponent([int(n) for n in sizes], [by_size[n]['time'] for n in sizes])
+        if slope is not None:
+            print('%-16s scaling: time ~ n^%.2f' % (name, slope))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the alignment and evaluation kernels.')
+    parser.add_argument('--sizes', default='100,1000,10000,100000,1000000', help='comma-separated numbers of words')
+    parser.add_argument('--kernels', default=','.join(KERNELS), help='comma-separated kernels (%s)' % ', '.join(KERNELS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--ocr-error', type=float, default=0.05)
+    parser.add_argument('--save', default=None, help='save the results (JSON) as a baseline')
+    parser.add_argument('--baseline', default=None, help='baseline to compare with (JSON)')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative slowdown flagged')
+    args = parser.parse_args(argv)
+    kernels = args.kernels.split(',')
+    for name in kernels:
+        if name not in KERNELS:
+            parser.error('unknown kernel %s' % name)
+    sizes = [int(n) for n in args.sizes.split(',')]
+    results = run_benchmarks(sizes, kernels, args.repeat, args.seed, args.noise, args.ocr_error)
+    baseline = None
+    if args.baseline is not None and os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+    slower = report(results, baseline, args.tolerance)
+    if args.save is not None:
+        params = dict(seed=args.seed, noise=args.noise, ocr_error=args.ocr_error, repeat=args.repeat)
+        with open(args.save, 'w') as f:
+            json.dump(dict(params=params, results=results), f, indent=1)
+    return 1 if slower else 0
+
+if __name__ == '__main__':
+    exit(main())
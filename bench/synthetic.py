@@ -0,0 +1,189 @@
+# Deterministic synthetic lectures for the benchmarks
+#
+# A lecture is a sequence of BBoxGroups (one BBox per group, a few groups per
+# page) and a transcript of WStamps which reads the groups in order:
+#
+#   - the words follow a Zipf distribution over a vocabulary of pseudo-words
+#     (the vocabulary grows with the size of the lecture), and every group
+#     repeats a few topic words of its own;
+#   - a spoken word is dropped with probability noise, and a filler word
+#     (from the most frequent ones) is inserted with probability noise;
+#   - an OCR word gets a character error (l -> 1, o -> 0, m -> rn, or a
+#     random letter) with probability ocr_error;
+#   - the words are about 1 / words_per_sec seconds apart (jittered), with a
+#     pause between groups.
+#
+# The truth is known: the reference Matches (each group matched to the time
+# from its first spoken word to the first spoken word of the next group) and
+# the pivots (the spoken words read from the slides, as indices into the OCR
+# words and the WStamps). Everything is drawn from numpy.random.default_rng
+# (seed), so a lecture is the same for the same arguments.
+
+from ..system.elements.BBox import BBox, BBoxGroup, BBoxGroups
+from ..system.elements.Coords import Coords
+from ..system.elements.WStamp import WStamp, WStamps
+from ..system.elements.TStamp import TStamp
+from ..system.elements.TInterval import TInterval, TIntervalGroup
+from ..system.elements.Match import Match, Matches
+from ..system.subsystems.OCR.OCR import OCR
+from ..system.subsystems.Speech.Speech import Speech
+from ..system.aux.reflabel import RefLabel
+import numpy as np
+
+SYLLABLES = [c + v for c in 'bdfgklmnprstvz' for v in 'aeiou']
+PAGE = (1654, 2339) # A4 at 200 dpi
+
+def pseudo_word(k):
+    """Return the k-th pseudo-word (distinct for distinct k)."""
+    word = ''
+    k += len(SYLLABLES) # at least two syllables
+    while k:
+        k, r = divmod(k, len(SYLLABLES))
+        word += SYLLABLES[r]
+    return word
+
+
+def misread(word, rng):
+    """Return word with one OCR error."""
+    for a, b in (('l', '1'), ('o', '0'), ('m', 'rn')):
+        if a in word and rng.random() < 0.5:
+            return word.replace(a, b, 1)
+    k = int(rng.integers(len(word)))
+    return word[:k] + chr(ord('a') + int(rng.integers(26))) + word[k + 1:]
+
+
+class SyntheticLecture:
+    """A synthetic lecture of about n_words OCR words.
+    args:
+        n_words - number of OCR words
+        seed - seed of the random generator
+        noise - probability of dropping a spoken word, and of inserting a filler word
+        ocr_error - probability of an OCR error in a word
+        group_size - (min, max) number of words of a group
+        groups_per_page - number of groups on a page
+        words_per_sec - speaking rate
+    attributes:
+        groups - BBoxGroups of the slides (with the OCR errors)
+        wstamps - WStamps of the transcript
+        audio_len - length of the audio in seconds
+        pages - dict page -> (width, height)
+        label - reference Matches
+        pivots - list of (i, j): the j-th WStamp reads the i-th OCR word
+        slide_words, spoken_words - the words without OCR errors, and the transcript
+    """
+    def __init__(self, n_words, seed=0, noise=0.1, ocr_error=0.05, group_size=(10, 40), groups_per_page=6, words_per_sec=2.5):
+        self.name = 'synthetic(n=%d,seed=%d,noise=%s,ocr_error=%s)' % (n_words, seed, noise, ocr_error)
+        rng = np.random.default_rng(seed)
+        # Zipf vocabulary
+        V = max(500, n_words // 10)
+        vocab = [pseudo_word(k) for k in range(V)]
+        p = 1.0 / np.arange(1, V + 1) ** 1.1
+        p /= p.sum()
+        # group sizes
+        sizes = []
+        while sum(sizes) < n_words:
+            sizes.append(int(rng.integers(group_size[0], group_size[1] + 1)))
+        sizes[-1] -= sum(sizes) - n_words
+        if sizes[-1] <= 0:
+            sizes.pop()
+        # words: Zipf draws, with a third of each group from its topic words
+        ids = rng.choice(V, size=n_words, p=p)
+        topic = rng.random(n_words) < 1 / 3
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        gid = np.repeat(np.arange(len(sizes)), sizes)
+        topics = rng.integers(V // 10, V, size=(len(sizes), 3)) # mid/low frequency words
+        ids[topic] = topics[gid[topic], rng.integers(0, 3, size=int(topic.sum()))]
+        self.slide_words = [vocab[k] for k in ids.tolist()]
+        ocr_words = list(self.slide_words)
+        for i in np.flatnonzero(rng.random(n_words) < ocr_error).tolist():
+            ocr_words[i] = misread(ocr_words[i], rng)
+        # slides
+        width, height = PAGE
+        slot = height // (groups_per_page + 1)
+        self.groups = BBoxGroups()
+        for g, (start, size) in enumerate(zip(starts.tolist(), sizes)):
+            page, row = g // groups_per_page + 1, g % groups_per_page
+            x0 = int(rng.integers(80, 300))
+            y0 = slot // 2 + row * slot
+            coords = Coords(x0, y0, int(min(width - 80, x0 + 40 * min(size, 30))), y0 + int(slot * 0.8))
+            self.groups.append(BBoxGroup([BBox(coords, ' '.join(ocr_words[start:start + size]), page)]))
+        self.pages = {page: PAGE for page in range(1, (len(sizes) - 1) // groups_per_page + 2)}
+        # transcript
+        fillers = vocab[:20]
+        spoken, source = [], [] # source: index of the slide word, -1 for a filler
+        keep = rng.random(n_words) >= noise
+        insert = rng.random(n_words) < noise
+        filler_ids = rng.integers(0, len(fillers), size=n_words)
+        for i in range(n_words):
+            if insert[i]:
+                spoken.append(fillers[filler_ids[i]])
+                source.append(-1)
+            if keep[i]:
+                spoken.append(self.slide_words[i])
+                source.append(i)
+        source = np.array(source, dtype=np.int64)
+        gaps = (0.5 + rng.random(len(spoken))) / words_per_sec
+        new_group = np.zeros(len(spoken), dtype=bool)
+        spoken_gid = np.where(source >= 0, gid[np.maximum(source, 0)], -1)
+        last = np.maximum.accumulate(np.where(spoken_gid >= 0, spoken_gid, -1))
+        new_group[1:] = last[1:] != last[:-1]
+        gaps[new_group] += 1 + 2 * rng.random(int(new_group.sum())) # pause between groups
+        times = np.cumsum(gaps)
+        self.spoken_words = spoken
+        self.wstamps = WStamps([WStamp(w, TStamp(t)) for w, t in zip(spoken, times.tolist())])
+        self.audio_len = float(times[-1] + 2.0) if len(times) else 2.0
+        self.pivots = [(int(i), j) for j, i in enumerate(source.tolist()) if i >= 0]
+        # truth: each group from its first spoken word to the next group's
+        first = np.full(len(sizes) + 1, np.inf)
+        np.minimum.at(first, spoken_gid[spoken_gid >= 0], times[spoken_gid >= 0])
+        first[-1] = self.audio_len
+        for g in range(len(sizes) - 1, -1, -1): # unspoken groups: empty, at the next start
+            first[g] = min(first[g], first[g + 1])
+        self.label = Matches()
+        for g, bg in enumerate(self.groups):
+            interval = TInterval(TStamp(float(first[g])), TStamp(float(first[g + 1])))
+            self.label.append(Match(bg, TIntervalGroup([interval], from_obj=False)))
+
+    def __len__(self):
+        return len(self.slide_words)
+
+
+class SyntheticOCR(OCR):
+    """OCR returning the slides of a SyntheticLecture."""
+    def __init__(self, lecture):
+        super().__init__()
+        self.lecture = lecture
+        self.cache_key = 'SyntheticOCR(%s)' % lecture.name
+        self.pages = lecture.pages
+
+    def process(self):
+        self.result = self.lecture.groups
+        return self.result
+
+
+class SyntheticSpeech(Speech):
+    """Speech Recogniser returning the transcript of a SyntheticLecture."""
+    def __init__(self, lecture):
+        super().__init__()
+        self.lecture = lecture
+        self.cache_key = 'SyntheticSpeech(%s)' % lecture.name
+        self.audio_len = lecture.audio_len
+
+    def process(self):
+        self.result = self.lecture.wstamps
+        return self.result
+
+
+class SyntheticLabel(RefLabel):
+    """RefLabel holding the reference Matches of a SyntheticLecture."""
+    def __init__(self, lecture):
+        self.filename = lecture.name
+        self.lecture = lecture
+        self.reopen()
+
+    def update_cache_key(self):
+        self.cache_key = 'SyntheticLabel(%s)' % self.lecture.name
+
+    def reopen(self):
+        self.filebuf = self.lecture.label
+        self.update_cache_key()
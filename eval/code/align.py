@@ -4,17 +4,24 @@ from ...system.elements.Match import Matches
 from ...system.elements.TInterval import TInterval, TIntervalGroup
 from ...system.subsystems.Align.Align import Align
 from ...system.aux.reflabel import RefLabel
+from ...system.aux.boxindex import BoxIndex
+from ...system.aux import trace
 from ...system.cache.Cache import global_cache
 
 class AlignEval:
-    """Alignment Algorithm Evaluation."""
-    def __init__(self, label, align):
+    """Alignment Algorithm Evaluation.
+    args:
+        diagnostics - if True, find_matching_segments records in
+            self.diagnostics one dict(ref, hyp, area) per ref group
+    """
+    def __init__(self, label, align, diagnostics=False):
         self.label = label
         self.align = align
         self._type_check()
         self.result = None
         self.hyp_matched_segs = None
-        self.cache = global_cache
+        self.diagnostics = [] if diagnostics else None
+        self.cache = trace.TracedCache(global_cache)
         self.update_cache_key()
         self.update_inputs()
     
@@ -25,6 +32,7 @@ class AlignEval:
         self.ref = self.label.filebuf
         self.hyp = self.align.result
     
+    @trace.traced()
     def evaluate(self):
         self.update_cache_key()
         self.update_inputs()
@@ -42,22 +50,24 @@ class AlignEval:
     def segs_from_obj(self, obj):
         return [TIntervalGroup(x, from_obj=True) for x in obj]
     
+    @trace.traced()
     def find_matching_segments(self):
-        """Find ref segments for each hyp chunks."""
+        """Find ref segments for each hyp chunks: each ref group goes to the
+        hyp group of largest overlap (the first one on ties), among the hyp
+        groups before the first one starting after its last page."""
         hyp_matched_segs = [TIntervalGroup() for i in range(len(self.hyp))]
+        index = BoxIndex(self.hyp.get_bbox_groups())
+        if self.diagnostics is not None:
+            del self.diagnostics[:]
         for gid_ref, match_ref in enumerate(self.ref):
             bg_ref = match_ref.bbox_group
-            max_gid, max_area = -1, 0
-            for gid_hyp, bg_hyp in enumerate(self.hyp.get_bbox_groups()):
-                rx, ry = bg_ref.page_range(), bg_hyp.page_range()
-                if ry[0] > rx[1]:
-                    break
-                area = (bg_ref & bg_hyp)
-                if area > max_area:
-                    max_gid, max_area = gid_hyp, area
+            areas = index.group_areas(bg_ref)[:index.count_before(bg_ref.page_range()[1])]
+            max_gid = int(areas.argmax()) if len(areas) and areas.max() > 0 else -1
             if max_gid != -1:
                 hyp_matched_segs[max_gid].extend(match_ref.tinterval_group.copy())
-            print('%d -> %d' % (gid_ref, max_gid))
+            if self.diagnostics is not None:
+                area = float(areas[max_gid]) if max_gid != -1 else 0.0
+                self.diagnostics.append(dict(ref=gid_ref, hyp=max_gid, area=area))
         for seg in hyp_matched_segs:
             seg.reduce()
         return hyp_matched_segs
@@ -2,39 +2,61 @@
 
 from ...system.elements.BBox import BBoxGroups
 from ...system.subsystems.Align.Align import Align
-from ...system.aux.mydiff import MyDiff
+from ...system.aux.scorer import intern
+from ...system.aux import editdist, trace
+from ...system.aux.pagemask import PageMasks, default_pages
 from ...system.aux.reflabel import RefLabel
 from ...system.cache.Cache import global_cache
 
 class OCREval:
-    """OCR Evaluation."""
-    def __init__(self, label, align):
+    """OCR Evaluation.
+    args:
+        step - downsampling factor of the page masks (1 for exact areas)
+    """
+    def __init__(self, label, align, step=1):
         self.label = label
         self.align = align
+        self.step = step
         self._type_check()
         self.result = None
-        self.cache = global_cache
+        self._ref = self._hyp = None
+        self.cache = trace.TracedCache(global_cache)
         self.update_cache_key()
-        self.update_inputs()
     
     def update_cache_key(self):
-        self.cache_key = 'OCREval(label=%s,align=%s)' % (self.label.cache_key, self.align.cache_key)
+        self.cache_key = 'OCREval(label=%s,align=%s,step=%d)' % (self.label.cache_key, self.align.cache_key, self.step)
     
     def update_inputs(self):
-        self.ref = self.label.filebuf.get_bbox_groups()
-        self.hyp = self.align.result.get_bbox_groups()
+        self._ref = self.label.filebuf.get_bbox_groups()
+        self._hyp = self.align.result.get_bbox_groups()
+
+    @property
+    def ref(self):
+        """The BBoxGroups of the label, built on first use."""
+        if self._ref is None:
+            self.update_inputs()
+        return self._ref
+
+    @property
+    def hyp(self):
+        """The BBoxGroups of the alignment result, built on first use."""
+        if self._hyp is None:
+            self.update_inputs()
+        return self._hyp
     
+    @trace.traced()
     def evaluate(self):
         self.update_cache_key()
-        self.update_inputs()
         if self.cache_key in self.cache:
             self.result = self.cache[self.cache_key]
         else:
-            TPR, TNR = self.compute_TPR_and_TNR()
+            self.update_inputs() # only build the bbox groups when needed
+            TPR, TNR, pages = self.compute_TPR_and_TNR()
             self.result = dict(
                 TPR=TPR,
                 TNR=TNR,
-                WER=self.compute_text_WER()
+                WER=self.compute_text_WER(),
+                pages=pages
             )
             self.cache[self.cache_key] = self.result
         return self.result
@@ -45,36 +67,39 @@ class OCREval:
         area_recall = (self.ref & self.hyp)
         return area_recall / area_total
     
+    @trace.traced()
     def compute_TPR_and_TNR(self):
-        """Calculate TPR and TNR."""
-        TP = (self.ref & self.hyp)
-        FP = self.hyp.area() - TP
-        FN = self.ref.area() - TP
-        TN = 1654*2339*6 - TP - FP - FN
-        TPR = TP / (TP + FN)
-        TNR = TN / (TN + FP)
-        return TPR, TNR
+        """Calculate TPR and TNR from the page masks of the ref and hyp boxes
+        (the union of the boxes, on the pages of the OCR obj).
+        returns:
+            TPR, TNR - rates over all pages
+            pages - per page breakdown, list of dict(page, TP, FP, FN, TN, TPR, TNR)
+        """
+        sizes = self.align.ocr.pages or default_pages(self.ref, self.hyp)
+        counts = PageMasks(sizes, step=self.step).confusion(self.ref, self.hyp)
+        pages = []
+        for page, c in counts.items():
+            pages.append(dict(page=page, **c, TPR=rate(c['TP'], c['FN']), TNR=rate(c['TN'], c['FP'])))
+        TP, FP, FN, TN = (sum(c[k] for c in counts.values()) for k in ('TP', 'FP', 'FN', 'TN'))
+        return TP / (TP + FN), TN / (TN + FP), pages
     
+    @trace.traced()
     def compute_text_WER(self, wI=4, wD=4, wS=6):
         """Calculate WER of the OCR text output."""
-        def jwf(x, y):
-            assert not (x is None and y is None)
-            if x is None:
-                return -wI
-            if y is None:
-                return -wD
-            return 0 if x == y else -wS
         X, Y = self.ref.words(), self.hyp.words()
-        diff = MyDiff(X, Y, jwf)
-        diff_align = diff.solve()
+        (ref_ids, hyp_ids), _ = intern(X, Y, key=lambda w: w.word)
+        ops = editdist.align(ref_ids, hyp_ids, wI=wI, wD=wD, wS=wS)
         # calculate (I, D, S)
-        numI = sum(map(lambda x: x[0] is None, diff_align))
-        numD = sum(map(lambda x: x[1] is None, diff_align))
-        numS = sum(map(lambda x: bool(x[0] and x[1] and x[0] != x[1]), diff_align))
+        numI, numD, numS = ops.I, ops.D, ops.S
         numIDS = numI + numD + numS
         numTotal = len(X)
         return dict(all=numIDS/numTotal, I=numI/numTotal, D=numD/numTotal, S=numS/numTotal)
     
     def _type_check(self):
         assert isinstance(self.label, RefLabel)
-        assert isinstance(self.align, Align)
\ No newline at end of file
+        assert isinstance(self.align, Align)
+
+
+def rate(a, b):
+    """Return a / (a + b), None if a + b is 0."""
+    return a / (a + b) if a + b else None
@@ -0,0 +1,213 @@
+# Parameter sweep of AlignBasic
+#
+# usage: python -m <package>.eval.code.sweep lecture [lecture ...] [--gauss none,1,2]
+#                                            [--common none,0.5] [--samples 10] [--workers 4]
+#                                            [--output sweep.tsv]
+#
+# Evaluates every configuration of a search space (the whole grid, or a
+# random sample of it) on a set of lectures, with OCREval and AlignEval.
+#
+# The work which does not depend on the alignment params is done once:
+#   - the speech result and the label of each lecture, and the OCR result of
+#     each (lecture, lang, scale) variant, in the main process before the
+#     workers are forked (the workers inherit them copy-on-write);
+#   - in a worker, one AlignBasic per variant is reused for all its
+#     configurations, so the OCR words and their interned ids (see
+#     AlignBasic.ocr_words) are built once, and the OCR metrics, which only
+#     depend on the variant, are computed once.
+# The tasks are ordered by variant so that the chunks of a worker mostly
+# share one. The workers keep their results in private caches (the global
+# cache is only written by the main process).
+
+from ...system.subsystems import registry
+from ...system.aux.reflabel import RefLabel
+from .ocr import OCREval
+from .align import AlignEval
+import argparse, itertools, multiprocessing, random, time
+
+OCR_PARAMS = dict(scale='par', lang='eng') # with their default values
+ALIGN_PARAMS = dict(gauss=None, common=None, fuzzy=None) # not key, which AlignBasic.set_jwf disables
+DEFAULT_SPACE = dict(gauss=[None, 1, 2, 4], common=[None, 0.5]) # when no param is given
+COLUMNS = ['lecture', *OCR_PARAMS, *ALIGN_PARAMS, 'TPR', 'TNR', 'WER', 'recall', 'align_time', 'eval_time']
+
+class Sweep:
+    """Evaluation of AlignBasic over a space of params and lectures.
+    args:
+        lectures - lecture filenames (data/<name>.pdf, audio/<name>.mp3 and labels/<name>.json)
+        space - dict from param (of OCR_PARAMS or ALIGN_PARAMS) to the list of its values
+        samples - number of random configurations, None for the whole grid
+        workers - number of processes, None for serial
+        seed - seed of the random search
+        mode - see AlignBasic
+    """
+    def __init__(self, lectures, space, samples=None, workers=None, seed=0, mode='full'):
+        for param in space:
+            if param not in OCR_PARAMS and param not in ALIGN_PARAMS:
+                raise ValueError('unknown param %s' % param)
+        self.lectures = list(lectures)
+        self.space = dict(space)
+        self.samples = samples
+        self.workers = workers
+        self.seed = seed
+        self.mode = mode
+        self.data = {} # (lecture, lang, scale) -> (ocr, speech, label)
+        self.aligners = {} # (lecture, lang, scale) -> AlignBasic
+        self.ocr_results = {} # (lecture, lang, scale) -> result of OCREval
+        self.timings = {} # time of the shared preparation steps
+        self.result = None
+
+    def configs(self):
+        """Return the configurations to evaluate, a list of dicts of all params."""
+        names = list(self.space)
+        grid = [dict(zip(names, values)) for values in itertools.product(*(self.space[k] for k in names))]
+        if self.samples is not None and self.samples < len(grid):
+            grid = random.Random(self.seed).sample(grid, self.samples)
+        return [{**OCR_PARAMS, **ALIGN_PARAMS, **config} for config in grid]
+
+    def prepare(self, configs):
+        """Process the OCR and speech of every variant used by the configs."""
+        begin = time.time()
+        speeches, labels = {}, {}
+        for lecture in self.lectures:
+            speeches[lecture] = registry.create('speech', None, lecture)
+            speeches[lecture].process()
+            labels[lecture] = RefLabel(lecture)
+        self.timings['speech'] = time.time() - begin
+        begin = time.time()
+        for lecture in self.lectures:
+            for lang, scale in sorted(set((c['lang'], c['scale']) for c in configs)):
+                if (lecture, lang, scale) not in self.data:
+                    ocr = registry.create('ocr', None, lecture, scale=scale, lang=lang)
+                    ocr.process()
+                    self.data[lecture, lang, scale] = (ocr, speeches[lecture], labels[lecture])
+        self.timings['ocr'] = time.time() - begin
+
+    def run(self):
+        """Evaluate all configurations on all lectures.
+        returns:
+            result - list of dicts, one per (lecture, configuration), see COLUMNS
+        """
+        configs = self.configs()
+        self.prepare(configs)
+        tasks = [((lecture, c['lang'], c['scale']), c) for lecture in self.lectures for c in configs]
+        tasks.sort(key=lambda task: task[0])
+        begin = time.time()
+        if self.workers is not None and self.workers > 1:
+            self.result = self.run_parallel(tasks)
+        else:
+            self.result = [self.evaluate(variant, config) for variant, config in tasks]
+        self.timings['eval'] = time.time() - begin
+        return self.result
+
+    def run_parallel(self, tasks):
+        global _shared
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError: # fork is not available, run serially
+            return [self.evaluate(variant, config) for variant, config in tasks]
+        _shared = self # inherited by the forked workers (copy-on-write)
+        try:
+            with context.Pool(self.workers) as pool:
+                chunksize = max(1, len(tasks) // (4 * self.workers))
+                return pool.map(_sweep_task, tasks, chunksize=chunksize)
+        finally:
+            _shared = None
+
+    def evaluate(self, variant, config, cache=None):
+        """Align and evaluate one configuration on a prepared variant.
+        args:
+            variant - (lecture, lang, scale)
+            config - dict of all params
+            cache - cache of the results, None for the global one
+        returns:
+            row - dict, see COLUMNS
+        """
+        ocr, speech, label = self.data[variant]
+        align = self.aligners.get(variant)
+        if align is None:
+            align = self.aligners[variant] = registry.create('align', 'basic', ocr, speech, mode=self.mode)
+        if cache is not None:
+            align.cache = cache
+        begin = time.time()
+        align.set_params(**{k: config[k] for k in ALIGN_PARAMS})
+        # the OCR and speech results are ready, skip align.process
+        align.result = align.compute_matches(align.find_pivots())
+        align_time = time.time() - begin
+        begin = time.time()
+        if variant not in self.ocr_results:
+            ocr_eval = OCREval(label, align)
+            if cache is not None:
+                ocr_eval.cache = cache
+            self.ocr_results[variant] = ocr_eval.evaluate()
+        align_eval = AlignEval(label, align)
+        if cache is not None:
+            align_eval.cache = cache
+        recall = align_eval.evaluate()['recall']
+        eval_time = time.time() - begin
+        res = self.ocr_results[variant]
+        return dict(lecture=variant[0], **config, TPR=res['TPR'], TNR=res['TNR'], WER=res['WER']['all'],
+            recall=recall, align_time=align_time, eval_time=eval_time)
+
+    def write(self, path):
+        """Write the result as a tab-separated table."""
+        with open(path, 'w') as f:
+            f.write('\t'.join(COLUMNS) + '\n')
+            for row in self.result:
+                f.write('\t'.join(str(row[k]) for k in COLUMNS) + '\n')
+
+
+# Worker task of Sweep.run_parallel. The Sweep instance (with the prepared
+# variants) is set before the pool is forked; each worker keeps its own
+# aligners and caches.
+_shared = None
+_cache = None
+
+def _sweep_task(task):
+    global _cache
+    if _cache is None:
+        _cache = {}
+    variant, config = task
+    return _shared.evaluate(variant, config, cache=_cache)
+
+
+def parse_values(text):
+    """Parse a comma-separated list of param values ('none', numbers or str)."""
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        if item.lower() == 'none':
+            values.append(None)
+            continue
+        for parse in (int, float, str):
+            try:
+                values.append(parse(item))
+                break
+            except ValueError:
+                pass
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate AlignBasic over a space of params.')
+    parser.add_argument('lectures', nargs='+', help='lecture names (with data/, audio/ and labels/ files)')
+    for param in (*OCR_PARAMS, *ALIGN_PARAMS):
+        parser.add_argument('--' + param, type=parse_values, default=None, metavar='VALUES',
+            help='comma-separated values of %s (none for None)' % param)
+    parser.add_argument('--samples', type=int, default=None, help='number of random configurations (default: the whole grid)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random search')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: serial)')
+    parser.add_argument('--mode', default='full', help='alignment mode (see AlignBasic.MODES)')
+    parser.add_argument('--output', default='sweep.tsv', help='result table (TSV)')
+    args = parser.parse_args(argv)
+    if args.mode not in registry.get('align', 'basic').MODES:
+        parser.error('unknown mode %s' % args.mode)
+    space = {param: getattr(args, param) for param in (*OCR_PARAMS, *ALIGN_PARAMS) if getattr(args, param) is not None}
+    sweep = Sweep(args.lectures, space or DEFAULT_SPACE, samples=args.samples, workers=args.workers,
+        seed=args.seed, mode=args.mode)
+    sweep.run()
+    sweep.write(args.output)
+    print('%d rows written to %s (%s)' % (len(sweep.result), args.output,
+        ', '.join('%s %.1fs' % item for item in sweep.timings.items())))
+
+if __name__ == '__main__':
+    main()
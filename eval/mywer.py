@@ -4,8 +4,9 @@
 # which includes percentage information of insertions (I), deletions (D)
 # and substitutions (S)
 
-import re
+import re, multiprocessing
 from collections import namedtuple
+import numpy as np
 
 # Definition of my own WER object
 # MyWER = namedtuple('MyWER', 'WER, IR, DR, SR')
@@ -58,37 +59,91 @@ def str2list(s):
 
 def getEditDist(hyp, ref):
     """Calculate (I, D, S) based on hypothesis and reference.
-    Here hyp and ref are both lists."""
+    Here hyp and ref are both lists.
+    The DP runs line by line over hyp with the (I, D, S) of a line kept in
+    three integer arrays. Within a line, dp[j] = min(ansI, ansD, ansS) is
+    decided on the sums (ties: I, then D, then S), and the chain of ansD
+    (dp[j] = dp[j - 1] + D) is resolved with a running minimum. As before,
+    the ansS of j = 0 starts from the dp[-1] of two lines above."""
     if not (isinstance(hyp, list) and isinstance(ref, list)):
         raise TypeError('both arguments must be lists')
-    # define some consts
-    oneI, oneD, oneS = EditDist(I=1), EditDist(D=1), EditDist(S=1)
+    if len(ref) == 0: # every hyp word is inserted
+        return EditDist(I=len(hyp))
+    tokens = {}
+    hyp_ids = np.array([tokens.setdefault(w, len(tokens)) for w in hyp], dtype=np.int64)
+    ref_ids = np.array([tokens.setdefault(w, len(tokens)) for w in ref], dtype=np.int64)
+    M = len(ref)
+    cols = np.arange(M + 1) # column 0 is j = -1, i.e. (i+1)*oneI
     # DP init
-    dp = [EditDist(D=i+1) for i in range(len(ref))]
+    dpI, dpD, dpS = np.zeros(M, dtype=np.int64), np.arange(1, M + 1, dtype=np.int64), np.zeros(M, dtype=np.int64)
+    prevI = prevD = prevS = 0 # buffer for dp[i - 1, -1] (see above), initially 0
     # DP main loop
-    # use hyp[i] and ref[j] to index elements
-    prevdp = EditDist() # buffer for dp[i - 1, j - 1], initially 0
     for i in range(len(hyp)):
-        for j in range(len(ref)):
-            # I: dp[i, j] = dp[i - 1, j] + (1, 0, 0)
-            ansI = dp[j] + oneI
-            # D: dp[i, j] = dp[i, j - 1] + (0, 1, 0)
-            ansD = (dp[j - 1] if j > 0 else (i+1)*oneI) + oneD
-            # S: dp[i, j] = dp[i - 1, j - 1] + (0, 0, hyp[i] != ref[j])
-            ansS = prevdp + oneS*(hyp[i] != ref[j])
-            # prepare dp[i - 1, j - 1] for next iteration
-            prevdp = dp[j]
-            # calculate dp[i, j]
-            dp[j] = min(ansI, ansD, ansS)
-    return dp[-1]
+        # I: dp[i, j] = dp[i - 1, j] + (1, 0, 0)
+        sumI = dpI + dpD + dpS + 1
+        # S: dp[i, j] = dp[i - 1, j - 1] + (0, 0, hyp[i] != ref[j])
+        diagI = np.concatenate(([prevI], dpI[:-1]))
+        diagD = np.concatenate(([prevD], dpD[:-1]))
+        diagS = np.concatenate(([prevS], dpS[:-1])) + (ref_ids != hyp_ids[i])
+        sumS = diagI + diagD + diagS
+        # sums of dp[i, j]: min(sumI, sumS, sum of dp[i, j - 1] + 1)
+        best = np.concatenate(([i + 1], np.minimum(sumI, sumS)))
+        best = cols + np.minimum.accumulate(best - cols)
+        # D: dp[i, j] = dp[i, j - 1] + (0, 1, 0)
+        sumD = best[:-1] + 1
+        takeD = sumD < sumI
+        takeS = sumS < np.where(takeD, sumD, sumI)
+        isD = takeD & ~takeS
+        # the D steps extend the last I or S (or the j = -1 column) to their left
+        baseI = np.concatenate(([i + 1], np.where(takeS, diagI, dpI + 1)))
+        baseD = np.concatenate(([0], np.where(takeS, diagD, dpD)))
+        baseS = np.concatenate(([0], np.where(takeS, diagS, dpS)))
+        src = np.maximum.accumulate(np.where(np.concatenate(([False], isD)), -1, cols))
+        if M:
+            prevI, prevD, prevS = dpI[-1], dpD[-1], dpS[-1]
+        dpI, dpD, dpS = baseI[src][1:], (baseD[src] + cols - src)[1:], baseS[src][1:]
+    return EditDist(int(dpI[-1]), int(dpD[-1]), int(dpS[-1]))
+
+def toWER(res, N):
+    """Return the MyWER of an EditDist against a reference of N words.
+    With an empty reference the rates are 0 if there is no edit (nothing to
+    recognise), and inf otherwise (only insertions)."""
+    if N == 0:
+        rate = lambda n: 0.0 if n == 0 else float('inf')
+        return MyWER(rate(res.getSum()), rate(res.I), rate(res.D), rate(res.S))
+    return MyWER((res.I+res.D+res.S)/N, res.I/N, res.D/N, res.S/N)
 
 def getWER(hyp, ref):
     """Here hyp & ref are strings"""
     hyp, ref = str2list(hyp), str2list(ref)
-    res = getEditDist(hyp, ref)
-    I, D, S = res.I, res.D, res.S
-    N = len(ref)
-    return MyWER((I+D+S)/N, I/N, D/N, S/N)
+    return toWER(getEditDist(hyp, ref), len(ref))
+
+def _countPair(pair):
+    hyp, ref = str2list(pair[0]), str2list(pair[1])
+    return getEditDist(hyp, ref), len(ref)
+
+def getCorpusWER(pairs, workers=None):
+    """Score many (hyp, ref) string pairs.
+    args:
+        pairs - list of (hyp, ref) pairs of strings
+        workers - number of processes, None for serial
+    returns:
+        wers - list of MyWER, one per pair
+        total - MyWER of the corpus (I, D, S and N pooled over the pairs)
+    Empty references are scored as in toWER, so an empty list of pairs
+    gives ([], MyWER(0, 0, 0, 0)).
+    """
+    if workers is not None and workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            counts = pool.map(_countPair, pairs, chunksize=max(1, len(pairs) // (4 * workers)))
+    else:
+        counts = list(map(_countPair, pairs))
+    wers = []
+    total, numTotal = EditDist(), 0
+    for res, N in counts:
+        wers.append(toWER(res, N))
+        total, numTotal = total + res, numTotal + N
+    return wers, toWER(total, numTotal)
     
 if __name__ == '__main__':
     s1 = 'what are you doing now'
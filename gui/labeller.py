@@ -8,6 +8,7 @@ from ..system.elements.Match import Match, Matches
 from ..system.elements.BBox import BBoxGroup, BBoxGUI, BBox
 from ..system.elements.TInterval import TIntervalGroup, TInterval
 from ..system.elements.TStamp import TStamp
+from ..system.aux import binstore
 from uuid import uuid4
 import json, os
 
@@ -18,6 +19,7 @@ class Labeller(Component):
         # Current Active File
         self.filepath = ''
         self.filebuf = Matches()
+        self.filebinary = False
         # Managers
         self.fileManager = FileManager(self)
         self.groupManager = GroupManager(self)
@@ -112,9 +114,9 @@ class Labeller(Component):
             json.dump(Matches().to_obj(), f)
         finally:
             f.close()
-        with open(path, 'r') as fin:
-            self.filebuf = Matches(json.load(fin), from_obj=True)
-            # self.cleanFileBuf()
+        self.filebinary = binstore.is_binary_file(path) # kept when saving
+        self.filebuf = Matches(binstore.read_obj(path), from_obj=True)
+        # self.cleanFileBuf()
         self.filepath = path
         self.setState(
             modified=False,
@@ -128,8 +130,11 @@ class Labeller(Component):
     
     def fileSave(self):
         # self.cleanFileBuf()
-        with open(self.filepath, 'w') as fout:
-            json.dump(self.filebuf.to_obj(), fout, indent=4)
+        if self.filebinary: # keep the format of the opened file
+            binstore.dump(self.filebuf, self.filepath)
+        else:
+            with open(self.filepath, 'w') as fout:
+                json.dump(self.filebuf.to_obj(), fout, indent=4)
         self.setState(modified=False)
     
     def fileClear(self):
@@ -4,12 +4,14 @@ from tkinter import filedialog
 
 from .component import Component
 from .audiovisualiser import AudioCanvas, AudioVisualiser
-from ..system.subsystems.OCR.OCRTess import OCRTess, OCR
-from ..system.subsystems.Speech.SpeechGC import SpeechGC, Speech
-from ..system.subsystems.Align.AlignBasic import AlignBasic, Align
+from ..system.subsystems.OCR.OCR import OCR
+from ..system.subsystems.Speech.Speech import Speech
+from ..system.subsystems.Align.Align import Align
+from ..system.subsystems import registry
 from ..system.elements.BBox import *
 from ..system.elements.Match import Match, Matches
 from ..system.aux.reflabel import RefLabel
+from ..system.aux import binstore
 from ..eval.code.ocr import OCREval
 from ..eval.code.align import AlignEval
 
@@ -38,6 +40,7 @@ class System(Component):
         self.audioVisualiser.grid(row=2, column=0)
         self.evalPanel.grid(row=3, column=0, sticky=EW)
         # Subsystems
+        self.backends = dict(ocr=None, speech=None, align=None) # names of the backends (see registry)
         self.ocr = OCR()
         self.speech = Speech()
         self.align = Align(self.ocr, self.speech)
@@ -78,10 +81,10 @@ class System(Component):
             self.audioVisualiser.sendSegments(segs, 2)
     
     def runSystem(self):
-        if isinstance(self.ocr, OCRTess):
+        if self.backends['ocr'] == 'tess':
             self.ocr.set_scale(self.config['scale'])
             self.ocr.set_lang(self.config['lang'])
-        if isinstance(self.align, AlignBasic):
+        if self.backends['align'] in ('basic', 'online'): # the backends with the AlignBasic params
             self.align.set_params(
                 gauss=self.config['gauss'],
                 common=self.config['common'],
@@ -100,9 +103,7 @@ class System(Component):
     
     def readLabelData(self, filename):
         path = os.path.normpath(os.path.join(os.path.dirname(__file__), '../labels/%s.json' % filename))
-        with open(path, 'r') as fin:
-            label = json.load(fin)
-        return Matches(label, from_obj=True)
+        return Matches(binstore.read_obj(path), from_obj=True)
     
     def pleaseUpdateRects(self):
         """Notify the Canvas that new rects are available for request"""
@@ -114,9 +115,10 @@ class System(Component):
         if self.filename == filename:
             return None
         self.filename = filename
-        self.ocr = OCRTess(filename)
-        self.speech = SpeechGC(filename)
-        self.align = AlignBasic(self.ocr, self.speech)
+        self.backends = dict(registry.DEFAULTS)
+        self.ocr = registry.create('ocr', self.backends['ocr'], filename)
+        self.speech = registry.create('speech', self.backends['speech'], filename)
+        self.align = registry.create('align', self.backends['align'], self.ocr, self.speech)
         self.audioVisualiser.initAudioPlayer(filename)
         # evaluation
         self.label = RefLabel(filename)
@@ -0,0 +1,84 @@
+# Seed-and-extend (anchor-first) alignment
+#
+# Rare content words drive the alignment of long lectures: a word which occurs
+# once on the slides and at most a few times in the speech is almost always
+# matched with one of its occurrences. Such (i, j) pairs are taken as anchors:
+#
+#   1. an inverted index maps each token to its positions in Y;
+#   2. the candidates are the pairs (i, j) where X[i] is unique in X, occurs
+#      1..max_count times in Y, and matching scores more than gapping;
+#   3. the anchors are a longest chain of candidates increasing in both i and
+#      j (patience diff), found in O(K log K);
+#   4. the DP of the MyDiff engine only runs inside the rectangles between
+#      consecutive anchors.
+#
+# The anchors are forced into the alignment, so the result may score slightly
+# less than the full DP, at a cost close to linear when the anchors are dense.
+
+import bisect
+
+class AnchorDiff:
+    """Anchor-first alignment on top of a MyDiff engine.
+    args:
+        diff - MyDiff (or subclass) instance, used inside the gaps
+        key - function returning the token of an item
+        max_count - maximum number of occurrences in Y of an anchor token
+    """
+    def __init__(self, diff, key=lambda w: w, max_count=1):
+        self.diff = diff
+        self.key = key
+        self.max_count = max_count
+
+    def solve(self):
+        diff = self.diff
+        diff.prepare()
+        N, M = len(diff.X), len(diff.Y)
+        align, i0, j0 = [], 0, 0
+        for i, j in self.find_anchors() + [(N, M)]:
+            align.extend(diff.align_range(i0, i, j0, j))
+            if i < N:
+                align.append((i, j))
+            i0, j0 = i + 1, j + 1
+        return diff.items(align)
+
+    def find_anchors(self):
+        """Return the anchors as a list of index pairs, increasing in i and j."""
+        diff = self.diff
+        tokens_x = [self.key(x) for x in diff.X]
+        count_x = {}
+        for token in tokens_x:
+            count_x[token] = count_x.get(token, 0) + 1
+        index_y = {} # inverted index: token -> positions in Y
+        for j, y in enumerate(diff.Y):
+            token = self.key(y)
+            if count_x.get(token) == 1:
+                index_y.setdefault(token, []).append(j)
+        candidates = []
+        for i, token in enumerate(tokens_x):
+            js = index_y.get(token, ())
+            if count_x[token] != 1 or not (0 < len(js) <= self.max_count):
+                continue
+            for j in reversed(js): # decreasing j: at most one anchor per i
+                if diff.jwf(diff.X[i], diff.Y[j]) > diff.scoreD[i] + diff.scoreI[j]:
+                    candidates.append((i, j))
+        return longest_chain(candidates)
+
+
+def longest_chain(pairs):
+    """Longest subsequence of pairs (sorted by i) strictly increasing in j.
+    Patience sorting: tails[k] is the smallest ending j of a chain of length
+    k + 1, and back pointers recover the chain."""
+    tails, tail_ids, parent = [], [], []
+    for n, (i, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_ids.append(n)
+        else:
+            tails[k], tail_ids[k] = j, n
+        parent.append(tail_ids[k - 1] if k > 0 else -1)
+    chain, n = [], tail_ids[-1] if tail_ids else -1
+    while n != -1:
+        chain.append(pairs[n])
+        n = parent[n]
+    return chain[::-1]
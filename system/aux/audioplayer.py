@@ -1,33 +1,42 @@
-from mutagen.mp3 import MP3
 from ..elements.TStamp import TStamp
-import pygame.mixer
 import os
 
 class AudioPlayer:
     def __init__(self, filename):
+        from mutagen.mp3 import MP3
         self.filename = filename
         self.path = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../audio/%s.mp3' % filename))
         audio = MP3(self.path)
         self.length = audio.info.length
-        pygame.mixer.init()
-        pygame.mixer.music.load(self.path)
+        self.music = None # pygame.mixer.music, loaded on first play
         self.playing = False
     
+    def load(self):
+        """Initialise the mixer and load the audio (on first use)."""
+        if self.music is None:
+            import pygame.mixer
+            pygame.mixer.init()
+            pygame.mixer.music.load(self.path)
+            self.music = pygame.mixer.music
+        return self.music
+    
     def play(self, start=0.0):
         assert isinstance(start, (int, float, TStamp))
         if isinstance(start, TStamp):
             start = start.to_sec()
-        pygame.mixer.music.play(start=start)
+        self.load().play(start=start)
         self.playing = True
     
     def pause(self):
-        pygame.mixer.music.pause()
+        if self.music is not None:
+            self.music.pause()
         self.playing = False
 
     def unpause(self):
-        pygame.mixer.music.unpause()
+        self.load().unpause()
         self.playing = False
     
     def stop(self):
-        pygame.mixer.music.stop()
+        if self.music is not None:
+            self.music.stop()
         self.playing = False
\ No newline at end of file
@@ -0,0 +1,254 @@
+# Compact binary container for Matches, BBoxGroups and WStamps
+#
+# Layout:
+#
+#      MAGIC (8 bytes) | header length (uint64) | JSON header | arrays ...
+#
+# The header records the kind of the stored object and, for each named array,
+# its dtype, shape and offset (relative to the start of the array section,
+# 8-byte aligned). Objects are stored column-wise: one array per attribute,
+# offset arrays for the nesting (match -> boxes, match -> intervals) and a
+# string table (utf-8 blob + offsets) for texts and words. The file can be
+# memory-mapped, in which case the arrays are views on the mapping.
+#
+# Conversion goes through the existing obj form (the result of to_obj), so
+# json <-> binary is lossless: int/float coordinates are flagged per value and
+# timestamps are stored as (min, sec, msec) triples.
+
+import json, struct
+import numpy as np
+
+MAGIC = b'\x93THBIN\x01\n'
+ALIGN = 8
+COORD_KEYS = ('x0', 'y0', 'x1', 'y1')
+TSTAMP_KEYS = ('min', 'sec', 'msec')
+KINDS = ('Matches', 'BBoxGroups', 'WStamps')
+
+
+def dumps(kind, obj):
+    """Encode an obj (as returned by to_obj) into bytes.
+    args:
+        kind - 'Matches', 'BBoxGroups' or 'WStamps'
+        obj - the obj to be encoded
+    returns:
+        buf - the encoded bytes
+    """
+    if kind == 'Matches':
+        arrays = pack_matches(obj)
+    elif kind == 'BBoxGroups':
+        arrays = pack_bbox_groups(obj)
+    elif kind == 'WStamps':
+        arrays = pack_wstamps(obj)
+    else:
+        raise ValueError('unknown kind: %s' % kind)
+    header = dict(kind=kind, arrays={})
+    chunks, offset = [], 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        header['arrays'][name] = dict(dtype=arr.dtype.str, shape=arr.shape, offset=offset)
+        data = arr.tobytes()
+        pad = (-len(data)) % ALIGN
+        chunks.append(data + b'\0' * pad)
+        offset += len(data) + pad
+    hbuf = json.dumps(header).encode('utf-8')
+    hbuf += b' ' * ((-(len(MAGIC) + 8 + len(hbuf))) % ALIGN)
+    return b''.join([MAGIC, struct.pack('<Q', len(hbuf)), hbuf] + chunks)
+
+
+def loads_columns(buf):
+    """Decode the header of buf and return (kind, arrays) without copying."""
+    if not is_binary(buf):
+        raise ValueError('not a binary container')
+    hlen, = struct.unpack('<Q', bytes(buf[len(MAGIC):len(MAGIC) + 8]))
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buf[start:start + hlen]).decode('utf-8'))
+    base = start + hlen
+    arrays = {}
+    for name, info in header['arrays'].items():
+        dtype, shape = np.dtype(info['dtype']), tuple(info['shape'])
+        count = int(np.prod(shape)) if len(shape) else 1
+        arr = np.frombuffer(buf, dtype=dtype, count=count, offset=base + info['offset'])
+        arrays[name] = arr.reshape(shape)
+    return header['kind'], arrays
+
+
+def loads(buf):
+    """Decode bytes into (kind, obj)."""
+    kind, arrays = loads_columns(buf)
+    if kind == 'Matches':
+        return kind, unpack_matches(arrays)
+    if kind == 'BBoxGroups':
+        return kind, unpack_bbox_groups(arrays)
+    if kind == 'WStamps':
+        return kind, unpack_wstamps(arrays)
+    raise ValueError('unknown kind: %s' % kind)
+
+
+def is_binary(buf):
+    return bytes(buf[:len(MAGIC)]) == MAGIC
+
+
+def is_binary_file(path):
+    """Return true if the file at path is in the binary format."""
+    with open(path, 'rb') as fin:
+        return is_binary(fin.read(len(MAGIC)))
+
+
+def kind_of(elem):
+    """Return the kind of a Matches, BBoxGroups or WStamps object (or of
+    a subclass, such as LazyMatches)."""
+    for kind, cls in element_classes().items():
+        if isinstance(elem, cls):
+            return kind
+    raise TypeError('elem should be one of %s' % (KINDS,))
+
+
+def element_classes():
+    from ..elements.Match import Matches
+    from ..elements.BBox import BBoxGroups
+    from ..elements.WStamp import WStamps
+    return dict(Matches=Matches, BBoxGroups=BBoxGroups, WStamps=WStamps)
+
+
+def dump(elem, path):
+    """Write a Matches, BBoxGroups or WStamps object to path in binary."""
+    kind = kind_of(elem)
+    with open(path, 'wb') as fout:
+        fout.write(dumps(kind, elem.to_obj()))
+
+
+def read_buffer(path, mmap=False):
+    if mmap:
+        return np.memmap(path, dtype=np.uint8, mode='r')
+    with open(path, 'rb') as fin:
+        return fin.read()
+
+
+def read_obj(path, mmap=False):
+    """Read the obj stored at path, auto-detecting json or binary format."""
+    buf = read_buffer(path, mmap=mmap)
+    if is_binary(buf):
+        return loads(buf)[1]
+    return json.loads(bytes(buf).decode('utf-8'))
+
+
+def load(path, mmap=False):
+    """Read the element stored at path (binary format)."""
+    kind, obj = loads(read_buffer(path, mmap=mmap))
+    return element_classes()[kind](obj, from_obj=True)
+
+
+def json_to_binary(src, dst, kind):
+    """Convert a json file (of given kind) to the binary format."""
+    with open(src, 'r') as fin:
+        obj = json.load(fin)
+    with open(dst, 'wb') as fout:
+        fout.write(dumps(kind, obj))
+
+
+def binary_to_json(src, dst, indent=None):
+    """Convert a binary file back to json."""
+    kind, obj = loads(read_buffer(src))
+    with open(dst, 'w') as fout:
+        json.dump(obj, fout, indent=indent)
+
+
+# Packing / Unpacking (obj <-> columns)
+
+def pack_strings(strings):
+    """Pack a list of str into a string table and an index array."""
+    table, index = {}, np.empty(len(strings), dtype=np.int32)
+    for i, s in enumerate(strings):
+        index[i] = table.setdefault(s, len(table))
+    encoded = [s.encode('utf-8') for s in table]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(x) for x in encoded])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, blob, index
+
+
+def unpack_strings(offsets, blob, index):
+    blob = bytes(blob)
+    table = [blob[a:b].decode('utf-8') for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    return [table[i] for i in index.tolist()]
+
+
+def offsets_of(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    return offsets
+
+
+def pack_boxes(boxes, prefix='box_'):
+    coords = np.array([[b['coords'][k] for k in COORD_KEYS] for b in boxes], dtype=np.float64).reshape(-1, 4)
+    isint = np.array([sum((isinstance(b['coords'][k], int) << n) for n, k in enumerate(COORD_KEYS)) for b in boxes], dtype=np.uint8)
+    pages = np.array([b['page'] for b in boxes], dtype=np.int64)
+    offsets, blob, index = pack_strings([b['text'] for b in boxes])
+    return {
+        prefix + 'coords': coords,
+        prefix + 'isint': isint,
+        prefix + 'page': pages,
+        prefix + 'str_offsets': offsets,
+        prefix + 'str_blob': blob,
+        prefix + 'text': index,
+    }
+
+
+def unpack_boxes(arrays, prefix='box_'):
+    texts = unpack_strings(arrays[prefix + 'str_offsets'], arrays[prefix + 'str_blob'], arrays[prefix + 'text'])
+    boxes = []
+    for row, flags, page, text in zip(arrays[prefix + 'coords'].tolist(), arrays[prefix + 'isint'].tolist(), arrays[prefix + 'page'].tolist(), texts):
+        coords = {k: (int(v) if (flags >> n) & 1 else v) for n, (k, v) in enumerate(zip(COORD_KEYS, row))}
+        boxes.append(dict(coords=coords, text=text, page=page))
+    return boxes
+
+
+def pack_tstamps(tstamps):
+    return np.array([[t[k] for k in TSTAMP_KEYS] for t in tstamps], dtype=np.int64).reshape(-1, 3)
+
+
+def unpack_tstamps(arr):
+    return [dict(zip(TSTAMP_KEYS, row)) for row in arr.tolist()]
+
+
+def split(items, offsets):
+    offsets = offsets.tolist()
+    return [items[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def pack_bbox_groups(obj):
+    arrays = pack_boxes([b for g in obj for b in g])
+    arrays['group_offsets'] = offsets_of([len(g) for g in obj])
+    return arrays
+
+
+def unpack_bbox_groups(arrays):
+    return split(unpack_boxes(arrays), arrays['group_offsets'])
+
+
+def pack_matches(obj):
+    arrays = pack_boxes([b for m in obj for b in m['bbox_group']])
+    intervals = [x for m in obj for x in m['tinterval_group']]
+    arrays['match_box_offsets'] = offsets_of([len(m['bbox_group']) for m in obj])
+    arrays['match_iv_offsets'] = offsets_of([len(m['tinterval_group']) for m in obj])
+    arrays['iv_start'] = pack_tstamps([x['start'] for x in intervals])
+    arrays['iv_end'] = pack_tstamps([x['end'] for x in intervals])
+    return arrays
+
+
+def unpack_matches(arrays):
+    groups = split(unpack_boxes(arrays), arrays['match_box_offsets'])
+    starts, ends = unpack_tstamps(arrays['iv_start']), unpack_tstamps(arrays['iv_end'])
+    intervals = [dict(start=a, end=b) for a, b in zip(starts, ends)]
+    tgroups = split(intervals, arrays['match_iv_offsets'])
+    return [dict(bbox_group=bg, tinterval_group=tg) for bg, tg in zip(groups, tgroups)]
+
+
+def pack_wstamps(obj):
+    offsets, blob, index = pack_strings([x['word'] for x in obj])
+    return dict(word_str_offsets=offsets, word_str_blob=blob, word=index, tstamp=pack_tstamps([x['tstamp'] for x in obj]))
+
+
+def unpack_wstamps(arrays):
+    words = unpack_strings(arrays['word_str_offsets'], arrays['word_str_blob'], arrays['word'])
+    return [dict(word=w, tstamp=t) for w, t in zip(words, unpack_tstamps(arrays['tstamp']))]
@@ -0,0 +1,70 @@
+# Bit-parallel LCS engine for MyDiff
+#
+# When f(x, y) is 1 for equal words, 0 otherwise, and insertions/deletions
+# score 0, maximising the total score is finding the Longest Common
+# Subsequence. A line of the LCS matrix is then encoded by a bit vector V over
+# Y (bit k-1 is 0 iff the score increases at column k), and processing one
+# item x of X is a few word operations on V (Allison-Dix / Hyyro):
+#
+#      U = V & M[x]
+#      V = (V + U) | (V - U)
+#
+# where M[x] is the match mask of x over Y. Python ints are used as bit
+# vectors, so one line costs O(M / 64) word operations instead of O(M) calls
+# of f(x, y). The score lines are exact integers, hence identical to those of
+# MyDiff.NW_score, and so is the alignment.
+
+import numpy as np
+from .mydiff import MyDiff
+
+class BitLCSDiff(MyDiff):
+    """MyDiff for equality-only scoring with bit-parallel score lines.
+    args:
+        key - function returning the token of an item (compared by equality)
+    """
+    def __init__(self, X, Y, jwf, key=lambda w: w, **kwargs):
+        kwargs.setdefault('wavefront', False) # the tiles would score cell by cell
+        super().__init__(X, Y, jwf, **kwargs)
+        self.key = key
+
+    def prepare(self):
+        super().prepare()
+        M = len(self.Y)
+        # match masks over the whole of Y, in forward and reverse order
+        positions = {}
+        for j, y in enumerate(self.Y):
+            positions.setdefault(self.key(y), []).append(j)
+        self.masks, self.masks_rev = {}, {}
+        for token, js in positions.items():
+            self.masks[token] = to_bitvector(js, M)
+            self.masks_rev[token] = to_bitvector([M - 1 - j for j in js], M)
+        self.tokens = [self.key(x) for x in self.X]
+
+    def NW_score(self, x0, x1, y0, y1, score, reverse=False):
+        """Same as MyDiff.NW_score, computed with bit vectors."""
+        N2 = y1 - y0
+        full = (1 << N2) - 1
+        if reverse:
+            masks, shift, xs = self.masks_rev, len(self.Y) - y1, range(x1 - 1, x0 - 1, -1)
+        else:
+            masks, shift, xs = self.masks, y0, range(x0, x1)
+        local = {} # match masks restricted to Y[y0:y1]
+        V = full
+        for i in xs:
+            token = self.tokens[i]
+            if token not in local:
+                local[token] = (masks[token] >> shift) & full if token in masks else 0
+            U = V & local[token]
+            V = ((V + U) | (V - U)) & full
+        # score[k] = number of zero bits among the lowest k bits of V
+        bits = np.unpackbits(np.frombuffer(V.to_bytes((N2 + 7) // 8, 'little'), dtype=np.uint8), bitorder='little')[:N2]
+        score[0] = 0
+        score[1:N2 + 1] = np.cumsum(1 - bits.astype(np.int64))
+        return score
+
+
+def to_bitvector(positions, size):
+    """Return a Python int with the bits at the given positions set."""
+    bits = np.zeros(size, dtype=np.uint8)
+    bits[positions] = 1
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
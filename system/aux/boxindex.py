@@ -0,0 +1,63 @@
+# Page-level spatial index of the BBoxes of a BBoxGroups object
+#
+# The boxes are flattened into arrays (page, x0, y0, x1, y1, group id) and,
+# for each page, sorted by x0. A query rectangle only scans the boxes of its
+# page starting left of its right edge (one binary search), and the
+# intersection areas are computed with vector operations.
+
+import numpy as np
+
+class BoxIndex:
+    """Spatial index of the BBoxes of a BBoxGroups object.
+    attributes:
+        pages - [array] page of each box
+        coords - [array] (x0, y0, x1, y1) of each box, one row per box
+        gids - [array] group id of each box
+        ranges - [array] page_range of each group, one row per group
+        first - [array] running max of the first pages of the groups
+    """
+
+    def __init__(self, bbox_groups):
+        boxes = [(gid, rect) for gid, group in enumerate(bbox_groups) for rect in group.rects()]
+        self.gids = np.array([gid for gid, rect in boxes], dtype=np.int64)
+        self.pages = np.array([page for gid, (page, coords) in boxes], dtype=np.int64)
+        self.coords = np.array([coords for gid, (page, coords) in boxes], dtype=float).reshape(-1, 4)
+        self.ranges = np.array([group.page_range() for group in bbox_groups], dtype=np.int64).reshape(-1, 2)
+        self.first = np.maximum.accumulate(self.ranges[:, 0]) if len(self.ranges) else self.ranges[:, 0]
+        self.by_page = {}
+        for page in np.unique(self.pages).tolist():
+            ids = np.flatnonzero(self.pages == page)
+            ids = ids[np.argsort(self.coords[ids, 0], kind='stable')]
+            self.by_page[page] = (ids, self.coords[ids, 0])
+
+    def query(self, page, coords):
+        """Return (ids, areas): the boxes of the page intersecting the
+        rectangle coords = (x0, y0, x1, y1), and the intersection areas."""
+        if page not in self.by_page:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ids, x0s = self.by_page[page]
+        ids = ids[:np.searchsorted(x0s, coords[2], side='right')]
+        box = self.coords[ids]
+        w = np.minimum(box[:, 2], coords[2]) - np.maximum(box[:, 0], coords[0])
+        h = np.minimum(box[:, 3], coords[3]) - np.maximum(box[:, 1], coords[1])
+        hit = (w >= 0) & (h >= 0)
+        return ids[hit], (w * h)[hit]
+
+    def group_areas(self, bbox_group):
+        """Return the intersection area of bbox_group with every group
+        (as BBoxGroup.__and__, i.e. 0 without a common page range)."""
+        areas = np.zeros(len(self.ranges))
+        for page, coords in bbox_group.rects():
+            ids, inter = self.query(page, coords)
+            np.add.at(areas, self.gids[ids], inter)
+        first, last = bbox_group.page_range()
+        common = (np.maximum(self.ranges[:, 0], first) <= np.minimum(self.ranges[:, 1], last))
+        return np.where(common, areas, 0)
+
+    def count_before(self, page):
+        """Return the number of leading groups before the first group
+        starting after the page."""
+        return int(np.searchsorted(self.first, page, side='right'))
+
+    def __len__(self):
+        return len(self.gids)
@@ -0,0 +1,168 @@
+# Coarse-to-fine (two-level) alignment
+#
+# X is made of groups (the words of the BBoxGroups), Y is cut into windows of
+# a fixed number of words. The alignment runs on two levels:
+#
+#   1. coarse: each window is assigned to a group by a monotonic DP over the
+#      G x W similarity matrix of the groups and the windows (tf-idf bags of
+#      words, one matrix product);
+#   2. fine: the word-level NW alignment only runs inside the corridor of the
+#      windows matched with each group, widened by a margin (in words of Y).
+#
+# The corridor is a band of the NW matrix (a column range per line, both ends
+# nondecreasing), scored with the blocks of the scorer of a MyDiff engine and
+# traced back from the directions stored inside the band. The cost is
+# O(G * W) for the coarse level and O(N * band width) for the fine level,
+# instead of O(N * M).
+
+import numpy as np
+from .mydiff import DIR_S, DIR_D, DIR_I, insertion_scan
+from .scorer import intern
+
+class CorridorDiff:
+    """Coarse-to-fine alignment on top of a MyDiff engine.
+    args:
+        diff - MyDiff (or subclass) instance, providing X, Y and the scorer
+        groups - list of group lengths, summing to len(X)
+        key - function returning the token of an item
+        window - number of Y items per window
+        margin - number of Y items added on both sides of the corridor
+    """
+    def __init__(self, diff, groups, key=lambda w: w, window=100, margin=200):
+        if sum(groups) != len(diff.X):
+            raise ValueError('groups should sum to len(X)')
+        self.diff = diff
+        self.groups = list(groups)
+        self.key = key
+        self.window = window
+        self.margin = margin
+
+    def solve(self):
+        diff = self.diff
+        diff.prepare()
+        N, M = len(diff.X), len(diff.Y)
+        if N == 0 or M == 0:
+            return diff.items(diff.NW_align_base(0, N, 0, M))
+        assignment = self.assign_windows()
+        L, R = self.corridor(assignment)
+        return diff.items(self.band_align(L, R))
+
+    def similarity(self):
+        """Return the G x W tf-idf cosine similarity of groups and windows."""
+        diff = self.diff
+        (xid, yid), vocab = intern(diff.X, diff.Y, key=self.key)
+        V, G = len(vocab), len(self.groups)
+        W = -(-len(diff.Y) // self.window)
+        gid = np.repeat(np.arange(G), self.groups)
+        wid = np.arange(len(diff.Y)) // self.window
+        bag_x = np.zeros((G, V), dtype=np.float32)
+        bag_y = np.zeros((W, V), dtype=np.float32)
+        np.add.at(bag_x, (gid, xid), 1)
+        np.add.at(bag_y, (wid, yid), 1)
+        df = (bag_y > 0).sum(axis=0)
+        idf = np.log((W + 1) / (df + 1)).astype(np.float32)
+        bag_x *= idf
+        bag_y *= idf
+        norm_x = np.linalg.norm(bag_x, axis=1, keepdims=True)
+        norm_y = np.linalg.norm(bag_y, axis=1, keepdims=True)
+        bag_x /= np.where(norm_x > 0, norm_x, 1)
+        bag_y /= np.where(norm_y > 0, norm_y, 1)
+        return bag_x @ bag_y.T
+
+    def assign_windows(self):
+        """Assign a group to each window, nondecreasing along the windows.
+        best[w, g] is the best total similarity of windows 0..w with window
+        w assigned to group g: the previous window stays on g or comes from
+        any group before g (groups may be skipped)."""
+        sim = self.similarity()
+        G, W = sim.shape
+        best = np.empty((W, G))
+        best[0] = sim[:, 0]
+        for w in range(1, W):
+            before = np.empty(G)
+            before[0] = -np.inf
+            before[1:] = np.maximum.accumulate(best[w - 1])[:-1]
+            best[w] = sim[:, w] + np.maximum(best[w - 1], before)
+        # traceback
+        assignment = np.empty(W, dtype=np.int64)
+        g = int(best[W - 1].argmax())
+        for w in range(W - 1, 0, -1):
+            assignment[w] = g
+            prev = best[w - 1]
+            if g > 0 and prev[:g].max() > prev[g]:
+                g = int(prev[:g].argmax())
+        assignment[0] = g
+        return assignment
+
+    def corridor(self, assignment):
+        """Return the band (L[r], R[r]) of each line r = 0..N of the NW matrix."""
+        N, M = len(self.diff.X), len(self.diff.Y)
+        G = len(self.groups)
+        starts = np.arange(len(assignment)) * self.window
+        ends = np.minimum(starts + self.window, M)
+        # Y range of each group (empty at the current position if no window)
+        lo, hi = np.empty(G, dtype=np.int64), np.empty(G, dtype=np.int64)
+        pos = 0
+        for g in range(G):
+            mine = assignment == g
+            if mine.any():
+                lo[g], hi[g] = starts[mine].min(), ends[mine].max()
+                pos = hi[g]
+            else:
+                lo[g] = hi[g] = pos
+        lo, hi = np.maximum(lo - self.margin, 0), np.minimum(hi + self.margin, M)
+        L = np.empty(N + 1, dtype=np.int64)
+        R = np.empty(N + 1, dtype=np.int64)
+        L[1:], R[1:] = np.repeat(lo, self.groups), np.repeat(hi, self.groups)
+        L[0], R[0] = 0, R[1] if N > 0 else M
+        R[N] = M
+        L, R = np.maximum.accumulate(L), np.maximum.accumulate(R)
+        L[1:] = np.minimum(L[1:], R[:-1]) # every line touches the previous one
+        return L, R
+
+    def band_align(self, L, R):
+        """NW alignment restricted to columns L[r]..R[r] of each line r,
+        with traceback (same directions as MyDiff.NW_align)."""
+        diff = self.diff
+        N = len(diff.X)
+        vecI, scoreD = diff.vecI, diff.scoreD
+        directions = [np.full(R[0] - L[0] + 1, DIR_I, dtype=np.uint8)]
+        score = np.concatenate(([0], np.cumsum(vecI[:R[0]])))
+        for r in range(1, N + 1):
+            i, d = r - 1, scoreD[r - 1]
+            Lp, Rp, Lr, Rr = L[r - 1], R[r - 1], L[r], R[r]
+            top = min(Rr, Rp + 1) # last column reachable from line r - 1
+            up = np.full(top - Lr + 1, -np.inf)
+            up[:min(Rr, Rp) - Lr + 1] = score[Lr - Lp:min(Rr, Rp) - Lp + 1] + d
+            diag = np.full(top - Lr + 1, -np.inf)
+            c0 = max(Lr, Lp + 1) # first column with a diagonal move
+            if c0 <= top:
+                scoreS = diff.scorer.substitute(i, i + 1, c0 - 1, top)[0]
+                diag[c0 - Lr:] = score[c0 - 1 - Lp:top - Lp] + scoreS
+            cand = np.maximum(up, diag)
+            direction = np.full(Rr - Lr + 1, DIR_I, dtype=np.uint8)
+            direction[:top - Lr + 1] = np.where(up >= diag, DIR_D, DIR_S)
+            # insertions: new[c] = max(cand[c], new[c - 1] + I[c - 1])
+            new = np.empty(Rr - Lr + 1)
+            new[:top - Lr + 1] = insertion_scan(vecI[Lr:top])(cand.copy())
+            direction[:top - Lr + 1][new[:top - Lr + 1] > cand] = DIR_I
+            # columns beyond the previous line are only reached by insertions
+            if top < Rr:
+                new[top - Lr + 1:] = new[top - Lr] + np.cumsum(vecI[top:Rr])
+            directions.append(direction)
+            score = new
+        # traceback
+        align = []
+        r, c = N, R[N]
+        while r > 0 or c > 0:
+            move = directions[r][c - L[r]]
+            if move == DIR_S:
+                align.append((r - 1, c - 1))
+                r, c = r - 1, c - 1
+            elif move == DIR_D:
+                align.append((r - 1, None))
+                r -= 1
+            else:
+                align.append((None, c - 1))
+                c -= 1
+        return align[::-1]
@@ -0,0 +1,107 @@
+# Edit distance engine (for WER evaluation)
+#
+# Sequences are lists of interned token ids (see scorer.intern). Two steps:
+#
+#   1. the unit-cost Levenshtein distance d is computed bit-parallel over the
+#      tokens of a (Myers / Hyyro): one column of the DP matrix is encoded by
+#      its vertical +1/-1 deltas (Pv, Mv) in two Python ints, and processing
+#      one token of b is a few word operations, i.e. O(len(b) * len(a) / 64);
+#   2. the (weighted) optimal alignment is recovered by a banded DP with
+#      traceback. The alignment of the unit-cost optimum costs at most
+#      max(wI, wD, wS) * d, and a path reaching the diagonal offset o = j - i
+#      needs at least |o| + |o - (len(b) - len(a))| insertions/deletions, so
+#      the band of the offsets o with min(wI, wD) * (|o| + |o - delta|) not
+#      above that bound holds an optimal path. The lines of the band are
+#      computed with integer vector operations (exact), so the cost is
+#      O(len(a) * band width) where the band width is O(d).
+#
+# Insertions are tokens of b not in a, deletions are tokens of a not in b.
+
+from collections import namedtuple
+import numpy as np
+
+EditOps = namedtuple('EditOps', 'cost I D S')
+
+# directions of the traceback
+DIR_S, DIR_D, DIR_I = 0, 1, 2
+INF = 2**60
+
+def levenshtein(a, b):
+    """Return the unit-cost edit distance of the sequences a and b."""
+    m = len(a)
+    if m == 0:
+        return len(b)
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    peq = {}
+    for k, token in enumerate(a):
+        peq[token] = peq.get(token, 0) | (1 << k)
+    Pv, Mv, score = full, 0, m
+    for token in b:
+        Eq = peq.get(token, 0)
+        Xv = Eq | Mv
+        Xh = ((((Eq & Pv) + Pv) & full) ^ Pv) | Eq
+        Ph = Mv | (~(Xh | Pv) & full)
+        Mh = Pv & Xh
+        if Ph & high:
+            score += 1
+        elif Mh & high:
+            score -= 1
+        Ph = ((Ph << 1) | 1) & full
+        Mh = (Mh << 1) & full
+        Pv = Mh | (~(Xv | Ph) & full)
+        Mv = Ph & Xv
+    return score
+
+
+def align(a, b, wI=1, wD=1, wS=1):
+    """Return the EditOps (cost and numbers of I, D, S) of an optimal
+    alignment of a to b with integer costs wI, wD, wS."""
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    N, M = len(a), len(b)
+    delta = M - N
+    bound = max(wI, wD, wS) * levenshtein(a.tolist(), b.tolist())
+    # band of the diagonal offsets o = j - i holding an optimal path
+    reach = bound // max(1, min(wI, wD))
+    omin = min(0, delta) - max(0, (reach - abs(delta)) // 2)
+    omax = max(0, delta) + max(0, (reach - abs(delta)) // 2)
+    rows = [(max(0, i + omin), min(M, i + omax)) for i in range(N + 1)]
+    directions = []
+    L, R = rows[0]
+    score = wI * np.arange(L, R + 1, dtype=np.int64)
+    directions.append(np.full(R - L + 1, DIR_I, dtype=np.uint8))
+    for i in range(1, N + 1):
+        Lp, Rp = rows[i - 1]
+        L, R = rows[i]
+        width = R - L + 1
+        up = np.full(width, INF, dtype=np.int64)
+        top = min(R, Rp)
+        up[:top - L + 1] = score[L - Lp:top - Lp + 1] + wD
+        diag = np.full(width, INF, dtype=np.int64)
+        c0 = max(L, Lp + 1)
+        if c0 <= R:
+            cost = np.where(b[c0 - 1:R] == a[i - 1], 0, wS)
+            diag[c0 - L:] = score[c0 - 1 - Lp:R - Lp] + cost
+        cand = np.minimum(up, diag)
+        direction = np.where(diag <= up, DIR_S, DIR_D).astype(np.uint8)
+        # insertions along the line: new[j] = min(cand[j], new[j - 1] + wI)
+        offset = wI * np.arange(width, dtype=np.int64)
+        new = offset + np.minimum.accumulate(cand - offset)
+        direction[new < cand] = DIR_I
+        directions.append(direction)
+        score = new
+    # traceback
+    nI = nD = nS = 0
+    i, j = N, M
+    while i > 0 or j > 0:
+        move = directions[i][j - rows[i][0]]
+        if move == DIR_S:
+            nS += int(a[i - 1] != b[j - 1])
+            i, j = i - 1, j - 1
+        elif move == DIR_D:
+            nD += 1
+            i -= 1
+        else:
+            nI += 1
+            j -= 1
+    return EditOps(int(score[M - rows[N][0]]), nI, nD, nS)
@@ -0,0 +1,116 @@
+# Fuzzy token matching between two vocabularies
+#
+# OCR misreads ("a1gorithm", "rn" for "m") keep words from matching exactly.
+# The similarity of two words a, b is
+#
+#      sim(a, b) = 1 - lev(a, b) / max(len(a), len(b))
+#
+# kept only when lev(a, b) <= threshold * max(len(a), len(b)). The table of
+# all such pairs is built once per run, from the vocabularies only:
+#
+#   1. a q-gram inverted index maps each q-gram (of the padded words) to the
+#      words of the first vocabulary (e.g. the OCR words) containing it;
+#   2. for a word b of the second vocabulary, the candidates a share enough
+#      q-grams with b (count filter: an edit destroys at most q q-grams, so
+#      lev(a, b) <= k implies that a and b share all but k * q of the
+#      distinct q-grams of each) and have a close length (length filter);
+#   3. the candidates are verified by a Levenshtein distance bounded by k.
+#
+# The second vocabulary can grow (add), e.g. with the words of a live stream.
+# The cost depends on the sizes of the vocabularies, not on the lengths of
+# the texts. Lookups are by interned ids: O(1) for a pair, and one sorted
+# search for a whole block of pairs.
+
+import numpy as np
+
+class FuzzyTable:
+    """Sparse similarity table between two vocabularies.
+    args:
+        vocab - dict from word to id (see scorer.intern), covering both sides
+        words_a - the words of the first vocabulary
+        threshold - maximum edit distance, relative to the word length
+        q - length of the q-grams
+        min_len - words shorter than this only match exactly
+    """
+    def __init__(self, vocab, words_a, threshold=0.2, q=2, min_len=4):
+        self.vocab = vocab
+        self.threshold, self.q, self.min_len = threshold, q, min_len
+        self.words_a = set(words_a)
+        self.index, self.sizes = {}, {} # q-gram -> words, word -> number of q-grams
+        for a in self.words_a:
+            if len(a) >= min_len:
+                grams = set(qgrams(a, q))
+                self.sizes[a] = len(grams)
+                for gram in grams:
+                    self.index.setdefault(gram, []).append(a)
+        self.table = {} # (id_a, id_b) -> similarity
+        self.seen = set()
+        self.keys, self.values = np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    def add(self, words_b):
+        """Add the similar pairs of the new words of the second vocabulary."""
+        q, vocab, added = self.q, self.vocab, False
+        for b in set(words_b) - self.seen:
+            self.seen.add(b)
+            if b in self.words_a:
+                self.table[vocab[b], vocab[b]] = 1.0
+                added = True
+            if len(b) < self.min_len:
+                continue
+            counts, grams = {}, set(qgrams(b, q))
+            for gram in grams:
+                for a in self.index.get(gram, ()):
+                    counts[a] = counts.get(a, 0) + 1
+            for a, count in counts.items():
+                longest = max(len(a), len(b))
+                k = int(self.threshold * longest)
+                if a == b or abs(len(a) - len(b)) > k or count < max(len(grams), self.sizes[a]) - k * q:
+                    continue
+                dist = levenshtein(a, b, k)
+                if dist <= k:
+                    self.table[vocab[a], vocab[b]] = 1 - dist / longest
+                    added = True
+        if added:
+            pairs = sorted(self.table)
+            self.keys = np.array([to_key(a, b) for a, b in pairs], dtype=np.int64)
+            self.values = np.array([self.table[x] for x in pairs], dtype=float)
+
+    def get(self, id_a, id_b):
+        """Return the similarity of a pair of ids (0 if not similar)."""
+        return self.table.get((id_a, id_b), 0.0)
+
+    def lookup(self, ids_a, ids_b):
+        """Return the similarities of all pairs of ids_a x ids_b as a matrix."""
+        keys = to_key(ids_a[:, None], ids_b[None, :])
+        if len(self.keys) == 0:
+            return np.zeros(keys.shape)
+        pos = np.searchsorted(self.keys, keys)
+        pos[pos == len(self.keys)] = 0
+        return np.where(self.keys[pos] == keys, self.values[pos], 0.0)
+
+    def __len__(self):
+        return len(self.table)
+
+
+def to_key(id_a, id_b):
+    return (id_a << 32) | id_b
+
+
+def qgrams(word, q):
+    padded = '#' * (q - 1) + word + '#' * (q - 1)
+    return [padded[k:k + q] for k in range(len(padded) - q + 1)]
+
+
+def levenshtein(a, b, bound):
+    """Levenshtein distance of a and b, or bound + 1 if it exceeds bound."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > bound:
+            return bound + 1
+        prev = cur
+    return prev[-1]
@@ -11,72 +11,363 @@
 # by maximising the total score of the alignment.
 #
 # Note: x from X;  y from Y.
+#
+# Memory budget: any subproblem whose (N + 1) x (M + 1) direction matrix
+# (1 byte per cell) fits in the budget is solved by a single full-matrix pass
+# with traceback instead of being split further. This saves roughly half of
+# the score computations, and the result has the same optimal score (ties may
+# be broken differently).
+#
+# Scorers: jwf may also be a Scorer (see scorer.py), which scores whole blocks
+# of cells at once. NW_score then computes each line with vector operations;
+# the lines are the same as those of the cell by cell loop (see NW_line).
 
+import multiprocessing
 import numpy as np
+from .scorer import Scorer, JWFScorer
+from . import trace
+
+# directions in the full-matrix traceback
+DIR_S, DIR_D, DIR_I = 0, 1, 2
 
 class MyDiff:
     """My own diff implementation."""
-    def __init__(self, X, Y, jwf):
+    def __init__(self, X, Y, jwf, memory_budget=None, workers=None, parallel_threshold=2**20, wavefront=True):
         self.X = X
         self.Y = Y
         self.jwf = jwf  # joint weight function f(x, y)
+        self.scorer = jwf if isinstance(jwf, Scorer) else JWFScorer(jwf)
+        self.vectorised = not isinstance(self.scorer, JWFScorer)
+        self.memory_budget = memory_budget # in bytes, None for pure Hirschberg
+        self.workers = workers # number of processes, None for serial
+        self.parallel_threshold = parallel_threshold # in cells, see Hirschberg_parallel
+        self.wavefront = wavefront # tile the widest passes, see NW_score_wavefront
     
+    @trace.traced()
     def solve(self):
-        return self.Hirschberg(self.X, self.Y)
-    
-    def Hirschberg(self, X, Y):
-        if len(X) == 0:
-            return [(None, y) for y in Y]
-        if len(Y) == 0:
-            return [(x, None) for x in X]
-        if len(X) == 1:
-            return self.NW_align_unity_X(X[0], Y)
-        if len(Y) == 1:
-            return self.NW_align_unity_Y(X, Y[0])
-        N1, N2 = len(X), len(Y)
-        xmid = (N1 // 2)
-        scoreL = self.NW_score(X[0:xmid], Y)
-        scoreR = self.NW_score(X[xmid:][::-1], Y[::-1])
-        ymid = (scoreL + np.flip(scoreR, 0)).argmax()
-        return self.Hirschberg(X[0:xmid], Y[0:ymid]) + self.Hirschberg(X[xmid:], Y[ymid:])
-    
-    def NW_score(self, X, Y):
-        """Return the last line of the NW score matrix (dim(ret) == dim(Y) + 1)."""
-        X = [None] + X;  N1 = len(X) # i
-        Y = [None] + Y;  N2 = len(Y) # j
-        score = np.zeros(N2)
+        self.prepare()
+        return self.items(self.align_range(0, len(self.X), 0, len(self.Y)))
+    
+    def align_range(self, x0, x1, y0, y1):
+        """Align X[x0:x1] with Y[y0:y1] (after prepare) into index pairs."""
+        if self.workers is not None and self.workers > 1 and (x1 - x0) * (y1 - y0) > self.parallel_threshold:
+            return self.Hirschberg_parallel(x0, x1, y0, y1)
+        return self.Hirschberg(x0, x1, y0, y1)
+    
+    def items(self, align):
+        """Map index pairs (i, j) to item pairs (X[i], Y[j])."""
+        X, Y = self.X, self.Y
+        return [(X[i] if i is not None else None, Y[j] if j is not None else None) for i, j in align]
+    
+    def prepare(self):
+        """Precompute what does not depend on the subproblem."""
+        self.scorer.prepare(self.X, self.Y)
+        # insertion/deletion scores do not depend on the position
+        self.vecI = self.scorer.insert(0, len(self.Y))
+        self.vecD = self.scorer.delete(0, len(self.X))
+        self.scoreI, self.scoreD = self.vecI.tolist(), self.vecD.tolist()
+        # reusable score rows (forward and reverse passes)
+        self.rowL, self.rowR = np.zeros(len(self.Y) + 1), np.zeros(len(self.Y) + 1)
+    
+    def Hirschberg(self, x0, x1, y0, y1):
+        """Align X[x0:x1] with Y[y0:y1] and return a list of index pairs (i, j),
+        where None marks an insertion (i) or a deletion (j).
+        The subproblems are kept on an explicit work stack (left half on top),
+        so the alignment is produced from left to right without recursion.
+        Each split is traced as a span 'MyDiff.level<depth>'."""
+        align = []
+        stack = [(x0, x1, y0, y1, 0)]
+        while stack:
+            x0, x1, y0, y1, level = stack.pop()
+            if not self.should_split(x0, x1, y0, y1):
+                align.extend(self.NW_align_base(x0, x1, y0, y1))
+            else:
+                if trace.enabled: # the span name and args are only built when tracing
+                    with trace.span('MyDiff.level%d' % level, cells=(x1 - x0) * (y1 - y0)):
+                        xmid, ymid = self.split(x0, x1, y0, y1)
+                else:
+                    xmid, ymid = self.split(x0, x1, y0, y1)
+                stack.append((xmid, x1, ymid, y1, level + 1))
+                stack.append((x0, xmid, y0, ymid, level + 1))
+        return align
+    
+    def split(self, x0, x1, y0, y1):
+        """Return the split point (xmid, ymid) of X[x0:x1] and Y[y0:y1]."""
+        xmid = x0 + ((x1 - x0) // 2)
+        scoreL = self.NW_score(x0, xmid, y0, y1, self.rowL)
+        scoreR = self.NW_score(xmid, x1, y0, y1, self.rowR, reverse=True)
+        return xmid, self.find_ymid(scoreL, scoreR, y0, y1)
+    
+    def should_split(self, x0, x1, y0, y1):
+        """Return true if X[x0:x1] and Y[y0:y1] should be split by Hirschberg."""
+        N1, N2 = x1 - x0, y1 - y0
+        return N1 > 1 and N2 > 1 and not self.fits_in_budget(N1, N2)
+    
+    def NW_align_base(self, x0, x1, y0, y1):
+        """Align a subproblem which is not split further."""
+        N1, N2 = x1 - x0, y1 - y0
+        if N1 == 0:
+            return [(None, j) for j in range(y0, y1)]
+        if N2 == 0:
+            return [(i, None) for i in range(x0, x1)]
+        if N1 == 1:
+            return self.NW_align_unity_X(x0, y0, y1)
+        if N2 == 1:
+            return self.NW_align_unity_Y(x0, x1, y0)
+        return self.NW_align(x0, x1, y0, y1)
+    
+    def find_ymid(self, scoreL, scoreR, y0, y1):
+        """Return the split point of Y[y0:y1] from the forward and reverse score lines."""
+        N2 = y1 - y0
+        return y0 + int((scoreL[:N2 + 1] + scoreR[N2::-1]).argmax())
+    
+    def Hirschberg_parallel(self, x0, x1, y0, y1):
+        """Same as Hirschberg, but on a pool of worker processes.
+        The subproblems are split level by level: at each level, the forward
+        and reverse NW_score passes of all subproblems run concurrently, and
+        subproblems below parallel_threshold cells are aligned whole by one
+        worker. A level with a single pass pair (the top level) is tiled over
+        the workers instead (see NW_score_wavefront). The split points are
+        computed exactly as in Hirschberg, so the alignment is identical to
+        the serial one."""
+        global _shared, _buffers
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError: # fork is not available, run serially
+            return self.Hirschberg(x0, x1, y0, y1)
+        _shared = self # inherited by the forked workers (copy-on-write)
+        if self.wavefront: # boundary rows/columns of the forward and reverse passes
+            size_top, size_left = (y1 - y0) + 1, (x1 - x0) + self.workers + 1
+            _buffers = [(np.frombuffer(context.RawArray('d', size_top)), np.frombuffer(context.RawArray('d', size_left))) for k in range(2)]
+        try:
+            with context.Pool(self.workers) as pool:
+                return self._Hirschberg_parallel(pool, x0, x1, y0, y1)
+        finally:
+            _shared = _buffers = None
+    
+    def _Hirschberg_parallel(self, pool, x0, x1, y0, y1):
+        order = [(x0, x1, y0, y1)] # subproblems from left to right
+        pieces = {}
+        while True:
+            to_split = []
+            for rng in order:
+                if rng in pieces:
+                    continue
+                N1, N2 = rng[1] - rng[0], rng[3] - rng[2]
+                if not self.should_split(*rng) or N1 * N2 <= self.parallel_threshold:
+                    pieces[rng] = pool.apply_async(_align_task, (rng,))
+                else:
+                    to_split.append(rng)
+            splits = {}
+            for rng in to_split:
+                xmid = rng[0] + ((rng[1] - rng[0]) // 2)
+                passes = [(rng[0], xmid, rng[2], rng[3], False), (xmid, rng[1], rng[2], rng[3], True)]
+                if self.wavefront and len(to_split) == 1:
+                    # the only pass pair of this level, tile it over the workers
+                    scoreL, scoreR = self.NW_score_wavefront(pool, passes)
+                    splits[rng] = (xmid, _Ready(scoreL), _Ready(scoreR))
+                else:
+                    splits[rng] = (xmid,) + tuple(pool.apply_async(_score_task, (x,)) for x in passes)
+            if len(splits) == 0:
+                break
+            new_order = []
+            for rng in order:
+                if rng not in splits:
+                    new_order.append(rng)
+                    continue
+                xmid, resL, resR = splits[rng]
+                ymid = self.find_ymid(resL.get(), resR.get(), rng[2], rng[3])
+                new_order.append((rng[0], xmid, rng[2], ymid))
+                new_order.append((xmid, rng[1], ymid, rng[3]))
+            order = new_order
+        align = []
+        for rng in order:
+            align.extend(pieces[rng].get())
+        return align
+    
+    def NW_score_wavefront(self, pool, passes):
+        """Compute NW_score passes with a blocked wavefront on the pool.
+        Each pass is split into row blocks x column tiles (one per worker).
+        Tile (b, c) only depends on tiles (b - 1, c) and (b, c - 1), so the
+        tiles of an anti-diagonal run concurrently; they only share the
+        boundary row of each column tile and the boundary column of each row
+        block, in the buffers set up by Hirschberg_parallel. Every cell is
+        computed as in NW_score, so the score lines are bit-identical.
+        args:
+            passes - list of (x0, x1, y0, y1, reverse), at most len(_buffers)
+        returns:
+            scores - list of the last score lines of the passes
+        """
+        layouts = []
+        for p, (x0, x1, y0, y1, reverse) in enumerate(passes):
+            N1, N2 = x1 - x0, y1 - y0
+            nb, nc = min(self.workers, N1), min(self.workers, N2)
+            rows = [(b * N1) // nb for b in range(nb + 1)]
+            cols = [(c * N2) // nc for c in range(nc + 1)]
+            col0 = self.init_wavefront(p, x0, x1, y0, y1, reverse, rows)
+            layouts.append((rows, cols, col0))
+        for d in range(max(len(rows) + len(cols) - 3 for rows, cols, col0 in layouts)):
+            results = []
+            for p, (x0, x1, y0, y1, reverse) in enumerate(passes):
+                rows, cols = layouts[p][:2]
+                for b in range(max(0, d - len(cols) + 2), min(d, len(rows) - 2) + 1):
+                    c = d - b
+                    tile = (p, x0, x1, y0, y1, reverse, rows[b], rows[b + 1], rows[b] + b, cols[c], cols[c + 1])
+                    results.append(pool.apply_async(_tile_task, (tile,)))
+            for res in results:
+                res.get()
+        scores = []
+        for p, (x0, x1, y0, y1, reverse) in enumerate(passes):
+            score = _buffers[p][0][:y1 - y0 + 1].copy()
+            score[0] = layouts[p][2][-1]
+            scores.append(score)
+        return scores
+    
+    def init_wavefront(self, p, x0, x1, y0, y1, reverse, rows):
+        """Initialise the boundary buffers of pass p, return the first column."""
+        top, left = _buffers[p]
+        xs, ys = self.scan_ranges(x0, x1, y0, y1, reverse)
+        top[0] = 0
+        for k, j in enumerate(ys, 1):
+            top[k] = top[k - 1] + self.scoreI[j]
+        col0 = [top[0]]
+        for i in xs:
+            col0.append(col0[-1] + self.scoreD[i])
+        for b in range(len(rows) - 1):
+            left[rows[b] + b:rows[b + 1] + b + 1] = col0[rows[b]:rows[b + 1] + 1]
+        return col0
+    
+    def scan_ranges(self, x0, x1, y0, y1, reverse=False):
+        """Return the scanning orders of X[x0:x1] and Y[y0:y1]."""
+        if reverse:
+            return range(x1 - 1, x0 - 1, -1), range(y1 - 1, y0 - 1, -1)
+        return range(x0, x1), range(y0, y1)
+    
+    def NW_score(self, x0, x1, y0, y1, score, reverse=False):
+        """Compute the last line of the NW score matrix of X[x0:x1] and Y[y0:y1]
+        into score[0:y1-y0+1] and return score. If reverse, both X[x0:x1] and
+        Y[y0:y1] are scanned backwards (i.e. the suffixes are scored)."""
+        if self.vectorised:
+            return self.NW_score_vector(x0, x1, y0, y1, score, reverse)
+        X, Y, jwf = self.X, self.Y, self.jwf
+        scoreI, scoreD = self.scoreI, self.scoreD
+        xs, ys = self.scan_ranges(x0, x1, y0, y1, reverse)
         # initialise first line (i = 0, X[i] = None)
-        for j in range(1, N2):
-            score[j] = score[j - 1] + self.jwf(None, Y[j])
-        # main loop (i, j)
-        for i in range(1, N1):
-            score_sub = score[0] # score[i - 1, j - 1]
-            score[0] = score[0] + self.jwf(X[i], None)
-            for j in range(1, N2):
-                scoreD = score[j]     + self.jwf(X[i], None) # score[i - 1, j]
-                scoreI = score[j - 1] + self.jwf(None, Y[j]) # score[i - 1, j]
-                scoreS = score_sub    + self.jwf(X[i], Y[j]) # score[i - 1, j - 1]
-                score_sub = score[j]
-                score[j] = max(scoreD, scoreI, scoreS)
+        score[0] = 0
+        for k, j in enumerate(ys, 1):
+            score[k] = score[k - 1] + scoreI[j]
+        # main loop (i, k)
+        for i in xs:
+            x, d = X[i], scoreD[i]
+            score_sub = score[0] # score[i - 1, k - 1]
+            score[0] = score[0] + d
+            for k, j in enumerate(ys, 1):
+                scoreD_ = score[k]     + d              # score[i - 1, k]
+                scoreI_ = score[k - 1] + scoreI[j]      # score[i, k - 1]
+                scoreS_ = score_sub    + jwf(x, Y[j])   # score[i - 1, k - 1]
+                score_sub = score[k]
+                score[k] = max(scoreD_, scoreI_, scoreS_)
         return score
     
-    def NW_align_unity_X(self, x, Y):
-        """NW alignment when len(X) = 1, x = X[0]."""
-        align = [(None, y) for y in Y]
-        gain_best, j_best = self.jwf(x, None), -1
-        for j, y in enumerate(Y):
-            gain = self.jwf(x, y) - self.jwf(None, y)
+    def NW_score_vector(self, x0, x1, y0, y1, score, reverse=False):
+        """Same as NW_score, one line at a time with the blocks of the scorer."""
+        N2 = y1 - y0
+        xs, ys = self.scan_ranges(x0, x1, y0, y1, reverse)
+        scoreI = self.vecI[y0:y1][::-1] if reverse else self.vecI[y0:y1]
+        line = score[:N2 + 1]
+        line[0] = 0
+        line[1:] = np.cumsum(scoreI)
+        scan = insertion_scan(scoreI)
+        for i, scoreS in self.substitution_lines(xs, y0, y1, reverse):
+            NW_line(line, line[0] + self.scoreD[i], scoreS, self.scoreD[i], scan)
+        return score
+    
+    def substitution_lines(self, xs, y0, y1, reverse=False, cells=2**16):
+        """Yield (i, [f(X[i], y) for y in Y[y0:y1]]) for i in xs, the lines
+        being reversed if reverse. The scorer is asked for blocks of about
+        the given number of cells."""
+        step = max(1, cells // max(1, y1 - y0))
+        for k in range(0, len(xs), step):
+            part = xs[k:k + step]
+            if len(part) == 0:
+                break
+            lo, hi = min(part[0], part[-1]), max(part[0], part[-1]) + 1
+            block = self.scorer.substitute(lo, hi, y0, y1)
+            if reverse:
+                block = block[::-1, ::-1]
+            yield from zip(part, block)
+    
+    def fits_in_budget(self, N1, N2):
+        """Return true if the direction matrix of an N1 x N2 subproblem fits in the memory budget."""
+        return self.memory_budget is not None and (N1 + 1) * (N2 + 1) <= self.memory_budget
+    
+    def NW_align(self, x0, x1, y0, y1):
+        """Full-matrix NW alignment of X[x0:x1] and Y[y0:y1] with traceback.
+        Each line of the score matrix is computed with vector operations,
+        only the directions (S, D or I) of all cells are stored."""
+        N1, N2 = x1 - x0, y1 - y0
+        scoreI = self.vecI[y0:y1]
+        scan = insertion_scan(scoreI)
+        direction = np.empty((N1 + 1, N2 + 1), dtype=np.uint8)
+        direction[0, :] = DIR_I
+        direction[:, 0] = DIR_D
+        # initialise first line (i = 0, X[i] = None)
+        score = np.concatenate(([0], np.cumsum(scoreI)))
+        for i, scoreS in enumerate((line for _, line in self.substitution_lines(range(x0, x1), y0, y1)), 1):
+            d = self.scoreD[x0 + i - 1]
+            up = score + d
+            diag = score[:-1] + scoreS
+            cand = np.empty(N2 + 1)
+            cand[0] = up[0]
+            cand[1:] = np.maximum(up[1:], diag)
+            direction[i, 1:] = np.where(up[1:] >= diag, DIR_D, DIR_S)
+            # insertions along the line: score[k] = max(cand[k], score[k - 1] + I[k]),
+            # with the exact scan so that the insertions are marked where they win
+            score = scan(cand.copy())
+            direction[i, 1:][score[:-1] + scoreI > cand[1:]] = DIR_I
+        # traceback
+        align = []
+        i, j = N1, N2
+        while i > 0 or j > 0:
+            move = direction[i, j]
+            if move == DIR_S:
+                align.append((x0 + i - 1, y0 + j - 1))
+                i, j = i - 1, j - 1
+            elif move == DIR_D:
+                align.append((x0 + i - 1, None))
+                i -= 1
+            else:
+                align.append((None, y0 + j - 1))
+                j -= 1
+        return align[::-1]
+    
+    def NW_align_unity_X(self, i, y0, y1):
+        """NW alignment when len(X) = 1, x = X[i]."""
+        x, Y = self.X[i], self.Y
+        align = [(None, j) for j in range(y0, y1)]
+        gain_best, j_best = self.scoreD[i], -1
+        for j in range(y0, y1):
+            gain = self.jwf(x, Y[j]) - self.scoreI[j]
             if gain > gain_best:
                 gain_best, j_best = gain, j
         if j_best == -1:
-            return [(x, None)] + align
-        align[j_best] = (x, Y[j_best])
+            return [(i, None)] + align
+        align[j_best - y0] = (i, j_best)
         return align
     
-    def NW_align_unity_Y(self, X, y):
-        """NW alignment when len(Y) = 1, y = Y[0]."""
-        align = self.NW_align_unity_X(y, X)
-        return [x[::-1] for x in align]
+    def NW_align_unity_Y(self, x0, x1, j):
+        """NW alignment when len(Y) = 1, y = Y[j] (X and Y swap roles)."""
+        y, X = self.Y[j], self.X
+        align = [(i, None) for i in range(x0, x1)]
+        gain_best, i_best = self.jwf(y, None), -1
+        for i in range(x0, x1):
+            gain = self.jwf(y, X[i]) - self.jwf(None, X[i])
+            if gain > gain_best:
+                gain_best, i_best = gain, i
+        if i_best == -1:
+            return [(None, j)] + align
+        align[i_best - x0] = (i_best, j)
+        return align
     
     def _type_check(self):
         assert isinstance(self.X, list)
@@ -84,6 +375,109 @@ class MyDiff:
         assert callable(self.jwf)
 
 
+def NW_line(score, first, scoreS, d, scan):
+    """Advance score from line i - 1 to line i of the NW score matrix in place.
+    args:
+        first - the new score[0]
+        scoreS - substitution scores of X[i] against the line
+        d - deletion score of X[i]
+        scan - insertion scan of the line (see insertion_scan)
+    """
+    cand = np.maximum(score[1:] + d, score[:-1] + scoreS)
+    score[0] = first
+    score[1:] = cand
+    return scan(score)
+
+def insertion_scan(scoreI):
+    """Return a function applying score[k] = max(score[k], score[k - 1] + I[k])
+    along a line in place. The result is exactly that of the sequential loop:
+    a running maximum when there is no insertion score, a running maximum
+    offset by the cumulated insertion scores when all values are integers
+    (hence exact), the loop itself otherwise."""
+    if not scoreI.any():
+        return lambda score: np.maximum.accumulate(score, out=score)
+    cumI = np.concatenate(([0], np.cumsum(scoreI)))
+    integral = is_integral(cumI)
+    increments = scoreI.tolist()
+    def scan(score):
+        if integral and is_integral(score):
+            score[:] = cumI + np.maximum.accumulate(score - cumI)
+            return score
+        line = score.tolist()
+        for k in range(1, len(line)):
+            v = line[k - 1] + increments[k - 1]
+            if v > line[k]:
+                line[k] = v
+        score[:] = line
+        return score
+    return scan
+
+def is_integral(a, limit=2**50):
+    """Return true if all values of a are integers small enough to be summed exactly."""
+    return bool(np.all(np.trunc(a) == a)) and float(np.abs(a).max(initial=0)) < limit
+
+
+# Worker tasks of MyDiff.Hirschberg_parallel. The MyDiff instance (with X, Y
+# and jwf) is set before the pool is forked, so it is passed to the workers
+# only once; the tasks only exchange index ranges, score lines and index pairs.
+_shared = None
+_buffers = None
+
+class _Ready:
+    """An already computed result (same interface as AsyncResult)."""
+    def __init__(self, value):
+        self.value = value
+    
+    def get(self):
+        return self.value
+
+def _score_task(args):
+    x0, x1, y0, y1, reverse = args
+    return _shared.NW_score(x0, x1, y0, y1, np.zeros(y1 - y0 + 1), reverse=reverse)
+
+def _align_task(rng):
+    return _shared.Hirschberg(*rng)
+
+def _tile_task(args):
+    """Compute rows (r0, r1] x columns (k0, k1] of pass p (see NW_score_wavefront).
+    Reads the boundary row top[k0+1:k1+1] and the boundary column left[off:],
+    whose first entry is the corner, and overwrites them with the last row and
+    the last column of the tile."""
+    p, x0, x1, y0, y1, reverse, r0, r1, off, k0, k1 = args
+    diff, (top, left) = _shared, _buffers[p]
+    X, Y, jwf = diff.X, diff.Y, diff.jwf
+    scoreI, scoreD = diff.scoreI, diff.scoreD
+    xs, ys = diff.scan_ranges(x0, x1, y0, y1, reverse)
+    ys = ys[k0:k1]
+    score = top[k0:k1 + 1].copy()
+    score[0] = left[off]
+    right = np.empty(r1 - r0 + 1)
+    right[0] = score[-1]
+    if diff.vectorised:
+        ya, yb = (y1 - k1, y1 - k0) if reverse else (y0 + k0, y0 + k1)
+        scan = insertion_scan(np.array([scoreI[j] for j in ys]))
+        for r, (i, scoreS) in enumerate(diff.substitution_lines(xs[r0:r1], ya, yb, reverse), 1):
+            NW_line(score, left[off + r], scoreS, scoreD[i], scan)
+            right[r] = score[-1]
+        top[k0 + 1:k1 + 1] = score[1:]
+        left[off:off + r1 - r0 + 1] = right
+        return
+    for r in range(1, r1 - r0 + 1):
+        i = xs[r0 + r - 1]
+        x, d = X[i], scoreD[i]
+        score_sub = score[0]
+        score[0] = left[off + r]
+        for k, j in enumerate(ys, 1):
+            scoreD_ = score[k]     + d
+            scoreI_ = score[k - 1] + scoreI[j]
+            scoreS_ = score_sub    + jwf(x, Y[j])
+            score_sub = score[k]
+            score[k] = max(scoreD_, scoreI_, scoreS_)
+        right[r] = score[-1]
+    top[k0 + 1:k1 + 1] = score[1:]
+    left[off:off + r1 - r0 + 1] = right
+
+
 if __name__ == '__main__':
     def jwf(x, y):
         if x is None or y is None:
@@ -0,0 +1,85 @@
+# Per-page bit masks of the area covered by BBoxes
+#
+# The boxes of a page are rasterised into a boolean mask of the page (the
+# union of the boxes, so overlapping boxes are counted once). A box covers
+# the pixels x0 <= x < x1, y0 <= y < y1, as in Coords.area. The masks are
+# painted with a 2D difference array: +1/-1 at the four corners of every
+# box, then two cumulative sums, so the cost is O(pixels + boxes) whatever
+# the overlaps. With step > 1 the page is downsampled (the coordinates are
+# rounded to the nearest multiple of step) and each cell counts for
+# step * step pixels.
+
+import numpy as np
+
+DEFAULT_PAGE = (1654, 2339) # A4 at 200 dpi (the pdf2image default)
+
+class PageMasks:
+    """Rasteriser of BBoxes into one bit mask per page.
+    args:
+        pages - dict page -> (width, height)
+        step - downsampling factor (1 for the full resolution)
+    """
+    def __init__(self, pages, step=1):
+        self.pages = dict(pages)
+        self.step = step
+
+    def shape(self, page):
+        """Return the (rows, cols) of the mask of a page."""
+        width, height = self.pages[page]
+        return (-(-height // self.step), -(-width // self.step))
+
+    def rasterise(self, bbox_groups):
+        """Return dict page -> bool mask of the area covered by the BBoxes
+        (every page of self.pages has a mask, boxes on other pages are
+        ignored)."""
+        boxes = self.page_boxes(bbox_groups)
+        return {page: self.paint(page, coords) for page, coords in boxes.items()}
+
+    def page_boxes(self, bbox_groups):
+        """Return dict page -> list of the (x0, y0, x1, y1) of its boxes."""
+        boxes = {page: [] for page in self.pages}
+        for group in bbox_groups:
+            for page, coords in group.rects():
+                if page in boxes:
+                    boxes[page].append(coords)
+        return boxes
+
+    def paint(self, page, coords):
+        """Return the mask of a page covered by the boxes (x0, y0, x1, y1)."""
+        rows, cols = self.shape(page)
+        diff = np.zeros((rows + 1, cols + 1), dtype=np.int32)
+        if len(coords):
+            c = np.rint(np.asarray(coords, dtype=float) / self.step).astype(np.int64)
+            x0, x1 = np.clip(c[:, 0], 0, cols), np.clip(c[:, 2], 0, cols)
+            y0, y1 = np.clip(c[:, 1], 0, rows), np.clip(c[:, 3], 0, rows)
+            keep = (x0 < x1) & (y0 < y1)
+            x0, x1, y0, y1 = x0[keep], x1[keep], y0[keep], y1[keep]
+            np.add.at(diff, (y0, x0), 1)
+            np.add.at(diff, (y0, x1), -1)
+            np.add.at(diff, (y1, x0), -1)
+            np.add.at(diff, (y1, x1), 1)
+        cover = diff.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+        return cover[:rows, :cols] > 0
+
+    def confusion(self, ref, hyp):
+        """Return dict page -> dict(TP, FP, FN, TN) in pixels, for the
+        BBoxGroups ref (the truth) and hyp. The pages are painted one at a
+        time, so the memory is that of one page."""
+        ref_boxes, hyp_boxes = self.page_boxes(ref), self.page_boxes(hyp)
+        unit = self.step * self.step
+        counts = {}
+        for page in sorted(self.pages):
+            r, h = self.paint(page, ref_boxes[page]), self.paint(page, hyp_boxes[page])
+            TP = int(np.count_nonzero(r & h))
+            FP = int(np.count_nonzero(h)) - TP
+            FN = int(np.count_nonzero(r)) - TP
+            TN = r.size - TP - FP - FN
+            counts[page] = dict(TP=TP * unit, FP=FP * unit, FN=FN * unit, TN=TN * unit)
+        return counts
+
+
+def default_pages(*bbox_groups):
+    """Return DEFAULT_PAGE for the pages 1..last page of the BBoxes (when
+    the OCR does not know the page sizes)."""
+    last = max((page for groups in bbox_groups for group in groups for page in group.pages()), default=0)
+    return {page: DEFAULT_PAGE for page in range(1, last + 1)}
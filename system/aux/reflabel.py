@@ -1,5 +1,6 @@
-import os, time, json
-from ..elements.Match import Matches
+import os, time
+from ..elements.Match import LazyMatches
+from . import binstore
 
 class RefLabel:
     def __init__(self, filename):
@@ -11,6 +12,5 @@ class RefLabel:
         self.cache_key = time.asctime(time.gmtime(os.path.getmtime(self.path)))
     
     def reopen(self):
-        with open(self.path, 'r') as fin:
-            self.filebuf = Matches(json.load(fin), from_obj=True)
+        self.filebuf = LazyMatches(binstore.read_obj(self.path))
         self.update_cache_key()
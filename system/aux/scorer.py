@@ -0,0 +1,60 @@
+# Vectorised score functions for MyDiff
+#
+# A Scorer is a joint weight function f(x, y) (see mydiff.py) which can also
+# score whole blocks at once. It is bound to X and Y by prepare(X, Y), after
+# which items are referred to by their indices:
+#
+#      insert(y0, y1)             : [f(None, y) for y in Y[y0:y1]]     (I)
+#      delete(x0, x1)             : [f(x, None) for x in X[x0:x1]]     (D)
+#      substitute(x0, x1, y0, y1) : [[f(x, y) for y in Y[y0:y1]]
+#                                              for x in X[x0:x1]]      (S)
+#
+# Calling a Scorer as f(x, y) still works, so a Scorer can be passed wherever
+# a jwf is expected. JWFScorer adapts a plain jwf to the protocol.
+
+import numpy as np
+
+class Scorer:
+    """Super class for all vectorised score functions."""
+
+    def prepare(self, X, Y):
+        """Bind the scorer to X and Y."""
+        self.X, self.Y = X, Y
+
+    def insert(self, y0, y1):
+        return np.array([self(None, self.Y[j]) for j in range(y0, y1)], dtype=float)
+
+    def delete(self, x0, x1):
+        return np.array([self(self.X[i], None) for i in range(x0, x1)], dtype=float)
+
+    def substitute(self, x0, x1, y0, y1):
+        block = [[self(self.X[i], self.Y[j]) for j in range(y0, y1)] for i in range(x0, x1)]
+        return np.array(block, dtype=float).reshape(x1 - x0, y1 - y0)
+
+    def __call__(self, x, y):
+        raise NotImplementedError
+
+
+class JWFScorer(Scorer):
+    """Adapter from a scalar jwf f(x, y) to the Scorer protocol."""
+
+    def __init__(self, jwf):
+        assert callable(jwf)
+        self.jwf = jwf
+
+    def __call__(self, x, y):
+        return self.jwf(x, y)
+
+
+def intern(*sequences, key=lambda w: w, vocab=None):
+    """Map the tokens of several sequences to shared integer ids.
+    args:
+        vocab - dict from token to id to be extended, None for a new one
+    returns:
+        ids - list of int arrays, one per sequence
+        vocab - dict from token to id
+    """
+    vocab, ids = {} if vocab is None else vocab, []
+    for seq in sequences:
+        ids.append(np.array([vocab.setdefault(key(w), len(vocab)) for w in seq], dtype=np.int64))
+    return ids, vocab
@@ -0,0 +1,116 @@
+# Time <-> BBoxGroup synchronisation index
+#
+# Built once from the Matches returned by an Align instance, the index answers
+#
+#      time -> group : which BBoxGroup is being discussed at time t    O(log n)
+#      group -> time : the TIntervalGroup (and page/coords) of a group O(1)
+#
+# without touching the alignment objects, so that a player can highlight the
+# slides in real time. All times are stored as integer milliseconds, which
+# keeps the index lossless and JSON-serialisable.
+
+import bisect, heapq, json
+from ..elements.TStamp import TStamp
+from ..elements.TInterval import TInterval, TIntervalGroup
+
+class SyncIndex:
+    """Synchronisation index between time and BBoxGroups.
+    attributes:
+        bounds - [list] sorted segment boundaries in milliseconds
+        seg_gids - [list] group id of segment [bounds[k], bounds[k+1]), -1 if none
+        groups - [list] per-group dict with 'intervals' and 'rects'
+    """
+
+    def __init__(self, matches=(), from_obj=False):
+        if from_obj:
+            self.bounds = list(matches['bounds'])
+            self.seg_gids = list(matches['seg_gids'])
+            self.groups = list(matches['groups'])
+        else:
+            self.build(matches)
+        self._type_check()
+
+    def build(self, matches):
+        """Build the index from a Matches object."""
+        self.groups = []
+        events = []
+        for gid, match in enumerate(matches):
+            intervals = [(to_msec(x.start), to_msec(x.end)) for x in match.tinterval_group]
+            rects = [(x.page, *x.coords.to_tuple()) for x in match.bbox_group]
+            self.groups.append(dict(intervals=intervals, rects=rects))
+            for start, end in intervals:
+                if start < end:
+                    events.append((start, end, gid))
+        # split the time axis into elementary segments, each of which is
+        # assigned to the latest-starting interval covering it (the largest
+        # (start, end, gid)): a sweep over the sorted starts with a max-heap
+        # of the started intervals, those which have ended being dropped
+        # when they reach the top, so the cost is O(n log n)
+        self.bounds = sorted(set(x for start, end, _ in events for x in (start, end)))
+        self.seg_gids = []
+        events.sort()
+        active, k = [], 0
+        for b0 in self.bounds[:-1]:
+            while k < len(events) and events[k][0] <= b0:
+                start, end, gid = events[k]
+                heapq.heappush(active, (-start, -end, -gid))
+                k += 1
+            while active and -active[0][1] <= b0:
+                heapq.heappop(active)
+            self.seg_gids.append(-active[0][2] if active else -1)
+
+    def group_at(self, ts):
+        """Return the group id at time ts (seconds or TStamp), -1 if none."""
+        msec = to_msec(ts) if isinstance(ts, TStamp) else round(ts * 1000) # e.g. 1.017 * 1000 < 1017
+        k = bisect.bisect_right(self.bounds, msec) - 1
+        if k == len(self.seg_gids) and msec == self.bounds[-1]:
+            k -= 1 # the ending boundary is inclusive
+        if k < 0 or k >= len(self.seg_gids):
+            return -1
+        return self.seg_gids[k]
+
+    def intervals(self, gid):
+        """Return the TIntervalGroup of group gid."""
+        group = self.groups[gid]['intervals']
+        return TIntervalGroup([TInterval(from_msec(a), from_msec(b)) for a, b in group])
+
+    def start_of(self, gid):
+        """Return the earliest starting time (in seconds) of group gid, None if empty."""
+        group = self.groups[gid]['intervals']
+        if len(group) == 0:
+            return None
+        return min(a for a, b in group) / 1000
+
+    def rects(self, gid):
+        """Return a list of (page, x0, y0, x1, y1) tuples of group gid."""
+        return [tuple(x) for x in self.groups[gid]['rects']]
+
+    def to_obj(self):
+        groups = [dict(intervals=[list(x) for x in g['intervals']], rects=[list(x) for x in g['rects']]) for g in self.groups]
+        return dict(bounds=self.bounds, seg_gids=self.seg_gids, groups=groups)
+
+    def save(self, path):
+        with open(path, 'w') as fout:
+            json.dump(self.to_obj(), fout)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'r') as fin:
+            return SyncIndex(json.load(fin), from_obj=True)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def _type_check(self):
+        if len(self.seg_gids) != max(0, len(self.bounds) - 1):
+            raise ValueError('seg_gids should have one entry per segment')
+
+
+def to_msec(ts):
+    """Convert a TStamp object to integer milliseconds."""
+    return ts.min*60000 + ts.sec*1000 + ts.msec
+
+
+def from_msec(msec):
+    """Convert integer milliseconds to a TStamp object."""
+    return TStamp(min=msec // 60000, sec=(msec // 1000) % 60, msec=msec % 1000)
@@ -0,0 +1,158 @@
+# Span tracing of the pipeline stages
+#
+# A span is a named, timed section of code:
+#
+#      with trace.span('MyDiff.split', cells=n):
+#          ...
+#
+#      @trace.traced()         # span named after the function
+#      def process(self): ...
+#
+# Spans nest per thread: each records its parent's depth, and its time is
+# subtracted from the self time of its parent. Tracing is off by default,
+# in which case span() returns a shared no-op context manager, so an
+# instrumented stage costs one function call. Only the spans of the current
+# process are recorded (not those of the pool workers).
+#
+# The recorded spans can be exported as trace-event JSON (chrome://tracing,
+# Perfetto) or summarised by name (count, total, self, mean and max times).
+
+import json, os, threading, time
+
+enabled = False
+_events = []
+_local = threading.local()
+_origin = time.perf_counter()
+
+def enable():
+    """Start recording spans (clearing the recorded ones)."""
+    global enabled, _origin
+    del _events[:]
+    _origin = time.perf_counter()
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def span(name, **args):
+    """Return a context manager timing a span (no-op when disabled)."""
+    if not enabled:
+        return _NULL
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator wrapping every call of a function in a span."""
+    def decorator(f):
+        label = name or f.__qualname__
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return f(*args, **kwargs)
+            with _Span(label, {}):
+                return f(*args, **kwargs)
+        wrapper.__name__, wrapper.__qualname__, wrapper.__doc__ = f.__name__, f.__qualname__, f.__doc__
+        wrapper.__wrapped__ = f
+        return wrapper
+    return decorator
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _Null()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name, self.args = name, args
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+        self.children = 0.0
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        duration = end - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        _events.append(dict(name=self.name, start=self.start - _origin, duration=duration,
+            self_time=duration - self.children, depth=self.depth, pid=os.getpid(),
+            tid=threading.get_ident(), args=self.args))
+        return False
+
+
+def events():
+    """Return the recorded spans, as dicts (times in seconds)."""
+    return list(_events)
+
+
+def export_chrome(path):
+    """Write the recorded spans as trace-event JSON (complete events)."""
+    trace = [dict(name=e['name'], ph='X', ts=e['start'] * 1e6, dur=e['duration'] * 1e6,
+        pid=e['pid'], tid=e['tid'], args={k: str(v) for k, v in e['args'].items()}) for e in _events]
+    with open(path, 'w') as f:
+        json.dump(dict(traceEvents=trace, displayTimeUnit='ms'), f)
+
+
+def summary():
+    """Return one row per span name, by decreasing total time.
+    returns:
+        rows - list of dict(name, count, total, self, mean, max), times in seconds
+    """
+    rows = {}
+    for e in _events:
+        row = rows.setdefault(e['name'], dict(name=e['name'], count=0, total=0.0, self=0.0, max=0.0))
+        row['count'] += 1
+        row['total'] += e['duration']
+        row['self'] += e['self_time']
+        row['max'] = max(row['max'], e['duration'])
+    for row in rows.values():
+        row['mean'] = row['total'] / row['count']
+    return sorted(rows.values(), key=lambda row: -row['total'])
+
+
+def format_summary():
+    """Return the summary as a text table (times in milliseconds)."""
+    lines = ['%-32s %8s %10s %10s %10s %10s' % ('span', 'count', 'total', 'self', 'mean', 'max')]
+    for row in summary():
+        lines.append('%-32s %8d %10.1f %10.1f %10.2f %10.1f' % (row['name'][:32], row['count'],
+            row['total'] * 1000, row['self'] * 1000, row['mean'] * 1000, row['max'] * 1000))
+    return '\n'.join(lines)
+
+
+class TracedCache:
+    """Wrapper of a cache recording the lookups ('cache.get') and the
+    stores ('cache.put') as spans."""
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getitem__(self, key):
+        with span('cache.get', key=key):
+            return self.cache[key]
+
+    def __setitem__(self, key, value):
+        with span('cache.put', key=key):
+            self.cache[key] = value
+
+    def __getattr__(self, name):
+        if name == 'cache': # not set yet (e.g. while unpickling)
+            raise AttributeError(name)
+        return getattr(self.cache, name)
@@ -0,0 +1,260 @@
+# Batch processing of many lectures
+#
+# usage: python -m <package>.system.batch [lecture ...] [options]
+#
+# The lectures are discovered from data/*.pdf and audio/*.mp3. Each lecture
+# needs up to three stages, run by the backends chosen with --ocr, --speech
+# and --align (see subsystems/registry.py):
+#
+#      ocr    : OCR on data/<name>.pdf (CPU-bound, worker processes)
+#      speech : speech recognition on audio/<name>.mp3 (I/O-bound, threads)
+#      align  : alignment, once ocr and speech are done (CPU-bound, worker
+#               processes)
+#
+# A stage is planned unless its result is in the cache (it is then recorded
+# as done); a stage recorded as done whose result has left the cache is run
+# again. Every stage type has its own concurrency limit,
+# and a stage starts as soon as its dependencies are done, so the OCR of a
+# lecture overlaps with the speech recognition and alignment of others.
+#
+# The workers do not write the cache: a stage runs with a CacheOverlay and
+# returns the entries it wrote, which the main process puts in the global
+# cache before recording the stage as done. The job state file is rewritten
+# (atomically) after every stage, so an interrupted batch resumes without
+# redoing the finished stages; failed stages are run again.
+
+from .subsystems import registry
+from .cache.Cache import global_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import argparse, glob, json, multiprocessing, os, time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+STAGES = ('ocr', 'speech', 'align')
+DEPENDS = dict(ocr=(), speech=(), align=('ocr', 'speech'))
+INPUTS = dict(ocr=('pdf',), speech=('mp3',), align=('pdf', 'mp3'))
+
+def discover(root=ROOT):
+    """Return a dict from lecture name to the set of its inputs ('pdf', 'mp3')."""
+    lectures = {}
+    for kind, pattern in (('pdf', 'data/*.pdf'), ('mp3', 'audio/*.mp3')):
+        for path in glob.glob(os.path.join(root, pattern)):
+            name = os.path.splitext(os.path.basename(path))[0]
+            lectures.setdefault(name, set()).add(kind)
+    return lectures
+
+
+def make_stage(stage, lecture, lang='eng', scale='par', backends=None):
+    """Return the subsystem running a stage of a lecture.
+    args:
+        backends - dict from 'ocr', 'speech' and 'align' to the name of the
+                   backend (see registry), the defaults if missing
+    """
+    backends = backends or {}
+    ocr = lambda: registry.create('ocr', backends.get('ocr'), lecture, scale=scale, lang=lang)
+    speech = lambda: registry.create('speech', backends.get('speech'), lecture)
+    if stage == 'ocr':
+        return ocr()
+    if stage == 'speech':
+        return speech()
+    return registry.create('align', backends.get('align'), ocr(), speech())
+
+
+def stage_key(subsystem):
+    """Return the cache key of the result of a stage (for the OCR, the key
+    of the raw obj, which does not depend on the scale)."""
+    return getattr(subsystem, 'cache_key_obj', subsystem.cache_key)
+
+
+def run_stage(stage, lecture, lang, scale, backends, entries):
+    """Run a stage of a lecture (in a worker).
+    args:
+        entries - cache entries the stage reads (the results of its dependencies)
+    returns:
+        written - dict of the cache entries written by the stage
+    """
+    cache = CacheOverlay(global_cache, entries)
+    subsystem = make_stage(stage, lecture, lang, scale, backends)
+    subsystem.cache = cache
+    if stage == 'align':
+        subsystem.ocr.cache = subsystem.speech.cache = cache
+    subsystem.process()
+    return cache.written
+
+
+class CacheOverlay:
+    """A cache which reads from its writes, then entries, then base, and
+    keeps its writes to itself."""
+    def __init__(self, base, entries=None):
+        self.base = base
+        self.entries = dict(entries or {})
+        self.written = {}
+
+    def __contains__(self, key):
+        return key in self.written or key in self.entries or key in self.base
+
+    def __getitem__(self, key):
+        if key in self.written:
+            return self.written[key]
+        if key in self.entries:
+            return self.entries[key]
+        return self.base[key]
+
+    def __setitem__(self, key, value):
+        self.written[key] = value
+
+
+class Batch:
+    """Resumable processing of many lectures on pools of workers.
+    args:
+        lectures - lecture names, None for all the discovered ones
+        state_path - JSON file of the job state
+        limits - dict from stage to its maximum number of concurrent jobs
+        lang, scale - OCR params (see OCRTess)
+        backends - dict from stage to the name of its backend (see make_stage)
+    """
+    def __init__(self, lectures=None, state_path=None, limits=None, lang='eng', scale='par', backends=None):
+        found = discover()
+        self.lectures = sorted(found) if lectures is None else list(lectures)
+        self.inputs = {lecture: found.get(lecture, set()) for lecture in self.lectures}
+        self.state_path = state_path or os.path.join(ROOT, 'batch_state.json')
+        cpus = os.cpu_count() or 1
+        self.limits = dict(ocr=cpus, speech=8, align=cpus)
+        self.limits.update(limits or {})
+        self.lang, self.scale = lang, scale
+        self.backends = dict(backends or {})
+        self.cache = global_cache
+        self.state = self.load_state()
+
+    def load_state(self):
+        """Return the job state: dict lecture -> dict stage -> 'done' or the error."""
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self):
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def is_done(self, lecture, stage):
+        return self.state.get(lecture, {}).get(stage) == 'done'
+
+    def record(self, lecture, stage, status):
+        """Record the status of a stage in the job state file."""
+        self.state.setdefault(lecture, {})[stage] = status
+        self.save_state()
+
+    def key(self, lecture, stage):
+        return stage_key(make_stage(stage, lecture, self.lang, self.scale, self.backends))
+
+    def plan(self):
+        """Return the list of (lecture, stage) to run. Stages whose result is
+        in the cache are recorded as done, the others are run (even if the
+        state records them as done: their result has left the cache)."""
+        jobs = []
+        for lecture in self.lectures:
+            for stage in self.planned(lecture):
+                if self.key(lecture, stage) in self.cache:
+                    self.state.setdefault(lecture, {})[stage] = 'done'
+                    continue
+                self.state.get(lecture, {}).pop(stage, None)
+                jobs.append((lecture, stage))
+        self.save_state()
+        return jobs
+
+    def entries(self, lecture, stage):
+        """Return the cache entries of the dependencies of a stage."""
+        keys = [self.key(lecture, dep) for dep in DEPENDS[stage]]
+        return {key: self.cache[key] for key in keys}
+
+    def run(self):
+        """Run all planned stages, return the list of (lecture, stage) not done."""
+        jobs = self.plan()
+        total = len(jobs)
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            context = None
+        cpu_workers = min(os.cpu_count() or 1, self.limits['ocr'] + self.limits['align'])
+        cpu_pool = ProcessPoolExecutor(max_workers=max(1, cpu_workers), mp_context=context)
+        io_pool = ThreadPoolExecutor(max_workers=max(1, self.limits['speech']))
+        running = {} # future -> (lecture, stage, start time)
+        count = dict.fromkeys(STAGES, 0)
+        finished = 0
+        try:
+            while jobs or running:
+                for job in list(jobs):
+                    lecture, stage = job
+                    if count[stage] >= self.limits[stage]:
+                        continue
+                    if not all(self.is_done(lecture, dep) for dep in DEPENDS[stage]):
+                        continue
+                    jobs.remove(job)
+                    try:
+                        entries = self.entries(lecture, stage)
+                    except Exception as e: # e.g. a dependency evicted from the cache
+                        finished += 1
+                        self.record(lecture, stage, error(e))
+                        print('[%d/%d] %s %s: %s' % (finished, total, lecture, stage, error(e)))
+                        continue
+                    pool = io_pool if stage == 'speech' else cpu_pool
+                    args = (stage, lecture, self.lang, self.scale, self.backends, entries)
+                    running[pool.submit(run_stage, *args)] = (lecture, stage, time.time())
+                    count[stage] += 1
+                if not running: # the rest depends on failed stages
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    lecture, stage, begin = running.pop(future)
+                    count[stage] -= 1
+                    finished += 1
+                    try:
+                        for key, value in future.result().items():
+                            self.cache[key] = value
+                        status = 'done'
+                    except Exception as e:
+                        status = error(e)
+                    self.record(lecture, stage, status)
+                    print('[%d/%d] %s %s: %s (%.1fs)' % (finished, total, lecture, stage, status, time.time() - begin))
+        finally:
+            cpu_pool.shutdown(wait=False, cancel_futures=True)
+            io_pool.shutdown(wait=False, cancel_futures=True)
+        return [(lecture, stage) for lecture in self.lectures for stage in STAGES
+            if stage in self.planned(lecture) and not self.is_done(lecture, stage)]
+
+    def planned(self, lecture):
+        """Return the stages a lecture has the inputs for."""
+        return [stage for stage in STAGES if all(kind in self.inputs[lecture] for kind in INPUTS[stage])]
+
+
+def error(e):
+    """Return the status of a stage which raised e."""
+    return '%s: %s' % (type(e).__name__, e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process many lectures (OCR, speech and alignment).')
+    parser.add_argument('lectures', nargs='*', help='lecture names (default: all in data/ and audio/)')
+    parser.add_argument('--state', default=None, help='job state file (default: batch_state.json)')
+    parser.add_argument('--ocr-workers', type=int, default=None, help='concurrent OCR jobs (default: CPU count)')
+    parser.add_argument('--speech-workers', type=int, default=None, help='concurrent speech jobs (default: 8)')
+    parser.add_argument('--align-workers', type=int, default=None, help='concurrent alignment jobs (default: CPU count)')
+    parser.add_argument('--lang', default='eng')
+    parser.add_argument('--scale', default='par')
+    for kind in ('ocr', 'speech', 'align'):
+        parser.add_argument('--' + kind, default=None, choices=registry.names(kind),
+            help='%s backend (default: %s)' % (kind, registry.DEFAULTS[kind]))
+    args = parser.parse_args(argv)
+    limits = dict(ocr=args.ocr_workers, speech=args.speech_workers, align=args.align_workers)
+    limits = {k: v for k, v in limits.items() if v is not None}
+    backends = dict(ocr=args.ocr, speech=args.speech, align=args.align)
+    batch = Batch(args.lectures or None, args.state, limits, lang=args.lang, scale=args.scale, backends=backends)
+    left = batch.run()
+    for lecture, stage in left:
+        print('not done: %s %s (%s)' % (lecture, stage, batch.state.get(lecture, {}).get(stage, 'blocked')))
+    return 1 if left else 0
+
+if __name__ == '__main__':
+    exit(main())
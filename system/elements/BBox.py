@@ -1,4 +1,5 @@
 from .Coords import Coords
+from .LazyList import LazyList
 from uuid import uuid4
 import re
 
@@ -17,19 +18,23 @@ class BBox:
         else:
             self.coords = coords
         self.page = page
-        self.id = str(uuid4())
+        self._id = None
         self._type_check()
 
+    @property
+    def id(self):
+        """Unique id of the bbox (generated on first access)."""
+        if self._id is None:
+            self._id = str(uuid4())
+        return self._id
+
     def area(self):
         """Return the area of the bbox."""
         return self.coords.area()
 
     def words(self):
         """Convert text to a list of BBoxWord objects and return the list."""
-        text = self.text
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = text.lower()
-        return list(map(BBoxWord, text.split()))
+        return text_words(self.text)
     
     def set_text(self, text):
         assert isinstance(text, str)
@@ -77,12 +82,24 @@ class BBoxGroup(list):
     def words(self):
         """Convert text to a list of BBoxWord objects and return the list."""
         res = []
-        for elem in self:
-            res.extend(elem.words())
+        for text in self.texts():
+            res.extend(text_words(text))
         for i, elem in enumerate(res):
             elem.info.wid = i
         return res
     
+    def pages(self):
+        """Return the page of each bbox."""
+        return [x.page for x in self]
+    
+    def texts(self):
+        """Return the text of each bbox."""
+        return [x.text for x in self]
+    
+    def rects(self):
+        """Return the (page, (x0, y0, x1, y1)) of each bbox."""
+        return [(x.page, x.coords.to_tuple()) for x in self]
+    
     def area(self):
         return sum(x.area() for x in self)
     
@@ -111,6 +128,43 @@ class BBoxGroup(list):
         return ret
 
 
+class LazyBBoxGroup(LazyList, BBoxGroup):
+    """A BBoxGroup which keeps the stored objs and only builds
+    a BBox object when it is accessed (the result is cached).
+    The pages, texts and rects are read without building the BBoxes."""
+
+    def _build(self, obj):
+        return BBox(**obj, from_obj=True)
+
+    def pages(self):
+        """Return the page of each bbox without building them."""
+        return [x.page if built else x['page'] for x, built in self.stored()]
+
+    def texts(self):
+        """Return the text of each bbox without building them."""
+        return [x.text if built else x['text'] for x, built in self.stored()]
+
+    def rects(self):
+        """Return the (page, (x0, y0, x1, y1)) of each bbox without building them."""
+        rects = []
+        for x, built in self.stored():
+            if built:
+                rects.append((x.page, x.coords.to_tuple()))
+            else:
+                c = x['coords'] # ordered as Coords does
+                rects.append((x['page'], (min(c['x0'], c['x1']), min(c['y0'], c['y1']), max(c['x0'], c['x1']), max(c['y0'], c['y1']))))
+        return rects
+
+    def page_range(self):
+        pages = self.pages()
+        if len(pages) == 0:
+            return (0, -1)
+        return (pages[0], pages[-1])
+
+    def to_obj(self):
+        return [x.to_obj() if built else x for x, built in self.stored()]
+
+
 class BBoxGroups(list):
     """A List of BBoxGroup objects."""
     
@@ -143,6 +197,9 @@ class BBoxGroups(list):
             return (0, -1)
         return (self[0].page_range()[0], self[-1].page_range()[-1])
     
+    def to_obj(self):
+        return list(map(lambda x: x.to_obj(), self))
+    
     def __and__(self, other):
         ret = 0
         for gx in self:
@@ -154,6 +211,13 @@ class BBoxGroups(list):
         return ret
 
 
+def text_words(text):
+    """Convert text to a list of BBoxWord objects and return the list."""
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = text.lower()
+    return list(map(BBoxWord, text.split()))
+
+
 class BBoxWordInfo:
     def __init__(self, gid=None, wid=None, glen=None, relpos=None):
         """gid: group id
@@ -0,0 +1,72 @@
+class LazyList(list):
+    """A list of stored objs, each built into its element (see _build) when
+    it is first read; the element then replaces the obj. A call which changes
+    the list (append, insert, del, sort, ...) or compares it first builds all
+    the elements, after which it behaves as a plain list.
+    attributes:
+        _built - [list] whether each position holds a built element,
+                 None once all the elements are built
+    """
+    _built = None
+
+    def __init__(self, objs=()):
+        list.__init__(self, objs)
+        self._built = [False] * len(self)
+
+    def _build(self, obj):
+        """Return the element of a stored obj."""
+        raise NotImplementedError
+
+    def _item(self, index):
+        built = self._built
+        if built is not None and not built[index]:
+            list.__setitem__(self, index, self._build(list.__getitem__(self, index)))
+            built[index] = True
+        return list.__getitem__(self, index)
+
+    def hydrate(self):
+        """Build all the elements and return self."""
+        if self._built is not None:
+            for i in range(len(self)):
+                self._item(i)
+            self._built = None
+        return self
+
+    def stored(self):
+        """Return the (item, built) pairs without building anything: the item
+        is the element if built, its stored obj otherwise."""
+        if self._built is None:
+            return [(x, True) for x in list.__iter__(self)]
+        return list(zip(list.__iter__(self), self._built))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        return self._item(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._item(i)
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self._item(i)
+
+
+def _hydrating(name):
+    method = getattr(list, name)
+    def wrapper(self, *args, **kwargs):
+        self.hydrate()
+        for arg in args:
+            if isinstance(arg, LazyList):
+                arg.hydrate()
+        return method(self, *args, **kwargs)
+    wrapper.__name__, wrapper.__qualname__ = name, 'LazyList.' + name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend', 'insert',
+              'pop', 'remove', 'clear', 'sort', 'reverse', 'index', 'count', 'copy', '__contains__',
+              '__add__', '__mul__', '__rmul__', '__eq__', '__ne__', '__lt__', '__le__', '__gt__',
+              '__ge__', '__repr__'):
+    setattr(LazyList, _name, _hydrating(_name))
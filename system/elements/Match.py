@@ -1,4 +1,5 @@
-from .BBox import BBoxGroup, BBoxGroups
+from .BBox import BBoxGroup, BBoxGroups, LazyBBoxGroup
+from .LazyList import LazyList
 from .TInterval import TIntervalGroup
 
 class Match:
@@ -31,6 +32,66 @@ class Match:
         if not isinstance(self.tinterval_group, TIntervalGroup):
             raise TypeError('tinterval_group should be a TIntervalGroup object')
 
+class LazyMatch(Match):
+    """A Match built from its stored obj, whose bbox_group and
+    tinterval_group are only built when they are accessed."""
+
+    def __init__(self, obj):
+        self._obj = obj
+        self._bbox_group = self._tinterval_group = None
+        self._type_check()
+
+    @property
+    def bbox_group(self):
+        if self._bbox_group is None:
+            self._bbox_group = LazyBBoxGroup(self._obj['bbox_group'])
+        return self._bbox_group
+
+    @bbox_group.setter
+    def bbox_group(self, value):
+        self._bbox_group = value
+        self._type_check()
+
+    @property
+    def tinterval_group(self):
+        if self._tinterval_group is None:
+            self._tinterval_group = TIntervalGroup(self._obj['tinterval_group'], from_obj=True)
+        return self._tinterval_group
+
+    @tinterval_group.setter
+    def tinterval_group(self, value):
+        self._tinterval_group = value
+        self._type_check()
+
+    def pages(self):
+        """Return the page of each bbox without building them."""
+        group = self.bbox_group
+        if isinstance(group, LazyBBoxGroup):
+            return group.pages()
+        return [x.page for x in group]
+
+    def to_obj(self):
+        return dict(
+            bbox_group=self._obj['bbox_group'] if self._bbox_group is None else self._bbox_group.to_obj(),
+            tinterval_group=self._obj['tinterval_group'] if self._tinterval_group is None else self._tinterval_group.to_obj()
+        )
+
+    def _type_check(self):
+        """Same as Match._type_check, the parts not built yet are checked in the stored obj."""
+        if not isinstance(self._obj, dict):
+            raise TypeError('obj should be a dict')
+        if self._bbox_group is None:
+            if not isinstance(self._obj.get('bbox_group'), list):
+                raise TypeError('bbox_group should be a list of objs')
+        elif not isinstance(self._bbox_group, BBoxGroup):
+            raise TypeError('bbox_group should be a BBoxGroup object')
+        if self._tinterval_group is None:
+            if not isinstance(self._obj.get('tinterval_group'), list):
+                raise TypeError('tinterval_group should be a list of objs')
+        elif not isinstance(self._tinterval_group, TIntervalGroup):
+            raise TypeError('tinterval_group should be a TIntervalGroup object')
+
+
 class Matches(list):
     """List of Match objects."""
 
@@ -44,4 +105,30 @@ class Matches(list):
         return list(map(lambda x: x.to_obj(), self))
     
     def get_bbox_groups(self):
-        return BBoxGroups(map(lambda x: x.bbox_group, self), from_obj=False)
\ No newline at end of file
+        return BBoxGroups(map(lambda x: x.bbox_group, self), from_obj=False)
+
+class LazyMatches(LazyList, Matches):
+    """Matches built from stored objs (as returned by Matches.to_obj), whose
+    elements are only built when they are accessed (the result is cached)."""
+
+    def _build(self, obj):
+        return LazyMatch(obj)
+
+    def get_bbox_groups(self):
+        """Same as Matches.get_bbox_groups, but the groups are not copied,
+        so their BBoxes are not built."""
+        groups = BBoxGroups()
+        list.extend(groups, (x.bbox_group for x in self))
+        return groups
+
+    def page_rects(self, page):
+        """Return a list of (gid, bid, Coords) of all bboxes on the page."""
+        rects = []
+        for gid, match in enumerate(self):
+            for bid, p in enumerate(match.pages()):
+                if p == page:
+                    rects.append((gid, bid, match.bbox_group[bid].coords))
+        return rects
+
+    def to_obj(self):
+        return [x.to_obj() if built else x for x, built in self.stored()]
@@ -0,0 +1,65 @@
+# Import-time benchmark
+#
+# usage: python -m <package>.system.importbench [module ...] [--runs 5] [--top 10]
+#
+# Imports each module in a fresh interpreter with -X importtime, several
+# times, and reports the median total import time of the module and the
+# imports below it with the largest own (self) time, so the startup cost can
+# be tracked as the code changes. The modules are relative to the package
+# (e.g. system.system); the defaults are the entry points.
+
+import argparse, os, statistics, subprocess, sys
+
+PACKAGE = __package__.split('.')[0]
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '../..')) # parent of the package
+MODULES = ('system.system', 'system.batch', 'system.service', 'eval.code.sweep', 'gui.system')
+
+def import_times(module):
+    """Import a module in a fresh interpreter.
+    returns:
+        total - cumulative import time of the module (in seconds)
+        times - dict from imported module to its self time (in seconds)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        env=env, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode != 0:
+        raise ImportError(proc.stderr.strip().splitlines()[-1])
+    total, times = 0.0, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(own) / 1e6
+        if name.strip() == module:
+            total = int(cumulative) / 1e6
+    return total, times
+
+
+def bench(module, runs=5):
+    """Return the median total and the median self time of every import."""
+    results = [import_times(module) for k in range(runs)]
+    total = statistics.median(t for t, _ in results)
+    names = set().union(*(times for _, times in results))
+    times = {name: statistics.median(times.get(name, 0.0) for _, times in results) for name in names}
+    return total, times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the import time of modules.')
+    parser.add_argument('modules', nargs='*', help='modules relative to the package (default: %s)' % ', '.join(MODULES))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='number of slowest imports to show')
+    args = parser.parse_args(argv)
+    for module in args.modules or MODULES:
+        try:
+            total, times = bench('%s.%s' % (PACKAGE, module), args.runs)
+        except ImportError as e:
+            print('%-24s failed: %s' % (module, e))
+            continue
+        print('%-24s %8.1f ms' % (module, total * 1000))
+        for name, t in sorted(times.items(), key=lambda x: -x[1])[:args.top]:
+            print('    %-40s %8.1f ms' % (name, t * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+# Local alignment service
+#
+# usage: python -m <package>.system.service [--port 8750] [options]
+#
+# A long-running HTTP server (on localhost) which owns the pipeline, so the
+# imports, the cache and the hydrated objects are paid once:
+#
+#   - the OCR and speech results of each lecture (and its label) are kept in
+#     memory once processed, with one AlignBasic per (lecture, lang, scale,
+#     mode), whose OCR words and interned vocabulary are reused between runs;
+#   - the Matches of every alignment are kept by cache key, so repeating an
+#     alignment (or evaluating it) does not touch the cache.
+#
+# Jobs go through a bounded queue served by worker threads. Identical jobs
+# are coalesced: a request equal to a queued, running or finished job gets
+# that job. Endpoints (JSON):
+#
+#      POST /jobs              {"kind": "align" or "eval", "lecture": name,
+#                               "lang", "scale", "mode", "params": {gauss,
+#                               common, fuzzy}} -> {"id", "status"}
+#                               (503 if the queue is full; a "key" param is
+#                               ignored, as in AlignBasic)
+#      GET  /jobs/<id>         status, and the result once done
+#      GET  /jobs/<id>/events  progress events, one JSON object per line,
+#                               streamed until the job ends
+#      GET  /status            queue length and warm lectures
+
+from .subsystems import registry
+from .aux.reflabel import RefLabel
+from ..eval.code.ocr import OCREval
+from ..eval.code.align import AlignEval
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import OrderedDict
+import argparse, itertools, json, queue, threading, time
+
+KINDS = ('align', 'eval')
+ALIGN_PARAMS = ('gauss', 'common', 'fuzzy')
+IGNORED_PARAMS = ('key',) # accepted, but AlignBasic.set_jwf disables it
+
+class Job:
+    """A job of the service, with its progress events."""
+    def __init__(self, id, key, request):
+        self.id, self.key, self.request = id, key, request
+        self.status = 'queued'
+        self.result = self.error = None
+        self.events = []
+        self.cond = threading.Condition()
+        self.emit('queued')
+
+    def emit(self, stage, **info):
+        """Record a progress event and wake the listeners."""
+        with self.cond:
+            self.events.append(dict(stage=stage, time=time.time(), **info))
+            self.cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self.cond:
+            self.result, self.error = result, error
+            self.status = 'failed' if error is not None else 'done'
+        self.emit(self.status, **({'error': error} if error is not None else {}))
+
+    def is_over(self):
+        return self.status in ('done', 'failed')
+
+    def wait_events(self, start, timeout=30):
+        """Return the events from index start, waiting for at least one."""
+        with self.cond:
+            if len(self.events) <= start and not self.is_over():
+                self.cond.wait(timeout)
+            return self.events[start:]
+
+    def to_obj(self, with_result=True):
+        obj = dict(id=self.id, status=self.status, request=self.request)
+        if self.error is not None:
+            obj['error'] = self.error
+        if with_result and self.status == 'done':
+            obj['result'] = self.result
+        return obj
+
+
+class Service:
+    """The pipeline with warm lectures and a bounded job queue.
+    args:
+        queue_size - maximum number of queued jobs
+        workers - number of worker threads
+        keep - number of finished jobs (and of Matches) kept in memory
+    """
+    def __init__(self, queue_size=16, workers=1, keep=256):
+        self.queue = queue.Queue(queue_size)
+        self.workers = workers
+        self.keep = keep
+        self.lock = threading.Lock() # guards the tables below
+        self.jobs = OrderedDict() # id -> Job
+        self.by_key = {} # request key -> Job
+        self.ids = itertools.count(1)
+        self.lectures = {} # (lecture, lang, scale) -> processed OCRTess
+        self.speeches = {} # lecture -> processed SpeechGC
+        self.labels = {} # lecture -> RefLabel
+        self.aligners = {} # (lecture, lang, scale, mode) -> AlignBasic
+        self.matches = OrderedDict() # AlignBasic cache key -> Matches
+        self.locks = {} # lecture -> lock of its pipeline objects
+
+    def start(self):
+        for k in range(self.workers):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    def normalise(self, request):
+        """Return the request with all fields (raise ValueError if invalid)."""
+        if request.get('kind') not in KINDS:
+            raise ValueError('kind should be one of %s' % (KINDS,))
+        if not isinstance(request.get('lecture'), str):
+            raise ValueError('lecture should be a str')
+        params = request.get('params') or {}
+        for k in params:
+            if k not in ALIGN_PARAMS and k not in IGNORED_PARAMS:
+                raise ValueError('unknown param %s' % k)
+        mode, modes = request.get('mode', 'full'), registry.get('align', 'basic').MODES
+        if mode not in modes:
+            raise ValueError('mode should be one of %s' % (modes,))
+        return dict(kind=request['kind'], lecture=request['lecture'], lang=request.get('lang', 'eng'),
+            scale=request.get('scale', 'par'), mode=mode, params={k: params.get(k) for k in ALIGN_PARAMS})
+
+    def submit(self, request):
+        """Return the job of a request: an identical existing job, or a new
+        queued one (raise queue.Full if the queue is full)."""
+        request = self.normalise(request)
+        key = json.dumps(request, sort_keys=True)
+        with self.lock:
+            job = self.by_key.get(key)
+            if job is not None and job.status != 'failed':
+                return job
+            job = Job(next(self.ids), key, request)
+            self.queue.put_nowait(job)
+            self.jobs[job.id] = job
+            self.by_key[key] = job
+            while len(self.jobs) > self.keep: # forget the oldest finished jobs
+                old = next((j for j in self.jobs.values() if j.is_over()), None)
+                if old is None:
+                    break
+                del self.jobs[old.id]
+                if self.by_key.get(old.key) is old:
+                    del self.by_key[old.key]
+        return job
+
+    def get(self, id):
+        with self.lock:
+            return self.jobs.get(id)
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            job.status = 'running'
+            try:
+                with self.lecture_lock(job.request['lecture']):
+                    result = self.run(job)
+                job.finish(result)
+            except Exception as e:
+                job.finish(error='%s: %s' % (type(e).__name__, e))
+
+    def lecture_lock(self, lecture):
+        with self.lock:
+            return self.locks.setdefault(lecture, threading.Lock())
+
+    def run(self, job):
+        """Run a job, return its result (JSON-serialisable)."""
+        r = job.request
+        align = self.aligner(job, r['lecture'], r['lang'], r['scale'], r['mode'])
+        align.set_params(**r['params'])
+        with self.lock:
+            matches = self.matches.get(align.cache_key)
+        if matches is None:
+            job.emit('align')
+            matches = align.compute_matches(align.find_pivots())
+            with self.lock:
+                self.matches[align.cache_key] = matches
+                while len(self.matches) > self.keep:
+                    self.matches.popitem(last=False)
+        align.result = matches
+        if r['kind'] == 'align':
+            return [m.tinterval_group.to_obj() for m in matches]
+        job.emit('eval')
+        label = self.labels.get(r['lecture'])
+        if label is None:
+            label = self.labels[r['lecture']] = RefLabel(r['lecture'])
+        return dict(ocr=OCREval(label, align).evaluate(), align=AlignEval(label, align).evaluate())
+
+    def aligner(self, job, lecture, lang, scale, mode):
+        """Return the warm AlignBasic of a lecture (processing the OCR and
+        speech the first time)."""
+        align = self.aligners.get((lecture, lang, scale, mode))
+        if align is not None:
+            return align
+        ocr = self.lectures.get((lecture, lang, scale))
+        if ocr is None:
+            job.emit('ocr')
+            ocr = registry.create('ocr', None, lecture, scale=scale, lang=lang)
+            ocr.process()
+            self.lectures[lecture, lang, scale] = ocr
+        speech = self.speeches.get(lecture)
+        if speech is None:
+            job.emit('speech')
+            speech = registry.create('speech', None, lecture)
+            speech.process()
+            self.speeches[lecture] = speech
+        align = self.aligners[lecture, lang, scale, mode] = registry.create('align', 'basic', ocr, speech, mode=mode)
+        return align
+
+    def status(self):
+        with self.lock:
+            return dict(queued=self.queue.qsize(), jobs=len(self.jobs),
+                lectures=['%s (lang=%s, scale=%s)' % key for key in list(self.lectures)])
+
+
+class Handler(BaseHTTPRequestHandler):
+    """HTTP front end of the Service (self.server.service)."""
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self.send_json(404, dict(error='not found'))
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = self.server.service.submit(json.loads(self.rfile.read(length) or b'{}'))
+        except (ValueError, AttributeError) as e:
+            return self.send_json(400, dict(error=str(e)))
+        except queue.Full:
+            return self.send_json(503, dict(error='queue full'))
+        self.send_json(200 if job.is_over() else 202, job.to_obj(with_result=False))
+
+    def do_GET(self):
+        parts = [p for p in self.path.split('/') if p]
+        if parts == ['status']:
+            return self.send_json(200, self.server.service.status())
+        job = None
+        if len(parts) in (2, 3) and parts[0] == 'jobs' and parts[1].isdigit():
+            job = self.server.service.get(int(parts[1]))
+        if job is None or (len(parts) == 3 and parts[2] != 'events'):
+            return self.send_json(404, dict(error='not found'))
+        if len(parts) == 2:
+            return self.send_json(200, job.to_obj())
+        # stream the events until the job is over
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        sent = 0
+        while True:
+            events = job.wait_events(sent)
+            for event in events:
+                self.wfile.write((json.dumps(event) + '\n').encode())
+            self.wfile.flush()
+            sent += len(events)
+            if job.is_over() and sent == len(job.events):
+                break
+
+    def send_json(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8750, **kwargs):
+    """Run the service until interrupted."""
+    service = Service(**kwargs)
+    service.start()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.service = service
+    server.daemon_threads = True
+    print('Serving on http://%s:%d' % (host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local alignment service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8750)
+    parser.add_argument('--queue-size', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    serve(args.host, args.port, queue_size=args.queue_size, workers=args.workers)
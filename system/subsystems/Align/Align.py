@@ -2,6 +2,7 @@ from ...elements.Match import Match, Matches
 from ..OCR.OCR import OCR
 from ..Speech.Speech import Speech
 from ...cache.Cache import Cache
+from ...aux.syncindex import SyncIndex
 
 class Align:
     """Super class for all Align instances."""
@@ -18,6 +19,10 @@ class Align:
         self.result = Matches()
         return self.result
     
+    def sync_index(self):
+        """Build a SyncIndex from the generated result."""
+        return SyncIndex(self.result)
+    
     def reset(self):
         """Clear the generated result if exists."""
         self.result = None
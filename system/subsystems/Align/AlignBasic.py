@@ -1,5 +1,11 @@
 from .Align import Align
 from ...aux.mydiff import MyDiff
+from ...aux.bitlcs import BitLCSDiff
+from ...aux.anchors import AnchorDiff
+from ...aux.corridor import CorridorDiff
+from ...aux.scorer import Scorer, intern
+from ...aux.fuzzy import FuzzyTable
+from ...aux import trace
 from ...elements.BBox import BBoxWord, BBoxWordInfo
 from ...elements.WStamp import WStamp
 from ...elements.Match import Match, Matches
@@ -8,25 +14,46 @@ from ...elements.TStamp import TStamp
 from ...cache.Cache import global_cache
 from pprint import pprint
 from math import exp, sqrt
+from collections import namedtuple
+import numpy as np
 import difflib
 
 class AlignBasic(Align):
     """The baseline alignment algorithm based on diff."""
-    def __init__(self, ocr, speech):
+    MODES = ('full', 'anchor', 'coarse')
+    
+    def __init__(self, ocr, speech, memory_budget=None, workers=None, mode='full', anchor_count=3):
         super().__init__(ocr, speech)
+        if mode not in self.MODES:
+            raise ValueError('mode should be one of %s' % (self.MODES,))
         self.word_lists = WordLists()
-        self.cache = global_cache
+        self.cache = trace.TracedCache(global_cache)
+        self.memory_budget = memory_budget # see MyDiff
+        self.workers = workers # see MyDiff (the result does not depend on it)
+        self.mode = mode # 'full' DP, 'anchor' (DP between rare-word anchors) or 'coarse' (see CorridorDiff)
+        self.anchor_count = anchor_count # max occurrences in the speech of an anchor word (see AnchorDiff)
+        self.words = None # (ocr.result, its words), see ocr_words
+        self.interned = None # (X, Y, xid, yid, vocab) of the last AlignScorer.prepare
         self.set_params()
     
     def update_cache_key(self):
         params_str = 'params(gauss={gauss},common={common},key={key})'.format(**self.params)
+        if self.params['fuzzy'] is not None:
+            params_str += ',fuzzy=%s' % self.params['fuzzy']
+        if self.memory_budget is not None: # ties may be broken differently
+            params_str += ',memory_budget=%d' % self.memory_budget
+        if self.mode != 'full':
+            params_str += ',mode=%s' % self.mode
+        if self.mode == 'anchor':
+            params_str += ',anchor_count=%d' % self.anchor_count
         self.cache_key = 'AlignBasic(%s,%s,%s)' % (self.ocr.cache_key, self.speech.cache_key, params_str)
     
-    def set_params(self, gauss=None, common=None, key=None):
-        self.params = dict(gauss=gauss, common=common, key=key)
+    def set_params(self, gauss=None, common=None, key=None, fuzzy=None):
+        self.params = dict(gauss=gauss, common=common, key=key, fuzzy=fuzzy)
         self.set_jwf(**self.params)
         self.update_cache_key()
     
+    @trace.traced()
     def process(self):
         self.ocr.process()
         self.speech.process()
@@ -34,92 +61,248 @@ class AlignBasic(Align):
         self.result = self.compute_matches(self.find_pivots())
         return self.result
     
+    @trace.traced()
     def compute_matches(self, pivots):
-        X, Y = self.ocr.result, self.speech.result
+        """Interpolate the TIntervals of all BBoxGroups from the pivots.
+        args:
+            pivots - list of (BBoxWord, WStamp) pairs, or a Pivots tuple of arrays
+        returns:
+            matches - Matches object
+        """
+        X = self.ocr.result
+        if not isinstance(pivots, Pivots):
+            pivots = Pivots.from_pairs(pivots)
+        counts = np.array([len(bg.words()) for bg in X], dtype=np.int64)
+        bounds = interpolate_boundaries(pivots, counts, self.speech.audio_len)
+        tstamps = [TStamp(min=m, sec=s, msec=ms) for m, s, ms in bounds.tolist()]
         matches = Matches()
-        for bg in X:
-            matches.append(Match(bg, TIntervalGroup([TInterval()], from_obj=False)))
-        tail = (BBoxWord(''), WStamp('', TStamp(puresec=self.speech.audio_len)))
-        tail[0].info.set(gid=len(matches), wid=0, glen=0)
-        pivots.append(tail)
-        prev_gid, prev_weight = -1, 0
-        prev_ts = TStamp() # initial 0
-        for bword, wstamp in pivots:
-            cur_gid = bword.info.gid
-            cur_weight = bword.info.wid
-            cur_ts = wstamp.tstamp
-            if prev_gid != cur_gid:
-                weights = [prev_weight]
-                for gid in range(prev_gid + 1, cur_gid):
-                    weights.append(len(X[gid].words()))
-                weights.append(cur_weight)
-                sum_of_weights = sum(weights)
-                ts_gap = cur_ts - prev_ts # in float, > 0
-                if sum_of_weights == 0: # assign uniform weights if sum = 0
-                    for i in range(len(weights)):
-                        weights[i] = 1 
-                    sum_of_weights = len(weights)
-                ts = prev_ts + ((weights[0] / sum_of_weights) * ts_gap)
-                if prev_gid != -1:
-                    matches[prev_gid].tinterval_group[0].end = ts
-                for gid in range(prev_gid + 1, cur_gid):
-                    matches[gid].tinterval_group[0].start = ts
-                    ts = ts + ((weights[gid - prev_gid] / sum_of_weights) * ts_gap)
-                    matches[gid].tinterval_group[0].end = ts
-                if cur_gid < len(matches):
-                    matches[cur_gid].tinterval_group[0].start = ts
-            prev_gid = cur_gid
-            prev_weight = bword.info.glen - bword.info.wid
-            prev_ts = cur_ts
-        pivots.pop()
+        for gid, bg in enumerate(X):
+            matches.append(Match(bg, TIntervalGroup([TInterval(tstamps[gid], tstamps[gid + 1])], from_obj=False)))
         return matches
     
+    @trace.traced()
     def find_diff_align(self):
         if self.cache_key in self.cache: # try to find in cache
             cached_raw = self.cache[self.cache_key]
             map_f = lambda T, x: T(**x, from_obj=True) if x is not None else None
+            if self.params['fuzzy'] is not None: # find_pivots looks up the similarity table
+                self.jwf.prepare(self.ocr_words(), self.speech.result)
             return [(map_f(BBoxWord, a), map_f(WStamp, b)) for a, b in cached_raw]
-        X = self.ocr.result.words()
+        X = self.ocr_words()
         Y = self.speech.result
-        diff = MyDiff(X, Y, self.jwf)
+        if self.is_equality_only(): # plain LCS, use the bit-parallel engine
+            diff = BitLCSDiff(X, Y, self.jwf, key=lambda w: w.word, memory_budget=self.memory_budget, workers=self.workers)
+        else:
+            diff = MyDiff(X, Y, self.jwf, memory_budget=self.memory_budget, workers=self.workers)
+        if self.mode == 'anchor':
+            diff = AnchorDiff(diff, key=lambda w: w.word, max_count=self.anchor_count)
+        elif self.mode == 'coarse':
+            groups = [len(bg.words()) for bg in self.ocr.result]
+            diff = CorridorDiff(diff, groups, key=lambda w: w.word)
         diff_align = diff.solve()
         map_f = lambda x: x.to_obj() if x is not None else None
         self.cache[self.cache_key] = [(map_f(a), map_f(b)) for a, b in diff_align]
         return diff_align
     
+    def ocr_words(self):
+        """Return the words of the OCR result, built once per result (so
+        runs with other params reuse them and their interned ids)."""
+        if self.words is None or self.words[0] is not self.ocr.result:
+            self.words = (self.ocr.result, self.ocr.result.words())
+        return self.words[1]
+    
     def find_pivots(self):
         diff_align = self.find_diff_align()
-        pf = lambda x: (x[0] is not None) and (x[1] is not None) and (x[0].word == x[1].word)
+        pf = lambda x: (x[0] is not None) and (x[1] is not None) and self.jwf.is_match(x[0], x[1])
         pivots = list(filter(pf, diff_align))
         return pivots
 
-    def set_jwf(self, gauss=None, common=None, key=None):
+    def is_equality_only(self):
+        """Return true if the jwf is plain word equality (1/0, no gap score)."""
+        gauss, common, fuzzy = self.params['gauss'], self.params['common'], self.params['fuzzy']
+        return not (gauss and gauss > 0) and not (common and common > 0) and fuzzy is None
+
+    def set_jwf(self, gauss=None, common=None, key=None, fuzzy=None):
         # JWF
         # disable key
         key = None
-        def jwf(x, y):
-            if x is None or y is None or x.word != y.word:
+        self.jwf = AlignScorer(self, gauss=gauss, common=common, key=key, fuzzy=fuzzy)
+
+
+class AlignScorer(Scorer):
+    """The jwf of AlignBasic as a vectorised scorer: word equality, weighted
+    by the common/key word factors and by the time constraint. If fuzzy is
+    set, similar words (relative edit distance up to fuzzy, see FuzzyTable)
+    also match, weighted by their similarity."""
+    def __init__(self, align, gauss=None, common=None, key=None, fuzzy=None):
+        self.align = align
+        self.gauss, self.common, self.key = gauss, common, key
+        self.fuzzy = fuzzy
+        self.X = self.vocab = self.table = None
+    
+    def weight(self, word):
+        """Return the score of matching word (before the time constraint)."""
+        ret = 1
+        # Penalise matching common words
+        if self.common and self.common > 0 and (word in self.align.word_lists.common_words):
+            ret *= self.common
+        # Reward matching key words
+        if self.key and self.key > 0 and (word in self.align.word_lists.key_words):
+            ret *= self.key
+        return ret
+    
+    def prepare(self, X, Y):
+        interned = self.align.interned
+        if interned is not None and interned[0] is X and interned[1] is Y: # same words as the last run
+            self.xid, self.yid, self.vocab = interned[2:]
+        else:
+            if X is not self.X: # new run (the same X is kept by AlignOnline)
+                self.vocab = {}
+            (self.xid, self.yid), _ = intern(X, Y, key=lambda w: w.word, vocab=self.vocab)
+            self.align.interned = (X, Y, self.xid, self.yid, self.vocab)
+        super().prepare(X, Y)
+        if self.fuzzy is not None and (self.table is None or self.table.vocab is not self.vocab):
+            self.table = FuzzyTable(self.vocab, [x.word for x in X], threshold=self.fuzzy)
+        if self.table is not None:
+            self.table.add([y.word for y in Y])
+        weights = np.array([self.weight(word) for word in self.vocab], dtype=float)
+        self.xweight = weights[self.xid]
+        if self.gauss and self.gauss > 0:
+            self.xpos = np.array([x.info.relpos for x in X], dtype=float)
+            self.ypos = np.array([y.tstamp.to_sec() for y in Y], dtype=float) / self.align.speech.audio_len
+    
+    def insert(self, y0, y1):
+        return np.zeros(y1 - y0)
+    
+    def delete(self, x0, x1):
+        return np.zeros(x1 - x0)
+    
+    def similarity(self, x0, x1, y0, y1):
+        """Return the similarity block of X[x0:x1] x Y[y0:y1] (1 for equal words)."""
+        if self.table is not None:
+            return self.table.lookup(self.xid[x0:x1], self.yid[y0:y1])
+        return (self.xid[x0:x1, None] == self.yid[None, y0:y1]).astype(float)
+    
+    def is_match(self, x, y):
+        """Return true if the words of x and y match (exactly or fuzzily)."""
+        if x.word == y.word:
+            return True
+        return self.table is not None and self.table.get(self.vocab.get(x.word, -1), self.vocab.get(y.word, -1)) > 0
+    
+    def substitute(self, x0, x1, y0, y1):
+        if self.table is not None:
+            ret = self.similarity(x0, x1, y0, y1) * self.xweight[x0:x1, None]
+        else:
+            ret = np.where(self.xid[x0:x1, None] == self.yid[None, y0:y1], self.xweight[x0:x1, None], 0.0)
+        # Time Constraint
+        if self.gauss and self.gauss > 0:
+            s = self.gauss
+            d = (self.xpos[x0:x1, None] - self.ypos[None, y0:y1]) * 50
+            ret *= np.exp((-0.5*d*d) / (s*s))
+        return ret
+    
+    def __call__(self, x, y):
+        if x is None or y is None:
+            return 0
+        if isinstance(y, BBoxWord): # swap
+            x, y = y, x
+        if x.word == y.word:
+            ret = self.weight(x.word)
+        elif self.table is not None:
+            sim = self.table.get(self.vocab.get(x.word, -1), self.vocab.get(y.word, -1))
+            if sim == 0:
                 return 0
-            # now x.word == y.word
-            if isinstance(y, BBoxWord): # swap
-                x, y = y, x
-            word = x.word
-            ret = 1
-            # Penalise matching common words
-            if common and common > 0 and (word in self.word_lists.common_words):
-                ret *= common
-            # Reward matching key words
-            if key and key > 0 and (word in self.word_lists.key_words):
-                ret *= key
-            # Time Constraint
-            if gauss and gauss > 0:
-                s = gauss
-                f = lambda d: exp((-0.5*d*d) / (s*s)) # no need to normalise
-                y_relpos = y.tstamp.to_sec() / self.speech.audio_len
-                dx = (x.info.relpos - y_relpos) * 50 # assume a 50min lecture
-                ret *= f(dx)
-            return ret
-        self.jwf = jwf
+            ret = self.weight(x.word) * sim
+        else:
+            return 0
+        # Time Constraint
+        if self.gauss and self.gauss > 0:
+            s = self.gauss
+            f = lambda d: exp((-0.5*d*d) / (s*s)) # no need to normalise
+            y_relpos = y.tstamp.to_sec() / self.align.speech.audio_len
+            dx = (x.info.relpos - y_relpos) * 50 # assume a 50min lecture
+            ret *= f(dx)
+        return ret
+
+
+class Pivots(namedtuple('Pivots', 'gid wid glen tsec')):
+    """Array-backed pivots.
+    attributes:
+        gid - group id of the BBoxWord
+        wid - word id of the BBoxWord (within the group)
+        glen - group len of the BBoxWord
+        tsec - starting time of the WStamp (in seconds)
+    """
+
+    @staticmethod
+    def from_pairs(pivots):
+        """Build from a list of (BBoxWord, WStamp) pairs."""
+        info = [(x.info.gid, x.info.wid, x.info.glen) for x, y in pivots]
+        gid, wid, glen = np.array(info, dtype=np.int64).reshape(-1, 3).T
+        tsec = np.array([y.tstamp.to_sec() for x, y in pivots], dtype=np.float64)
+        return Pivots(gid, wid, glen, tsec)
+
+
+def interpolate_boundaries(pivots, counts, audio_len):
+    """Compute the boundaries of all groups from the pivots.
+
+    Boundary g is the end of group g-1 and the start of group g. Between two
+    consecutive pivots of different groups, the time gap is shared out by the
+    number of words of each group in between (uniformly if there are none).
+    Every step is truncated to milliseconds as TStamp addition does, so the
+    result is identical to adding the shares up one TStamp at a time.
+    args:
+        pivots - Pivots object
+        counts - number of words of each group
+        audio_len - length of the audio (in seconds)
+    returns:
+        bounds - (len(counts) + 1, 3) array of (min, sec, msec)
+    """
+    G = len(counts)
+    # append the tail pivot (end of audio, beyond the last group)
+    end_whole, end_msec = quantise(np.array([float(audio_len)]))
+    gid = np.append(pivots.gid, G)
+    wid = np.append(pivots.wid, 0)
+    glen = np.append(pivots.glen, 0)
+    tsec = np.append(pivots.tsec, end_whole + end_msec / 1000)
+    # previous pivot of each pivot
+    prev_gid = np.append(-1, gid[:-1])
+    prev_weight = np.append(0, (glen - wid)[:-1])
+    prev_tsec = np.append(0.0, tsec[:-1])
+    # only the gaps where the group changes set boundaries
+    mask = prev_gid != gid
+    a, b = prev_gid[mask], gid[mask]
+    w_first, w_last = prev_weight[mask], wid[mask]
+    gap = tsec[mask] - prev_tsec[mask]
+    cumsum = np.append(0, np.cumsum(counts))
+    total = w_first + (cumsum[b] - cumsum[a + 1]) + w_last
+    uniform = total == 0
+    total = np.where(uniform, b - a + 1, total)
+    w_first = np.where(uniform, 1, w_first)
+    # walk all gaps in lockstep, one boundary per step
+    whole = np.zeros(G + 1, dtype=np.int64)
+    msec = np.zeros(G + 1, dtype=np.int64)
+    ts = prev_tsec[mask]
+    weight = w_first
+    active = np.arange(len(a))
+    for step in range(int((b - a).max()) if len(a) else 0):
+        share = (weight / total[active]) * gap[active]
+        ts_whole, ts_msec = quantise(ts + share)
+        bid = a[active] + 1 + step
+        whole[bid], msec[bid] = ts_whole, ts_msec
+        ts = ts_whole + ts_msec / 1000
+        # keep the gaps which still have boundaries to set
+        keep = (b[active] - a[active]) > step + 1
+        active, ts = active[keep], ts[keep]
+        weight = np.where(uniform[active], 1, counts[a[active] + 1 + step])
+    return np.stack([whole // 60, whole % 60, msec], axis=1)
+
+
+def quantise(puresec):
+    """Vectorised TStamp.set_from_sec, return (whole seconds, milliseconds)."""
+    whole = np.trunc(puresec)
+    msec = np.trunc(1000 * (puresec - whole))
+    return whole.astype(np.int64), msec.astype(np.int64)
 
 
 import os, json
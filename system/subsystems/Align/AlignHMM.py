@@ -0,0 +1,150 @@
+# Non-monotonic alignment with an HMM over the BBoxGroups
+#
+# The lecture is modelled as a hidden Markov model whose states are the
+# BBoxGroups and whose observations are the speech words:
+#
+#      emission   : log P(word | group), a smoothed unigram model of the
+#                   words of the group (precomputed as a group x vocabulary
+#                   matrix over the speech vocabulary)
+#      transition : stay on the group, move to the next group, or jump to
+#                   any group (backwards included) with a penalty
+#
+# The most likely state path is decoded by Viterbi, vectorised over the
+# groups, so the cost is O(T * G) array operations for T speech words and G
+# groups. Since the lecturer may come back to a group, its TIntervalGroup can
+# hold several disjoint TIntervals.
+#
+# The backpointers are a T x G matrix of the smallest integer type holding
+# the group ids: T * G bytes up to 256 groups, 2 * T * G bytes up to 65536,
+# e.g. 36 MB for two hours of speech (about 18000 words) over 1000 groups.
+
+from .Align import Align
+from ...elements.Match import Match, Matches
+from ...elements.TInterval import TIntervalGroup, TInterval
+from ...elements.TStamp import TStamp
+from ...aux.scorer import intern
+from ...aux import trace
+from ...cache.Cache import global_cache
+import numpy as np
+
+class AlignHMM(Align):
+    """Slide tracking by Viterbi decoding of an HMM over the BBoxGroups."""
+    def __init__(self, ocr, speech):
+        super().__init__(ocr, speech)
+        self.cache = trace.TracedCache(global_cache)
+        self.set_params()
+
+    def update_cache_key(self):
+        params_str = 'params(stay={stay},next={next},jump={jump},alpha={alpha})'.format(**self.params)
+        self.cache_key = 'AlignHMM(%s,%s,%s)' % (self.ocr.cache_key, self.speech.cache_key, params_str)
+
+    def set_params(self, stay=-0.01, next=-3.0, jump=-12.0, alpha=1.0):
+        """Set the log-probabilities of the transitions (stay on the group,
+        move to the next group, jump to any group) and the weight alpha of the
+        background word distribution in the emissions (raise ValueError
+        unless they are finite and at most 0, and alpha is positive, so that
+        every log-probability is finite)."""
+        for name, value in (('stay', stay), ('next', next), ('jump', jump)):
+            if not (np.isfinite(value) and value <= 0):
+                raise ValueError('%s should be a finite log-probability' % name)
+        if not (np.isfinite(alpha) and alpha > 0):
+            raise ValueError('alpha should be positive')
+        self.params = dict(stay=stay, next=next, jump=jump, alpha=alpha)
+        self.update_cache_key()
+
+    @trace.traced()
+    def process(self):
+        self.ocr.process()
+        self.speech.process()
+        self.update_cache_key()
+        self.result = self.compute_matches(self.find_path())
+        return self.result
+
+    @trace.traced()
+    def find_path(self):
+        """Return the group id of every speech word (the decoded state path)."""
+        if self.cache_key in self.cache: # try to find in cache
+            return self.cache[self.cache_key]
+        emissions, yid = self.emissions()
+        path = viterbi(emissions, yid, **{k: self.params[k] for k in ('stay', 'next', 'jump')})
+        path = path.tolist()
+        self.cache[self.cache_key] = path
+        return path
+
+    def emissions(self):
+        """Return the G x V matrix of log P(word | group) over the speech
+        vocabulary, and the word ids of the speech."""
+        X = self.ocr.result
+        Y = self.speech.result
+        words = [[w.word for w in bg.words()] for bg in X]
+        (yid,), vocab = intern(Y, key=lambda w: w.word)
+        G, V = len(X), len(vocab)
+        counts = np.zeros((G, V))
+        for g, group_words in enumerate(words):
+            ids = [vocab[w] for w in group_words if w in vocab]
+            np.add.at(counts[g], ids, 1)
+        # background: speech word frequencies
+        background = np.bincount(yid, minlength=V) / max(1, len(yid))
+        alpha = self.params['alpha']
+        lengths = np.array([len(w) for w in words], dtype=float)
+        probs = (counts + alpha * background) / (lengths + alpha)[:, None]
+        return np.log(probs), yid
+
+    def compute_matches(self, path):
+        """Turn the state path into Matches: every run of consecutive speech
+        words in a group adds one TInterval to the group.
+        args:
+            path - list of group ids, one per speech word
+        returns:
+            matches - Matches object
+        """
+        X = self.ocr.result
+        Y = self.speech.result
+        groups = [TIntervalGroup([], from_obj=False) for bg in X]
+        path = np.asarray(path, dtype=np.int64)
+        if len(path):
+            starts = np.flatnonzero(np.concatenate(([True], path[1:] != path[:-1])))
+            ends = np.concatenate((starts[1:], [len(path)]))
+            for a, b in zip(starts.tolist(), ends.tolist()):
+                end = Y[b].tstamp if b < len(Y) else TStamp(self.speech.audio_len)
+                groups[path[a]].append(TInterval(Y[a].tstamp, end))
+        matches = Matches()
+        for bg, group in zip(X, groups):
+            matches.append(Match(bg, group))
+        return matches
+
+
+def viterbi(emissions, obs, stay, next, jump):
+    """Viterbi decoding over states 0..G-1 (starting in state 0 preferably).
+    args:
+        emissions - G x V matrix of log-probabilities
+        obs - int array of observations (length T)
+        stay, next, jump - log-probabilities of the transitions g -> g,
+            g -> g + 1 and g -> any state
+    returns:
+        path - int array of states (length T)
+    """
+    G, T = emissions.shape[0], len(obs)
+    if T == 0 or G == 0:
+        return np.zeros(T if G else 0, dtype=np.int64)
+    emit = np.ascontiguousarray(emissions.T) # one row per observation
+    back = np.empty((T, G), dtype=np.min_scalar_type(G - 1)) # see the header
+    states = np.arange(G)
+    delta = emit[obs[0]] + np.where(states == 0, 0, jump)
+    for t in range(1, T):
+        from_stay = delta + stay
+        from_next = np.full(G, -np.inf)
+        from_next[1:] = delta[:-1] + next
+        k = int(delta.argmax())
+        from_jump = delta[k] + jump
+        # prefer stay, then next, then jump
+        best = np.maximum(from_stay, from_next)
+        back[t] = np.where(from_stay >= from_next, states, states - 1)
+        jumps = from_jump > best
+        back[t][jumps] = k
+        delta = np.maximum(best, from_jump) + emit[obs[t]]
+    path = np.empty(T, dtype=np.int64)
+    path[-1] = int(delta.argmax())
+    for t in range(T - 1, 0, -1):
+        path[t - 1] = back[t, path[t]]
+    return path
@@ -0,0 +1,288 @@
+# Online (incremental) alignment for live transcripts
+#
+# The speech words arrive in batches, so the NW matrix is computed line by
+# line over Y: the frontier is the last line, one score per prefix X[:k] of
+# the OCR words (k = 0..N), updated with vector operations for every new
+# WStamp. Instead of a traceback matrix, every frontier cell keeps a pointer
+# to the last pivot on its best path; the pivots form a tree (PivotTree) of
+# parent pointers.
+#
+# The current position is the first cell of best score if the stream ended
+# now (the remaining OCR words deleted), with a small penalty per OCR word so
+# that sparse matches far ahead do not pull the position.
+#
+# After each batch, the live hypotheses are the cells up to the position
+# whose score is within `beam` of the best. The deepest pivot shared by all
+# of them is committed: it can no longer change, unless a dropped hypothesis
+# would have caught up. The cells out of the beam or before the committed
+# pivot are dropped, and the cells after the position follow it. Only the
+# WStamps from the first live pivot on are kept: a stream without any live
+# pivot (e.g. speech matching no slide word) keeps none.
+#
+# The memory is therefore O(N + live pivots + words since the first live
+# pivot), whatever the length of the stream, and the latency of a batch is
+# O(N * batch size).
+#
+# The pivots differ from those of AlignBasic for the same inputs, so the
+# cache key names AlignOnline and its beam, skip and batch. process caches
+# the pivots under it (as AlignBasic caches its diff).
+
+import time
+import numpy as np
+from .AlignBasic import AlignBasic
+from ...elements.BBox import BBoxWord
+from ...elements.WStamp import WStamp
+from ...aux.mydiff import insertion_scan
+
+DEAD = -2.0**40 # score of the dropped cells (an integer, see insertion_scan)
+
+class AlignOnline(AlignBasic):
+    """AlignBasic fed incrementally with WStamps.
+    args:
+        beam - score margin of the live hypotheses
+        skip - score penalty per OCR word, when locating the current position
+        batch - number of WStamps per batch in process and replay
+    """
+    def __init__(self, ocr, speech, beam=10.0, skip=0.1, batch=20, **kwargs):
+        self.beam = beam # set first, they are part of the cache key
+        self.skip = skip
+        self.batch = batch
+        self.stream = None
+        super().__init__(ocr, speech, **kwargs)
+
+    def update_cache_key(self):
+        super().update_cache_key()
+        self.cache_key = 'AlignOnline(%s,beam=%s,skip=%s,batch=%d)' % (self.cache_key, self.beam, self.skip, self.batch)
+
+    def process(self):
+        """Align the whole transcript through the online path."""
+        self.ocr.process()
+        self.speech.process()
+        self.update_cache_key()
+        self.result = self.compute_matches(self.find_pivots())
+        return self.result
+
+    def find_pivots(self):
+        """Return the pivots of the whole transcript fed batch by batch."""
+        if self.cache_key in self.cache: # try to find in cache
+            return [(BBoxWord(**a, from_obj=True), WStamp(**b, from_obj=True)) for a, b in self.cache[self.cache_key]]
+        self.reset_stream()
+        pivots = []
+        Y = self.speech.result
+        for j in range(0, len(Y), self.batch):
+            pivots.extend(self.feed(Y[j:j + self.batch])['committed'])
+        pivots.extend(self.finish())
+        self.cache[self.cache_key] = [(a.to_obj(), b.to_obj()) for a, b in pivots]
+        return pivots
+
+    def reset_stream(self):
+        """Start a new stream (the OCR result should be ready)."""
+        X = self.ocr.result.words()
+        N = len(X)
+        self.stream = dict(
+            X=X,
+            score=np.zeros(N + 1), # frontier: prefix X[:k] against the words so far
+            ptr=np.full(N + 1, -1, dtype=np.int64), # last pivot of each cell
+            tree=PivotTree(),
+            recent=[], # WStamps from index `offset` on
+            offset=0,
+            count=0, # number of WStamps received
+            dead=0, # cells k < dead have been dropped
+        )
+        self.scoreD = np.zeros(N)
+        self.scan = insertion_scan(self.scoreD)
+
+    def feed(self, wstamps):
+        """Extend the alignment with a batch of WStamps.
+        returns:
+            status - dict with
+                committed - newly committed pivots, list of (BBoxWord, WStamp)
+                provisional - pivots after the committed ones on the best path
+                group - group id of the current group (None if unknown)
+                latency - processing time of the batch in seconds
+        """
+        begin = time.time()
+        st = self.stream
+        if st is None:
+            self.reset_stream()
+            st = self.stream
+        X, score, ptr, tree = st['X'], st['score'], st['ptr'], st['tree']
+        N = len(X)
+        if len(wstamps):
+            scorer = self.jwf
+            scorer.prepare(X, list(wstamps))
+            if st['count'] == 0: # first line: X[:k] deleted
+                self.scoreD = scorer.delete(0, N)
+                self.scan = insertion_scan(self.scoreD)
+                score[1:] = np.cumsum(self.scoreD)
+            scoreI = scorer.insert(0, len(wstamps))
+            block = scorer.substitute(0, N, 0, len(wstamps))
+            matches = scorer.similarity(0, N, 0, len(wstamps)) > 0 # candidate pivots
+            cells = np.arange(N + 1)
+            for b, y in enumerate(wstamps):
+                j = st['count'] + b
+                eq = matches[:, b]
+                up = score + scoreI[b] # y is not matched
+                diag = score[:-1] + block[:, b]
+                take_diag = (diag > up[1:]) | ((diag == up[1:]) & eq)
+                cand = up.copy()
+                cand[1:] = np.where(take_diag, diag, up[1:])
+                new_ptr = ptr.copy()
+                new_ptr[1:] = np.where(take_diag, ptr[:-1], ptr[1:])
+                new = self.scan(cand.copy())
+                chain = new > cand # X words skipped along the line
+                pivots = np.flatnonzero(take_diag & eq & ~chain[1:])
+                if len(pivots):
+                    new_ptr[pivots + 1] = tree.add(pivots, j, ptr[pivots])
+                source = np.maximum.accumulate(np.where(chain, -1, cells))
+                score[:] = new
+                ptr[:] = new_ptr[source]
+                score[:st['dead']] = DEAD
+            st['recent'].extend(wstamps)
+            st['count'] += len(wstamps)
+        committed = self.commit()
+        node = ptr[self.position()]
+        provisional = self.to_pairs(tree.path(node)) if node >= 0 else []
+        group = X[tree.i[node]].info.gid if node >= 0 else None
+        return dict(committed=committed, provisional=provisional, group=group, latency=time.time() - begin)
+
+    def commit(self):
+        """Prune the hypotheses out of the beam, commit the pivots shared by
+        the live ones and release what is no longer reachable. Return the
+        newly committed pivots."""
+        st = self.stream
+        score, ptr, tree = st['score'], st['ptr'], st['tree']
+        final = self.final_scores()
+        position = int(final.argmax())
+        # the cells after the position follow it (X words deleted)
+        score[position + 1:] = score[position] + np.cumsum(self.scoreD[position:])
+        ptr[position + 1:] = ptr[position]
+        # live: the cells up to the position within beam of the best
+        live = final >= final[position] - self.beam
+        live[position + 1:] = False
+        dropped = ~live
+        dropped[position + 1:] = False
+        score[dropped], ptr[dropped] = DEAD, -1
+        committed = []
+        node = tree.common_ancestor(np.unique(ptr[live]))
+        if node >= 0:
+            committed = self.to_pairs(tree.path(node))
+            tree.commit(node)
+            st['dead'] = max(st['dead'], tree.i[node] + 1)
+            score[:st['dead']], ptr[:st['dead']] = DEAD, -1
+        ptr[:] = tree.compact(ptr)
+        # keep the WStamps from the first live pivot on (the new pivots are on
+        # new WStamps), none if there is no live pivot
+        live_js = [j for n, j in enumerate(tree.j) if n != tree.committed]
+        drop = (min(live_js) if live_js else st['count']) - st['offset']
+        del st['recent'][:drop]
+        st['offset'] += drop
+        return committed
+
+    def final_scores(self):
+        """Return the frontier scores if the stream ended now (X[k:] deleted),
+        less the skip penalty of the OCR words before each cell."""
+        tail = np.concatenate((np.cumsum(self.scoreD[::-1])[::-1], [0]))
+        return self.stream['score'] + tail - self.skip * np.arange(len(tail))
+
+    def position(self):
+        """Return the current position: the first best cell if the stream ended now."""
+        return int(self.final_scores().argmax())
+
+    def finish(self):
+        """End the stream: return the remaining pivots of the best path."""
+        st = self.stream
+        node = st['ptr'][self.position()]
+        pivots = self.to_pairs(st['tree'].path(node)) if node >= 0 else []
+        self.stream = None
+        return pivots
+
+    def replay(self, wstamps, speed=None):
+        """Feed recorded WStamps batch by batch, as if they were live.
+        args:
+            wstamps - WStamps (e.g. the cached result of SpeechGC)
+            speed - playback speed (1 for real time), None for no waiting
+        yields:
+            status - the result of feed for each batch
+        """
+        self.reset_stream()
+        start = time.time()
+        for j in range(0, len(wstamps), self.batch):
+            batch = wstamps[j:j + self.batch]
+            if speed is not None: # wait until the last word has been spoken
+                delay = batch[-1].tstamp.to_sec() / speed - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield self.feed(batch)
+
+    def to_pairs(self, nodes):
+        """Map pivot ids to (BBoxWord, WStamp) pairs."""
+        st = self.stream
+        tree = st['tree']
+        return [(st['X'][tree.i[n]], st['recent'][tree.j[n] - st['offset']]) for n in nodes]
+
+
+class PivotTree:
+    """Pivots (i, j) with parent pointers, -1 for none."""
+
+    def __init__(self):
+        self.i, self.j, self.parent, self.depth = [], [], [], []
+        self.committed = -1
+
+    def add(self, xs, j, parents):
+        """Add the pivots (x, j) for x in xs, return their ids."""
+        first = len(self.i)
+        parents = parents.tolist()
+        self.i.extend(xs.tolist())
+        self.j.extend([j] * len(parents))
+        self.parent.extend(parents)
+        self.depth.extend(self.depth[p] + 1 if p >= 0 else 0 for p in parents)
+        return np.arange(first, len(self.i))
+
+    def path(self, node):
+        """Return the uncommitted pivots on the path to node, from the first."""
+        nodes = []
+        while node >= 0 and node != self.committed:
+            nodes.append(node)
+            node = self.parent[node]
+        return nodes[::-1]
+
+    def common_ancestor(self, nodes):
+        """Return the deepest pivot on the paths to all nodes, -1 if none."""
+        nodes = set(nodes.tolist())
+        while len(nodes) > 1:
+            if -1 in nodes:
+                return -1
+            deepest = max(self.depth[n] for n in nodes)
+            nodes = set(self.parent[n] if self.depth[n] == deepest else n for n in nodes)
+        node = nodes.pop() if nodes else -1
+        return node
+
+    def commit(self, node):
+        self.committed = node
+
+    def compact(self, ptr):
+        """Keep the pivots reachable from ptr (down to the committed one),
+        return ptr renumbered."""
+        keep, stack = set(), [n for n in set(ptr.tolist()) if n >= 0]
+        while stack:
+            n = stack.pop()
+            if n in keep:
+                continue
+            keep.add(n)
+            if n != self.committed and self.parent[n] >= 0:
+                stack.append(self.parent[n])
+        order = sorted(keep)
+        remap = {n: k for k, n in enumerate(order)}
+        remap[-1] = -1
+        self.i = [self.i[n] for n in order]
+        self.j = [self.j[n] for n in order]
+        self.parent = [remap.get(self.parent[n], -1) for n in order]
+        depth = [self.depth[n] for n in order]
+        self.committed = remap.get(self.committed, -1)
+        if self.committed >= 0: # the committed pivot is the new root
+            self.parent[self.committed] = -1
+            base = depth[self.committed]
+            depth = [d - base for d in depth]
+        self.depth = depth
+        return np.array([remap[n] for n in ptr.tolist()], dtype=np.int64)
@@ -6,6 +6,7 @@ class OCR:
     def __init__(self, path=None):
         self.path = path
         self.result = None
+        self.pages = None # dict page -> (width, height), if known
     
     def process(self):
         """Run the OCR engine and return the result."""
@@ -1,9 +1,7 @@
-import pytesseract, pdf2image
 import os, re, json
-from PIL import Image
 from collections import namedtuple
 
-from ...aux import printmsg
+from ...aux import printmsg, trace
 from .OCR import OCR
 from ...elements.BBox import BBox, BBoxGroup, BBoxGroups
 from ...elements.Coords import Coords
@@ -16,7 +14,7 @@ class OCRTess(OCR):
         path = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../../data/%s.pdf' % filename))
         super().__init__(path)
         self.filename = filename
-        self.cache = global_cache
+        self.cache = trace.TracedCache(global_cache)
         self.scale = scale
         self.lang = lang
         self.update_cache_key()
@@ -33,6 +31,7 @@ class OCRTess(OCR):
         self.lang = lang
         self.update_cache_key()
 
+    @trace.traced()
     def process(self):
         if self.cache_key_obj in self.cache:
             obj = self.cache[self.cache_key_obj]
@@ -41,20 +40,24 @@ class OCRTess(OCR):
             obj = self.images_to_obj(images)
             self.cache[self.cache_key_obj] = obj
         bbox_groups = self.obj_to_bbox_groups(obj, scale=self.scale)
+        self.pages = self.obj_to_pages(obj)
         self.result = bbox_groups
         return self.result
         
+    @trace.traced()
     def pdf_to_images(self):
         """Convert a single PDF file to a list of PIL images.
         returns:
             images - list of converted PIL images
         """
+        import pdf2image # only needed when the result is not cached
         filename = os.path.basename(self.path)
         printmsg.begin("Converting '%s' to PIL images" % filename)
         images = pdf2image.convert_from_path(self.path)
         printmsg.end()
         return images
     
+    @trace.traced()
     def images_to_obj(self, images):
         """Process the PIL images by OCR engine and store results in a dict.
         args:
@@ -62,6 +65,7 @@ class OCRTess(OCR):
         returns:
             obj - a Python dict which stores all processing results from OCR
         """
+        import pytesseract
         obj = {
             'totalPages': len(images), 
             'pages': []
@@ -120,6 +124,7 @@ class OCRTess(OCR):
         printmsg.end()
         return obj
     
+    @trace.traced()
     def obj_to_bbox_groups(self, obj, scale='par'):
         """Process the obj and return BBoxGroups object based on scale.
         args:
@@ -171,6 +176,11 @@ class OCRTess(OCR):
         print(bbox_groups)
         return bbox_groups
     
+    def obj_to_pages(self, obj):
+        """Return the size of each page of the obj, as a dict from page
+        number to (width, height)."""
+        return {page['pageNum']: (page['width'], page['height']) for page in obj['pages']}
+    
     def extract_coords(self, chunk):
         """Extract coordinates from a chunk.
         args:
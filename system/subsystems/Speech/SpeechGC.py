@@ -1,26 +1,25 @@
-from google.cloud.speech import enums, types, SpeechClient
 import time, os
 
-from ...aux import printmsg
+from ...aux import printmsg, trace
 from .Speech import Speech
 from ...elements.WStamp import WStamps
 from ...cache.Cache import global_cache
 
-from mutagen.mp3 import MP3
-
 class SpeechGC(Speech):
     """Google Cloud Speech-to-Text."""
 
     def __init__(self, filename):
         path = 'gs://iiaproj-resources/%s.flac' % filename
         super().__init__(path)
-        self.cache = global_cache
+        self.cache = trace.TracedCache(global_cache)
         self.cache_key = 'SpeechGC(%s)' % filename
         # get audio length
+        from mutagen.mp3 import MP3
         mp3path = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../../audio/%s.mp3' % filename))
         audio = MP3(mp3path)
         self.audio_len = audio.info.length # length in seconds
     
+    @trace.traced()
     def process(self):
         """Run the Speech Recogniser and return the result."""
         if self.cache_key in self.cache:
@@ -34,6 +33,7 @@ class SpeechGC(Speech):
         self.result = WStamps(wstamps, from_obj=True)
         return self.result
     
+    @trace.traced()
     def transcribe_gcs(self, gcs_uri):
         """Asynchronously transcribes the audio file specified by the gcs_uri.
         args:
@@ -41,6 +41,7 @@ class SpeechGC(Speech):
         returns:
             trans - a list of transcribed sections
         """
+        from google.cloud.speech import enums, types, SpeechClient # only needed when the result is not cached
         printmsg.begin('Initiating Google Cloud Speech operation')
         client = SpeechClient()
 
@@ -0,0 +1,54 @@
+# Registry of the OCR, Speech and Align backends
+#
+# A backend is registered by name with the module and the class implementing
+# it, and the module is only imported when the backend is first used, so a
+# run only pays the imports of the backends it creates. The backends import
+# their heavy third-party modules (pytesseract, pdf2image, google.cloud,
+# pygame) in the methods needing them, so loading a backend whose result is
+# cached stays cheap too.
+
+import importlib
+
+BACKENDS = dict(
+    ocr=dict(
+        tess=('.OCR.OCRTess', 'OCRTess'),
+    ),
+    speech=dict(
+        gc=('.Speech.SpeechGC', 'SpeechGC'),
+    ),
+    align=dict(
+        basic=('.Align.AlignBasic', 'AlignBasic'),
+        hmm=('.Align.AlignHMM', 'AlignHMM'),
+        online=('.Align.AlignOnline', 'AlignOnline'),
+    ),
+)
+DEFAULTS = dict(ocr='tess', speech='gc', align='basic')
+
+def register(kind, name, module, cls):
+    """Register a backend.
+    args:
+        kind - 'ocr', 'speech' or 'align'
+        name - name of the backend
+        module - module path (absolute, or relative to this package)
+        cls - name of the class in the module
+    """
+    BACKENDS[kind][name] = (module, cls)
+
+
+def names(kind):
+    """Return the names of the backends of a kind."""
+    return sorted(BACKENDS[kind])
+
+
+def get(kind, name=None):
+    """Return the class of a backend (importing its module if needed)."""
+    name = DEFAULTS[kind] if name is None else name
+    if name not in BACKENDS[kind]:
+        raise ValueError('unknown %s backend %s (one of %s)' % (kind, name, names(kind)))
+    module, cls = BACKENDS[kind][name]
+    return getattr(importlib.import_module(module, __package__), cls)
+
+
+def create(kind, name=None, *args, **kwargs):
+    """Create an instance of a backend."""
+    return get(kind, name)(*args, **kwargs)
@@ -1,16 +1,19 @@
-from .subsystems.Align.AlignBasic import AlignBasic
-from .subsystems.OCR.OCRTess import OCRTess
-from .subsystems.Speech.SpeechGC import SpeechGC
+from .subsystems import registry
+from .aux import trace
 
 from pprint import pprint
+import argparse
 
 class System:
-    """The Integrated System."""
+    """The Integrated System.
+    args:
+        ocr, speech, align - names of the backends (see registry), None for the defaults
+    """
 
-    def __init__(self, filename):
-        self.ocr = OCRTess(filename)
-        self.speech = SpeechGC(filename)
-        self.align = AlignBasic(self.ocr, self.speech)
+    def __init__(self, filename, ocr=None, speech=None, align=None):
+        self.ocr = registry.create('ocr', ocr, filename)
+        self.speech = registry.create('speech', speech, filename)
+        self.align = registry.create('align', align, self.ocr, self.speech)
     
     def run(self):
         """Run the system."""
@@ -18,6 +21,14 @@ class System:
         pprint(matches)
         
 if __name__ == '__main__':
-    filename = 'lecture1'
-    system = System(filename)
-    system.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Run the system on a lecture.')
+    parser.add_argument('filename', nargs='?', default='lecture1')
+    parser.add_argument('--trace', default=None, help='write a trace of the stages (chrome://tracing JSON) to this file')
+    args = parser.parse_args()
+    if args.trace:
+        trace.enable()
+    system = System(args.filename)
+    system.run()
+    if args.trace:
+        trace.export_chrome(args.trace)
+        print(trace.format_summary())
\ No newline at end of file
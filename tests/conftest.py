@@ -0,0 +1,46 @@
+# The repository is a namespace package (no __init__.py) imported by the name
+# of its directory, so the tests import its modules through load().
+#
+# system/cache is not part of the tree: when it cannot be imported, an
+# in-memory Cache (a dict) is installed in its place, so that the modules
+# importing global_cache can be tested.
+
+import importlib, os, sys, types
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+sys.path.insert(0, os.path.dirname(ROOT))
+
+def load(module):
+    """Import a module of the package (e.g. 'system.aux.mydiff')."""
+    return importlib.import_module('%s.%s' % (PACKAGE, module))
+
+
+class Cache(dict):
+    """In-memory stand-in of system.cache.Cache.Cache."""
+
+
+def install_cache_stub():
+    name = '%s.system.cache' % PACKAGE
+    try:
+        importlib.import_module(name + '.Cache')
+    except ImportError:
+        package, module = types.ModuleType(name), types.ModuleType(name + '.Cache')
+        package.__path__ = []
+        module.Cache, module.global_cache = Cache, Cache()
+        package.Cache = module
+        sys.modules[name], sys.modules[name + '.Cache'] = package, module
+
+install_cache_stub()
+
+
+class WordLists:
+    """Empty common and key word lists (data/wordlists is not in the tree)."""
+    common_words, key_words = [], []
+
+
+@pytest.fixture
+def word_lists(monkeypatch):
+    """Build the AlignBasic instances with empty word lists."""
+    monkeypatch.setattr(load('system.subsystems.Align.AlignBasic'), 'WordLists', WordLists)
@@ -0,0 +1,97 @@
+import itertools
+import numpy as np
+import pytest
+from conftest import load
+
+AlignHMM = load('system.subsystems.Align.AlignHMM')
+synthetic = load('bench.synthetic')
+TStamp = load('system.elements.TStamp').TStamp
+
+TRANSITIONS = dict(stay=-0.1, next=-2.0, jump=-5.0)
+
+def path_score(path, emissions, obs, stay, next, jump):
+    score = emissions[path[0], obs[0]] + (0 if path[0] == 0 else jump)
+    for t in range(1, len(path)):
+        a, b = path[t - 1], path[t]
+        move = jump # any state can be reached by a jump
+        if b == a:
+            move = max(move, stay)
+        elif b == a + 1:
+            move = max(move, next)
+        score += move + emissions[b, obs[t]]
+    return score
+
+
+def seconds(interval):
+    return interval.start.to_sec(), interval.end.to_sec()
+
+
+def test_hand_built():
+    # three groups, each emitting mostly its own word
+    emissions = np.log(np.array([[0.8, 0.1, 0.1], [0.1, 0.8, 0.1], [0.1, 0.1, 0.8]]))
+    obs = np.array([0, 0, 1, 1, 1, 2, 2, 0, 0, 0])
+    path = AlignHMM.viterbi(emissions, obs, **TRANSITIONS)
+    assert path.tolist() == [0, 0, 1, 1, 1, 2, 2, 0, 0, 0]
+    # a jump back costs more than three unlikely words
+    path = AlignHMM.viterbi(emissions, obs[:8], stay=-0.1, next=-2.0, jump=-20.0)
+    assert path.tolist() == [0, 0, 1, 1, 1, 2, 2, 2]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    G, V, T = 3, 4, 6
+    emissions = np.log(rng.dirichlet(np.ones(V), size=G))
+    obs = rng.integers(0, V, size=T)
+    path = AlignHMM.viterbi(emissions, obs, **TRANSITIONS)
+    best = max(path_score(p, emissions, obs, **TRANSITIONS) for p in itertools.product(range(G), repeat=T))
+    assert path_score(path.tolist(), emissions, obs, **TRANSITIONS) == pytest.approx(best)
+
+
+def test_empty():
+    assert len(AlignHMM.viterbi(np.zeros((3, 2)), np.array([], dtype=np.int64), **TRANSITIONS)) == 0
+
+
+@pytest.mark.parametrize('params', [dict(alpha=0), dict(alpha=-1), dict(stay=0.5), dict(jump=-np.inf), dict(next=np.nan)])
+def test_invalid_params(params):
+    lecture = synthetic.SyntheticLecture(100)
+    align = AlignHMM.AlignHMM(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture))
+    with pytest.raises(ValueError):
+        align.set_params(**params)
+
+
+def test_compute_matches():
+    lecture = synthetic.SyntheticLecture(1000, seed=2)
+    align = AlignHMM.AlignHMM(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture))
+    align.cache = {}
+    align.set_params(alpha=1e-3)
+    matches = align.process()
+    assert np.isfinite(align.emissions()[0]).all()
+    assert len(matches) == len(lecture.groups)
+    assert [m.bbox_group for m in matches] == list(lecture.groups)
+    intervals = sorted((seconds(i) for m in matches for i in m.tinterval_group))
+    # the intervals tile the speech, from the first word to the end of the audio
+    assert intervals[0][0] == lecture.wstamps[0].tstamp.to_sec()
+    assert intervals[-1][1] == TStamp(lecture.audio_len).to_sec()
+    assert all(a[1] == b[0] for a, b in zip(intervals, intervals[1:]))
+    assert all(start < end for start, end in intervals)
+    # most of the speech is decoded on the group it reads
+    path = np.array(align.find_path())
+    truth = {j: i for i, j in lecture.pivots}
+    gid = [x.info.gid for x in align.ocr.result.words()]
+    right = [path[j] == gid[i] for j, i in truth.items()]
+    assert np.mean(right) > 0.9
+
+
+def test_compute_matches_revisits():
+    lecture = synthetic.SyntheticLecture(100)
+    align = AlignHMM.AlignHMM(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture))
+    align.ocr.process()
+    align.speech.process()
+    Y = lecture.wstamps
+    path = [0] * 5 + [1] * 5 + [0] * (len(Y) - 10)
+    matches = align.compute_matches(path)
+    sec = lambda k: Y[k].tstamp.to_sec()
+    assert [seconds(i) for i in matches[0].tinterval_group] == [(sec(0), sec(5)), (sec(10), TStamp(lecture.audio_len).to_sec())]
+    assert [seconds(i) for i in matches[1].tinterval_group] == [(sec(5), sec(10))]
+    assert all(len(m.tinterval_group) == 0 for m in matches[2:])
@@ -0,0 +1,89 @@
+import types
+import pytest
+from conftest import load
+
+AlignBasic = load('system.subsystems.Align.AlignBasic').AlignBasic
+AlignOnline = load('system.subsystems.Align.AlignOnline').AlignOnline
+synthetic = load('bench.synthetic')
+BBox = load('system.elements.BBox')
+Coords = load('system.elements.Coords').Coords
+WStamp = load('system.elements.WStamp')
+TStamp = load('system.elements.TStamp').TStamp
+
+def make(cls, lecture, **kwargs):
+    align = cls(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture), **kwargs)
+    align.cache = {}
+    align.ocr.process()
+    align.speech.process()
+    return align
+
+
+def key(pivots):
+    return [(x.info.gid, x.info.wid, y.tstamp.to_sec()) for x, y in pivots]
+
+
+def replayed(align, wstamps):
+    pivots = []
+    for status in align.replay(wstamps):
+        pivots.extend(status['committed'])
+    return pivots + align.finish()
+
+
+def distinct_lecture(n):
+    """Slides of distinct words, read in order with some words skipped and
+    some distinct fillers: the optimal alignment is unique."""
+    groups = BBox.BBoxGroups()
+    for g in range(n // 10):
+        text = ' '.join('w%d' % (10 * g + k) for k in range(10))
+        groups.append(BBox.BBoxGroup([BBox.BBox(Coords(100, 100 + 50 * (g % 5), 900, 140 + 50 * (g % 5)), text, g // 5 + 1)]))
+    spoken = []
+    for i in range(len(groups) * 10):
+        if i % 7 == 3:
+            spoken.append('filler%d' % i)
+        if i % 5 != 2:
+            spoken.append('w%d' % i)
+    wstamps = WStamp.WStamps([WStamp.WStamp(w, TStamp(0.4 * t)) for t, w in enumerate(spoken)])
+    return types.SimpleNamespace(name='distinct(%d)' % n, groups=groups, wstamps=wstamps,
+        pages={p: synthetic.PAGE for p in range(1, len(groups) // 5 + 2)}, audio_len=0.4 * len(spoken) + 2)
+
+
+def test_same_pivots_as_basic(word_lists):
+    lecture = distinct_lecture(300)
+    expected = key(make(AlignBasic, lecture).find_pivots())
+    online = make(AlignOnline, lecture, batch=7)
+    assert key(replayed(online, list(lecture.wstamps))) == expected
+    assert key(online.find_pivots()) == expected
+
+
+@pytest.mark.parametrize('n, seed', [(300, 0), (1000, 2)])
+def test_optimal_like_basic(word_lists, n, seed):
+    """With repeated words the ties may be broken differently, but the
+    online pivots are a monotone alignment as good as AlignBasic's."""
+    lecture = synthetic.SyntheticLecture(n, seed=seed)
+    basic = make(AlignBasic, lecture).find_pivots()
+    online = make(AlignOnline, lecture, beam=1e9, skip=0.0)
+    pivots = replayed(online, list(lecture.wstamps))
+    assert len(pivots) == len(basic)
+    assert all(x.word == y.word for x, y in pivots)
+    i, j = [k[:2] for k in key(pivots)], [k[2] for k in key(pivots)]
+    assert i == sorted(set(i)) and j == sorted(set(j))
+    assert key(make(AlignOnline, lecture, beam=1e9, skip=0.0).find_pivots()) == key(pivots)
+
+
+def test_recent_bounded_without_matches(word_lists):
+    lecture = synthetic.SyntheticLecture(500, seed=1)
+    online = make(AlignOnline, lecture)
+    online.reset_stream()
+    batch = 20
+    for k in range(200):
+        words = [WStamp.WStamp('unseen%d' % (k * batch + b), TStamp(0.4 * (k * batch + b))) for b in range(batch)]
+        status = online.feed(words)
+        assert status['committed'] == [] and len(online.stream['recent']) <= batch
+    assert online.stream['count'] == 200 * batch
+
+
+def test_recent_bounded_with_matches(word_lists):
+    lecture = synthetic.SyntheticLecture(2000, seed=3)
+    online = make(AlignOnline, lecture)
+    sizes = [len(online.stream['recent']) for status in online.replay(list(lecture.wstamps))]
+    assert max(sizes) < 100 < len(lecture.wstamps)
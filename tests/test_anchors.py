@@ -0,0 +1,46 @@
+import pytest
+from conftest import load
+
+AlignBasic = load('system.subsystems.Align.AlignBasic').AlignBasic
+synthetic = load('bench.synthetic')
+
+def pivots(lecture, mode, params={}, **kwargs):
+    align = AlignBasic(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture), mode=mode, **kwargs)
+    align.cache = {}
+    align.ocr.process()
+    align.speech.process()
+    align.set_params(**params)
+    return align.find_pivots()
+
+
+@pytest.mark.parametrize('n, seed, noise, params', [
+    (2000, 3, 0.1, {}), (2000, 0, 0.2, dict(gauss=2)), (5000, 1, 0.3, {})])
+def test_anchor_quality(word_lists, n, seed, noise, params):
+    """The forced anchors lose at most 0.5% of the pivots of the full DP."""
+    lecture = synthetic.SyntheticLecture(n, seed=seed, noise=noise)
+    full = len(pivots(lecture, 'full', params))
+    for anchor_count in (1, 3):
+        anchor = len(pivots(lecture, 'anchor', params, anchor_count=anchor_count))
+        assert full * 0.995 <= anchor <= full
+
+
+def test_anchor_count(word_lists):
+    lecture = synthetic.SyntheticLecture(500, seed=0)
+    align = AlignBasic(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture), mode='anchor')
+    assert align.anchor_count == 3 and 'anchor_count=3' in align.cache_key
+    other = AlignBasic(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture), mode='anchor', anchor_count=1)
+    assert other.cache_key != align.cache_key
+
+
+def test_find_anchors():
+    MyDiff = load('system.aux.mydiff').MyDiff
+    AnchorDiff = load('system.aux.anchors').AnchorDiff
+    X, Y = list('aqbrc'), list('qzqbrrrr')
+    diff = MyDiff(X, Y, lambda x, y: 1 if x == y else 0)
+    diff.prepare()
+    # b occurs once in Y, q twice, r four times; a and c do not occur
+    assert AnchorDiff(diff, max_count=1).find_anchors() == [(2, 3)]
+    assert [i for i, j in AnchorDiff(diff, max_count=2).find_anchors()] == [1, 2]
+    assert [i for i, j in AnchorDiff(diff, max_count=4).find_anchors()] == [1, 2, 3]
+    align = AnchorDiff(diff, max_count=4).solve()
+    assert sum(x == y for x, y in align) == 3
@@ -0,0 +1,117 @@
+import os
+import pytest
+from conftest import load
+
+batch = load('system.batch')
+registry = load('system.subsystems.registry')
+
+RUNS = None # file logging the stages run (shared with the worker processes)
+FAIL = set() # lectures whose speech stage fails
+
+def log(lecture, stage):
+    with open(RUNS, 'a') as f:
+        f.write('%s %s\n' % (lecture, stage))
+
+
+class FakeOCR:
+    def __init__(self, filename, scale='par', lang='eng'):
+        self.filename = filename
+        self.cache_key = 'FakeOCR(%s,%s)' % (filename, scale)
+        self.cache_key_obj = 'FakeOCR(%s)' % filename
+
+    def process(self):
+        if self.cache_key_obj not in self.cache:
+            log(self.filename, 'ocr')
+            self.cache[self.cache_key_obj] = 'slides of %s' % self.filename
+        return self.cache[self.cache_key_obj]
+
+
+class FakeSpeech:
+    def __init__(self, filename):
+        self.filename = filename
+        self.cache_key = 'FakeSpeech(%s)' % filename
+
+    def process(self):
+        if self.cache_key not in self.cache:
+            if self.filename in FAIL:
+                raise RuntimeError('no audio')
+            log(self.filename, 'speech')
+            self.cache[self.cache_key] = 'words of %s' % self.filename
+        return self.cache[self.cache_key]
+
+
+class FakeAlign:
+    def __init__(self, ocr, speech):
+        self.ocr, self.speech = ocr, speech
+        self.cache_key = 'FakeAlign(%s)' % ocr.filename
+
+    def process(self):
+        result = (self.ocr.process(), self.speech.process())
+        log(self.ocr.filename, 'align')
+        self.cache[self.cache_key] = result
+
+
+BACKENDS = dict(ocr='fake', speech='fake', align='fake')
+for kind, cls in (('ocr', 'FakeOCR'), ('speech', 'FakeSpeech'), ('align', 'FakeAlign')):
+    registry.register(kind, 'fake', __name__, cls)
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    global RUNS
+    RUNS = str(tmp_path / 'runs.log')
+    open(RUNS, 'w').close()
+    FAIL.clear()
+    cache = {}
+    monkeypatch.setattr(batch, 'global_cache', cache)
+    lectures = dict(a={'pdf', 'mp3'}, b={'pdf', 'mp3'}, c={'pdf'})
+    monkeypatch.setattr(batch, 'discover', lambda: lectures)
+    def make():
+        return batch.Batch(state_path=str(tmp_path / 'state.json'), limits=dict(ocr=2, align=1), backends=BACKENDS)
+    return make, cache
+
+
+def runs():
+    with open(RUNS) as f:
+        return sorted(line.split() for line in f)
+
+
+def test_run_all(env):
+    make, cache = env
+    assert make().run() == []
+    assert runs() == [['a', 'align'], ['a', 'ocr'], ['a', 'speech'], ['b', 'align'], ['b', 'ocr'], ['b', 'speech'], ['c', 'ocr']]
+    assert cache['FakeAlign(a)'] == ('slides of a', 'words of a')
+
+
+def test_resume_after_failure(env):
+    make, cache = env
+    FAIL.add('b')
+    first = make()
+    assert first.run() == [('b', 'speech'), ('b', 'align')]
+    assert first.state['b']['speech'].startswith('RuntimeError')
+    FAIL.clear()
+    open(RUNS, 'w').close()
+    second = make()
+    assert second.plan() == [('b', 'speech'), ('b', 'align')]
+    assert second.run() == []
+    assert runs() == [['b', 'align'], ['b', 'speech']]
+
+
+def test_evicted_result_runs_again(env):
+    make, cache = env
+    make().run()
+    del cache['FakeOCR(a)'], cache['FakeAlign(a)']
+    open(RUNS, 'w').close()
+    again = make()
+    assert again.plan() == [('a', 'ocr'), ('a', 'align')]
+    assert again.run() == []
+    assert runs() == [['a', 'align'], ['a', 'ocr']]
+
+
+def test_missing_dependency_is_recorded(env, monkeypatch):
+    make, cache = env
+    make().run()
+    del cache['FakeOCR(a)'], cache['FakeAlign(a)']
+    stale = make()
+    monkeypatch.setattr(stale, 'plan', lambda: [('a', 'align')]) # the state still says ocr is done
+    assert stale.run() == [('a', 'align')]
+    assert stale.state['a']['align'].startswith('KeyError')
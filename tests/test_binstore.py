@@ -0,0 +1,66 @@
+import json
+import pytest
+from conftest import load
+
+binstore = load('system.aux.binstore')
+BBoxGroups = load('system.elements.BBox').BBoxGroups
+Match_ = load('system.elements.Match')
+WStamps = load('system.elements.WStamp').WStamps
+
+def box(k, page):
+    # int and float coordinates, non-ascii and repeated texts
+    return dict(coords=dict(x0=k, y0=k + 0.5, x1=k + 10, y1=k + 20.25), text=['été', 'x', ''][k % 3], page=page)
+
+
+def tstamp(s):
+    return dict(min=s // 60, sec=s % 60, msec=10 * s % 1000)
+
+
+OBJS = dict(
+    Matches=[dict(bbox_group=[box(k, 1), box(k + 1, 2)][:k % 3],
+                  tinterval_group=[dict(start=tstamp(k), end=tstamp(k + 5))][:k % 2]) for k in range(7)],
+    BBoxGroups=[[box(k + i, 1 + k // 2) for i in range(k % 4)] for k in range(9)],
+    WStamps=[dict(word=['mot', 'wort', 'word'][k % 3], tstamp=tstamp(3 * k)) for k in range(11)],
+)
+ELEMENTS = dict(Matches=Match_.Matches, BBoxGroups=BBoxGroups, WStamps=WStamps)
+
+@pytest.mark.parametrize('kind', sorted(OBJS))
+@pytest.mark.parametrize('mmap', [False, True])
+def test_round_trip(kind, mmap, tmp_path):
+    elem = ELEMENTS[kind](OBJS[kind], from_obj=True)
+    path = str(tmp_path / 'elem.bin')
+    binstore.dump(elem, path)
+    assert binstore.is_binary_file(path)
+    restored = binstore.load(path, mmap=mmap)
+    assert type(restored) is type(elem)
+    assert restored.to_obj() == elem.to_obj()
+    assert binstore.read_obj(path, mmap=mmap) == OBJS[kind]
+
+
+@pytest.mark.parametrize('kind', sorted(OBJS))
+def test_empty(kind):
+    assert binstore.loads(binstore.dumps(kind, [])) == (kind, [])
+
+
+def test_lazy_matches(tmp_path):
+    path = str(tmp_path / 'label.bin')
+    binstore.dump(Match_.LazyMatches(OBJS['Matches']), path)
+    assert binstore.read_obj(path) == OBJS['Matches']
+
+
+@pytest.mark.parametrize('kind', sorted(OBJS))
+def test_json_conversion(kind, tmp_path):
+    src, dst, back = (str(tmp_path / name) for name in ('a.json', 'b.bin', 'c.json'))
+    with open(src, 'w') as f:
+        json.dump(OBJS[kind], f)
+    binstore.json_to_binary(src, dst, kind)
+    binstore.binary_to_json(dst, back)
+    assert not binstore.is_binary_file(src)
+    assert binstore.read_obj(src) == binstore.read_obj(dst) == binstore.read_obj(back) == OBJS[kind]
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        binstore.dumps('Labels', [])
+    with pytest.raises(TypeError):
+        binstore.dump([], 'unused.bin')
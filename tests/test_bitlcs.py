@@ -0,0 +1,49 @@
+import random
+import numpy as np
+import pytest
+from conftest import load
+
+BitLCSDiff = load('system.aux.bitlcs').BitLCSDiff
+
+def lcs(x, y):
+    return 0 if x is None or y is None else int(x == y)
+
+
+def lcs_lines(X, Y):
+    """Plain DP: line[k] = LCS length of X and Y[:k]."""
+    line = [0] * (len(Y) + 1)
+    for x in X:
+        new = [0]
+        for k, y in enumerate(Y):
+            new.append(max(line[k + 1], new[k], line[k] + (x == y)))
+        line = new
+    return line
+
+
+def random_words(rng, n, alphabet='abcde'):
+    return [rng.choice(alphabet) for _ in range(rng.randint(0, n))]
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_score_lines(seed):
+    rng = random.Random(seed)
+    X, Y = random_words(rng, 80), random_words(rng, 150)
+    diff = BitLCSDiff(X, Y, lcs)
+    diff.prepare()
+    x0, x1 = sorted(rng.randint(0, len(X)) for _ in range(2))
+    y0, y1 = sorted(rng.randint(0, len(Y)) for _ in range(2))
+    score = np.zeros(y1 - y0 + 1)
+    assert list(diff.NW_score(x0, x1, y0, y1, score)) == lcs_lines(X[x0:x1], Y[y0:y1])
+    score = np.zeros(y1 - y0 + 1)
+    reverse = lcs_lines(X[x0:x1][::-1], Y[y0:y1][::-1])
+    assert list(diff.NW_score(x0, x1, y0, y1, score, reverse=True)) == reverse
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_alignment_is_lcs(seed):
+    rng = random.Random(seed)
+    X, Y = random_words(rng, 100), random_words(rng, 100)
+    align = BitLCSDiff(X, Y, lcs, key=str.lower).solve()
+    assert [x for x, _ in align if x is not None] == X
+    assert [y for _, y in align if y is not None] == Y
+    assert sum(lcs(x, y) for x, y in align) == lcs_lines(X, Y)[-1]
@@ -0,0 +1,93 @@
+import random
+import numpy as np
+import pytest
+from conftest import load
+
+BoxIndex = load('system.aux.boxindex').BoxIndex
+BBox = load('system.elements.BBox')
+Match = load('system.elements.Match')
+TInterval = load('system.elements.TInterval')
+Coords = load('system.elements.Coords').Coords
+TStamp = load('system.elements.TStamp').TStamp
+
+def random_group(rng, first_page, size=100):
+    """A group of 1 to 3 boxes on pages from first_page on (in order)."""
+    boxes, page = [], first_page
+    for k in range(rng.randint(1, 3)):
+        page += rng.choice([0, 0, 1])
+        x0, y0 = rng.randint(0, size), rng.randint(0, size)
+        coords = Coords(x0, y0, x0 + rng.randint(0, size // 3), y0 + rng.randint(0, size // 3))
+        boxes.append(BBox.BBox(coords, 'w', page))
+    return BBox.BBoxGroup(boxes)
+
+
+def random_groups(rng, n):
+    """Groups mostly in page order, with some going back a page."""
+    groups, page = BBox.BBoxGroups(), 1
+    for g in range(n):
+        page = max(1, page + rng.choice([0, 0, 0, 1, -1]))
+        groups.append(random_group(rng, page))
+    return groups
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_query(seed):
+    rng = random.Random(seed)
+    groups = random_groups(rng, 30)
+    index = BoxIndex(groups)
+    boxes = [box for group in groups for box in group]
+    assert len(index) == len(boxes)
+    for k in range(50):
+        probe = random_group(rng, rng.randint(1, 8))[0]
+        ids, areas = index.query(probe.page, probe.coords.to_tuple())
+        found = {int(i): a for i, a in zip(ids, areas) if a > 0}
+        expected = {i: box & probe for i, box in enumerate(boxes) if box & probe > 0}
+        assert found == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_group_areas(seed):
+    rng = random.Random(seed)
+    groups = random_groups(rng, 30)
+    index = BoxIndex(groups)
+    for ref in random_groups(rng, 30):
+        assert index.group_areas(ref).tolist() == pytest.approx([float(ref & hyp) for hyp in groups])
+
+
+def old_matching(ref, hyp):
+    """The scan of find_matching_segments before the index."""
+    chosen = []
+    for match_ref in ref:
+        bg_ref = match_ref.bbox_group
+        max_gid, max_area = -1, 0
+        for gid_hyp, bg_hyp in enumerate(hyp.get_bbox_groups()):
+            rx, ry = bg_ref.page_range(), bg_hyp.page_range()
+            if ry[0] > rx[1]:
+                break
+            area = (bg_ref & bg_hyp)
+            if area > max_area:
+                max_gid, max_area = gid_hyp, area
+        chosen.append(max_gid)
+    return chosen
+
+
+def matches_of(groups):
+    matches = Match.Matches()
+    for k, group in enumerate(groups):
+        matches.append(Match.Match(group, TInterval.TIntervalGroup([TInterval.TInterval(TStamp(k), TStamp(k + 1))])))
+    return matches
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_matching_as_before(word_lists, seed):
+    synthetic = load('bench.synthetic')
+    AlignBasic = load('system.subsystems.Align.AlignBasic').AlignBasic
+    AlignEval = load('eval.code.align').AlignEval
+    lecture = synthetic.SyntheticLecture(100)
+    align = AlignBasic(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture))
+    align.result = lecture.label
+    evaluation = AlignEval(synthetic.SyntheticLabel(lecture), align, diagnostics=True)
+    rng = random.Random(seed)
+    evaluation.ref, evaluation.hyp = matches_of(random_groups(rng, 40)), matches_of(random_groups(rng, 40))
+    evaluation.find_matching_segments()
+    assert [d['hyp'] for d in evaluation.diagnostics] == old_matching(evaluation.ref, evaluation.hyp)
@@ -0,0 +1,68 @@
+import random
+import pytest
+from conftest import load
+
+editdist = load('system.aux.editdist')
+
+def dp_distance(a, b, wI=1, wD=1, wS=1):
+    """Plain DP over the full matrix."""
+    line = [wI * j for j in range(len(b) + 1)]
+    for i, x in enumerate(a, 1):
+        new = [wD * i]
+        for j, y in enumerate(b, 1):
+            new.append(min(line[j] + wD, new[j - 1] + wI, line[j - 1] + (0 if x == y else wS)))
+        line = new
+    return line[-1]
+
+
+def brute_force(a, b, wI, wD, wS):
+    """Set of the (cost, I, D, S) of every alignment of a to b."""
+    if not a or not b:
+        return {(wI * len(b) + wD * len(a), len(b), len(a), 0)}
+    out = set()
+    for c, I, D, S in brute_force(a[1:], b, wI, wD, wS):
+        out.add((c + wD, I, D + 1, S))
+    for c, I, D, S in brute_force(a, b[1:], wI, wD, wS):
+        out.add((c + wI, I + 1, D, S))
+    s = int(a[0] != b[0])
+    for c, I, D, S in brute_force(a[1:], b[1:], wI, wD, wS):
+        out.add((c + wS * s, I, D, S + s))
+    return out
+
+
+def random_tokens(rng, n, alphabet=4):
+    return [rng.randrange(alphabet) for _ in range(rng.randint(0, n))]
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_levenshtein(seed):
+    rng = random.Random(seed)
+    a, b = random_tokens(rng, 100), random_tokens(rng, 100)
+    assert editdist.levenshtein(a, b) == dp_distance(a, b)
+
+
+@pytest.mark.parametrize('weights', [(1, 1, 1), (1, 2, 3), (3, 1, 2), (2, 2, 1), (1, 1, 5)])
+def test_align_brute_force(weights):
+    rng = random.Random(sum(weights))
+    for _ in range(60):
+        a, b = random_tokens(rng, 6, 3), random_tokens(rng, 6, 3)
+        ops = editdist.align(a, b, *weights)
+        candidates = brute_force(a, b, *weights)
+        assert ops.cost == min(c for c, _, _, _ in candidates)
+        assert tuple(ops) in candidates
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_align_long(seed):
+    rng = random.Random(seed)
+    weights = rng.choice([(1, 1, 1), (1, 2, 3), (3, 1, 2), (2, 3, 1)])
+    a = random_tokens(rng, 200, 6)
+    b = [t for t in a if rng.random() > 0.1] + random_tokens(rng, 20, 6)
+    head = b[:len(b) // 4]
+    rng.shuffle(head)
+    b[:len(head)] = head
+    ops = editdist.align(a, b, *weights)
+    wI, wD, wS = weights
+    assert ops.cost == dp_distance(a, b, *weights)
+    assert ops.cost == wI * ops.I + wD * ops.D + wS * ops.S
+    assert len(a) - ops.D + ops.I == len(b)
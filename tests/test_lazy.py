@@ -0,0 +1,91 @@
+import pickle
+from conftest import load
+
+BBox_ = load('system.elements.BBox')
+Match_ = load('system.elements.Match')
+Coords = load('system.elements.Coords').Coords
+BBox, BBoxGroup, LazyBBoxGroup = BBox_.BBox, BBox_.BBoxGroup, BBox_.LazyBBoxGroup
+Match, LazyMatch, LazyMatches = Match_.Match, Match_.LazyMatch, Match_.LazyMatches
+
+def box_obj(k, page=1):
+    return dict(coords=dict(x0=10 * k + 5, y0=0, x1=10 * k, y1=8), text='word%d' % k, page=page)
+
+
+def match_obj(k):
+    return dict(bbox_group=[box_obj(k), box_obj(k + 1, page=2)],
+                tinterval_group=[dict(start=dict(min=0, sec=k, msec=0), end=dict(min=0, sec=k + 1, msec=0))])
+
+
+def built(lazy):
+    return sum(b for _, b in lazy.stored())
+
+
+def test_reads_without_building():
+    group = LazyBBoxGroup([box_obj(k) for k in range(4)])
+    assert group.pages() == [1] * 4
+    assert group.texts() == ['word%d' % k for k in range(4)]
+    assert group.rects()[1] == (1, (10, 0, 15, 8)) # as ordered by Coords
+    assert group.page_range() == (1, 1)
+    assert [w.word for w in group.words()] == ['word%d' % k for k in range(4)]
+    assert built(group) == 0
+    assert group[2].text == 'word2' and built(group) == 1
+    assert group.rects() == BBoxGroup([box_obj(k) for k in range(4)], from_obj=True).rects()
+
+
+def test_list_api_builds_elements():
+    group = LazyBBoxGroup([box_obj(k) for k in range(3)])
+    assert all(isinstance(x, BBox) for x in reversed(group))
+    assert group[1] in group and group.index(group[2]) == 2
+    assert all(isinstance(x, BBox) for x in group.copy() + group[:1])
+    assert isinstance(group.pop(), BBox)
+
+
+def test_mutations_stay_in_sync():
+    group = LazyBBoxGroup([box_obj(k) for k in range(3)])
+    extra = BBox(Coords(0, 0, 1, 1), 'extra', 1)
+    group.append(extra)
+    assert group[3] is extra and group[-1] is extra
+    group.insert(0, extra)
+    del group[1]
+    assert [x.text for x in group] == ['extra', 'word1', 'word2', 'extra']
+    group.sort(key=lambda x: x.text)
+    assert group[0].text == 'extra'
+
+
+def test_lazy_matches():
+    matches = LazyMatches([match_obj(k) for k in range(3)])
+    assert isinstance(matches[1], LazyMatch)
+    groups = matches.get_bbox_groups()
+    assert [g.page_range() for g in groups] == [(1, 2)] * 3
+    assert sum(built(g) for g in groups) == 0
+    assert matches.to_obj() == [match_obj(k) for k in range(3)]
+    restored = pickle.loads(pickle.dumps(matches))
+    assert restored.to_obj() == matches.to_obj()
+
+
+def test_lazy_match_type_check():
+    for obj in (dict(bbox_group=3, tinterval_group=[]), dict(bbox_group=[])):
+        try:
+            LazyMatch(obj)
+        except TypeError:
+            continue
+        assert False, obj
+    match = LazyMatch(match_obj(0))
+    try:
+        match.bbox_group = [1]
+    except TypeError:
+        return
+    assert False
+
+
+def test_ocr_eval_inputs_on_demand(word_lists):
+    synthetic = load('bench.synthetic')
+    OCREval = load('eval.code.ocr').OCREval
+    AlignBasic = load('system.subsystems.Align.AlignBasic').AlignBasic
+    lecture = synthetic.SyntheticLecture(200)
+    align = AlignBasic(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture))
+    align.result = lecture.label
+    evaluation = OCREval(synthetic.SyntheticLabel(lecture), align)
+    assert evaluation._ref is None # nothing built until used
+    assert evaluation.compute_recall_rate() == 1 # helpers load the inputs
+    assert evaluation.compute_text_WER()['all'] == 0
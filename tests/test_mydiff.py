@@ -0,0 +1,173 @@
+import random
+import sys
+import subprocess
+import numpy as np
+import pytest
+from conftest import load
+
+MyDiff = load('system.aux.mydiff').MyDiff
+
+def jwf(x, y):
+    """Weights which are not binary fractions (rounding errors in the sums)."""
+    if x is None or y is None:
+        return -0.3
+    return 1.7 if x == y else -0.9
+
+
+def total(align, f):
+    return sum(f(x, y) for x, y in align)
+
+
+def random_pair(rng, n, alphabet='abcd'):
+    X = [rng.choice(alphabet) for _ in range(rng.randint(0, n))]
+    Y = [rng.choice(alphabet) for _ in range(rng.randint(0, n))]
+    return X, Y
+
+
+def check_alignment(align, X, Y):
+    """The alignment uses every item of X and Y once, in order."""
+    assert [x for x, _ in align if x is not None] == X
+    assert [y for _, y in align if y is not None] == Y
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_budget_matches_hirschberg(seed):
+    rng = random.Random(seed)
+    X, Y = random_pair(rng, 60)
+    plain = MyDiff(X, Y, jwf, memory_budget=0).solve()
+    budget = MyDiff(X, Y, jwf, memory_budget=10**6).solve()
+    check_alignment(budget, X, Y)
+    assert total(budget, jwf) == pytest.approx(total(plain, jwf))
+
+
+def random_long_pair(rng):
+    X = [rng.choice('abcd') for _ in range(rng.randint(150, 250))]
+    Y = [rng.choice('abcd') for _ in range(rng.randint(150, 250))]
+    return X, Y
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_parallel_matches_serial(seed):
+    X, Y = random_long_pair(random.Random(seed))
+    serial = MyDiff(X, Y, jwf).solve()
+    parallel = MyDiff(X, Y, jwf, workers=2, parallel_threshold=500, wavefront=False).solve()
+    check_alignment(parallel, X, Y)
+    assert total(parallel, jwf) == pytest.approx(total(serial, jwf))
+
+
+def test_parallel_with_budget():
+    rng = random.Random(7)
+    X, Y = [rng.choice('abc') for _ in range(200)], [rng.choice('abc') for _ in range(180)]
+    serial = MyDiff(X, Y, jwf).solve()
+    parallel = MyDiff(X, Y, jwf, memory_budget=2000, workers=2, parallel_threshold=500, wavefront=False).solve()
+    check_alignment(parallel, X, Y)
+    assert total(parallel, jwf) == pytest.approx(total(serial, jwf))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_wavefront_matches_serial(seed):
+    """The tiled passes give bit-identical score lines, hence the same alignment."""
+    X, Y = random_long_pair(random.Random(seed))
+    serial = MyDiff(X, Y, jwf).solve()
+    wavefront = MyDiff(X, Y, jwf, workers=3, parallel_threshold=500, wavefront=True).solve()
+    assert wavefront == serial
+
+
+class RecursiveDiff:
+    """The recursive Hirschberg on list slices which MyDiff replaced."""
+    def __init__(self, X, Y, jwf):
+        self.X, self.Y, self.jwf = X, Y, jwf
+
+    def solve(self):
+        return self.Hirschberg(self.X, self.Y)
+
+    def Hirschberg(self, X, Y):
+        if len(X) == 0:
+            return [(None, y) for y in Y]
+        if len(Y) == 0:
+            return [(x, None) for x in X]
+        if len(X) == 1:
+            return self.NW_align_unity_X(X[0], Y)
+        if len(Y) == 1:
+            return [p[::-1] for p in self.NW_align_unity_X(Y[0], X)]
+        xmid = len(X) // 2
+        scoreL = self.NW_score(X[0:xmid], Y)
+        scoreR = self.NW_score(X[xmid:][::-1], Y[::-1])
+        ymid = (scoreL + np.flip(scoreR, 0)).argmax()
+        return self.Hirschberg(X[0:xmid], Y[0:ymid]) + self.Hirschberg(X[xmid:], Y[ymid:])
+
+    def NW_score(self, X, Y):
+        X, Y = [None] + X, [None] + Y
+        score = np.zeros(len(Y))
+        for j in range(1, len(Y)):
+            score[j] = score[j - 1] + self.jwf(None, Y[j])
+        for i in range(1, len(X)):
+            score_sub = score[0]
+            score[0] = score[0] + self.jwf(X[i], None)
+            for j in range(1, len(Y)):
+                scoreD = score[j] + self.jwf(X[i], None)
+                scoreI = score[j - 1] + self.jwf(None, Y[j])
+                scoreS = score_sub + self.jwf(X[i], Y[j])
+                score_sub = score[j]
+                score[j] = max(scoreD, scoreI, scoreS)
+        return score
+
+    def NW_align_unity_X(self, x, Y):
+        align = [(None, y) for y in Y]
+        gain_best, j_best = self.jwf(x, None), -1
+        for j, y in enumerate(Y):
+            gain = self.jwf(x, y) - self.jwf(None, y)
+            if gain > gain_best:
+                gain_best, j_best = gain, j
+        if j_best == -1:
+            return [(x, None)] + align
+        align[j_best] = (x, Y[j_best])
+        return align
+
+
+def jwf_int(x, y):
+    if x is None or y is None:
+        return -2
+    return 2 if x == y else -1
+
+
+@pytest.mark.parametrize('f', [jwf, jwf_int])
+@pytest.mark.parametrize('seed', range(30))
+def test_iterative_matches_recursive(seed, f):
+    X, Y = random_pair(random.Random(seed), 60)
+    assert MyDiff(X, Y, f).solve() == RecursiveDiff(X, Y, f).solve()
+
+
+def random_long_x(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice('abcd') for _ in range(n)], [rng.choice('abcd') for _ in range(40)]
+
+
+def solve_with_headroom(cls, X, Y, frames):
+    """Return the alignment, or None if it needs more than the given number
+    of nested frames."""
+    limit = sys.getrecursionlimit()
+    try:
+        sys.setrecursionlimit(frames)
+        return cls(X, Y, jwf_int).solve()
+    except RecursionError:
+        return None
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def test_iterative_needs_no_recursion():
+    """Run in a fresh interpreter, where the recursion limit can be set close
+    to the depth of the test itself."""
+    out = subprocess.run([sys.executable, __file__, '4000'], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ['True', 'True']
+
+
+if __name__ == '__main__':
+    # the headroom the iterative driver needs on a short input is enough on a
+    # long one, where the recursive driver (log2(N) nested calls) fails
+    X, Y = random_long_x(16)
+    frames = next(h for h in range(10, 200) if solve_with_headroom(MyDiff, X, Y, h) is not None)
+    X, Y = random_long_x(int(sys.argv[1]))
+    expected = RecursiveDiff(X, Y, jwf_int).solve()
+    print(solve_with_headroom(RecursiveDiff, X, Y, frames) is None, solve_with_headroom(MyDiff, X, Y, frames) == expected)
@@ -0,0 +1,50 @@
+import random
+import pytest
+from conftest import load
+
+mywer = load('eval.mywer')
+
+def loop_edit_dist(hyp, ref):
+    """The cell by cell loop getEditDist is a vectorised form of (with its
+    ties, and the S of j = 0 from the line two above)."""
+    E = mywer.EditDist
+    if not ref:
+        return E(I=len(hyp))
+    dp = [E(D=j + 1) for j in range(len(ref))]
+    prev = E()
+    for i in range(len(hyp)):
+        for j in range(len(ref)):
+            ansI = dp[j] + E(I=1)
+            ansD = (dp[j - 1] if j > 0 else (i + 1) * E(I=1)) + E(D=1)
+            ansS = prev + E(S=int(hyp[i] != ref[j]))
+            prev = dp[j]
+            dp[j] = min(ansI, ansD, ansS)
+    return dp[-1]
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_edit_dist_matches_loop(seed):
+    rng = random.Random(seed)
+    hyp = [rng.choice('abc') for _ in range(rng.randint(0, 25))]
+    ref = [rng.choice('abc') for _ in range(rng.randint(0, 25))]
+    res, expected = mywer.getEditDist(hyp, ref), loop_edit_dist(hyp, ref)
+    assert (res.I, res.D, res.S) == (expected.I, expected.D, expected.S)
+
+
+def test_corpus_wer_pools_counts():
+    pairs = [('what are you doing now', 'what you doing yesterday morning'), ('a b c', 'a b c d'), ('x', 'y')]
+    wers, total = mywer.getCorpusWER(pairs)
+    assert [w.WER for w in wers] == [mywer.getWER(h, r).WER for h, r in pairs]
+    edits = sum(mywer.getEditDist(mywer.str2list(h), mywer.str2list(r)).getSum() for h, r in pairs)
+    assert total.WER == pytest.approx(edits / 10)
+    parallel, total2 = mywer.getCorpusWER(pairs, workers=2)
+    assert [w.WER for w in parallel] == [w.WER for w in wers] and total2.WER == total.WER
+
+
+def test_empty_references():
+    wers, total = mywer.getCorpusWER([])
+    assert wers == [] and total.WER == 0
+    wers, total = mywer.getCorpusWER([('', ''), ('extra words', ''), ('a', 'a b')])
+    assert wers[0].WER == 0 and wers[1].WER == float('inf') and wers[1].IR == float('inf') and wers[1].DR == 0
+    assert total.WER == pytest.approx(3 / 2)
+    assert mywer.getWER('', '').WER == 0
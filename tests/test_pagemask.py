@@ -0,0 +1,80 @@
+import random
+import pytest
+from conftest import load
+
+pagemask = load('system.aux.pagemask')
+BBox = load('system.elements.BBox')
+Coords = load('system.elements.Coords').Coords
+
+PAGES = {1: (60, 80), 2: (45, 30), 3: (20, 20)}
+
+def random_groups(rng, n, pages=(1, 2, 3, 4)):
+    """BBoxGroups of overlapping boxes, some out of the page or on a page
+    without size (4)."""
+    groups = BBox.BBoxGroups()
+    for g in range(n):
+        boxes = []
+        for k in range(rng.randint(1, 3)):
+            x0, y0 = rng.randint(-5, 60), rng.randint(-5, 80)
+            coords = Coords(x0, y0, x0 + rng.randint(0, 25), y0 + rng.randint(0, 25))
+            boxes.append(BBox.BBox(coords, 'w%d' % k, rng.choice(pages)))
+        groups.append(BBox.BBoxGroup(boxes))
+    return groups
+
+
+def pixel_confusion(pages, ref, hyp):
+    """Reference: test every pixel against every box."""
+    def covered(groups, page, x, y):
+        return any(box.page == page and box.coords.x0 <= x < box.coords.x1 and box.coords.y0 <= y < box.coords.y1
+                   for group in groups for box in group)
+    counts = {}
+    for page, (width, height) in pages.items():
+        c = dict(TP=0, FP=0, FN=0, TN=0)
+        for y in range(height):
+            for x in range(width):
+                r, h = covered(ref, page, x, y), covered(hyp, page, x, y)
+                c['TP' if r and h else 'FN' if r else 'FP' if h else 'TN'] += 1
+        counts[page] = c
+    return counts
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_confusion_matches_pixel_loop(seed):
+    rng = random.Random(seed)
+    ref, hyp = random_groups(rng, 8), random_groups(rng, 8)
+    assert pagemask.PageMasks(PAGES).confusion(ref, hyp) == pixel_confusion(PAGES, ref, hyp)
+
+
+def test_downsampled_close():
+    rng = random.Random(9)
+    ref, hyp = random_groups(rng, 20, pages=(1,)), random_groups(rng, 20, pages=(1,))
+    pages = {1: (60, 80)}
+    exact = pagemask.PageMasks(pages).confusion(ref, hyp)[1]
+    coarse = pagemask.PageMasks(pages, step=2).confusion(ref, hyp)[1]
+    assert sum(coarse.values()) == sum(exact.values())
+    for k in exact:
+        assert abs(coarse[k] - exact[k]) <= 0.1 * 60 * 80
+
+
+def test_default_pages():
+    rng = random.Random(1)
+    groups = random_groups(rng, 10, pages=(2, 3))
+    assert pagemask.default_pages(groups, BBox.BBoxGroups()) == {p: pagemask.DEFAULT_PAGE for p in (1, 2, 3)}
+    assert pagemask.default_pages(BBox.BBoxGroups()) == {}
+
+
+def test_ocr_eval_rates(word_lists):
+    synthetic = load('bench.synthetic')
+    AlignBasic = load('system.subsystems.Align.AlignBasic').AlignBasic
+    OCREval = load('eval.code.ocr').OCREval
+    lecture = synthetic.SyntheticLecture(100)
+    align = AlignBasic(synthetic.SyntheticOCR(lecture), synthetic.SyntheticSpeech(lecture))
+    align.ocr.pages = PAGES
+    evaluation = OCREval(synthetic.SyntheticLabel(lecture), align)
+    rng = random.Random(4)
+    evaluation._ref, evaluation._hyp = random_groups(rng, 8), random_groups(rng, 8)
+    counts = pixel_confusion(PAGES, evaluation.ref, evaluation.hyp)
+    TP, FP, FN, TN = (sum(c[k] for c in counts.values()) for k in ('TP', 'FP', 'FN', 'TN'))
+    TPR, TNR, pages = evaluation.compute_TPR_and_TNR()
+    assert (TPR, TNR) == (TP / (TP + FN), TN / (TN + FP))
+    assert [p['page'] for p in pages] == [1, 2, 3]
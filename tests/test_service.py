@@ -0,0 +1,71 @@
+import queue
+import threading
+import pytest
+from conftest import load
+
+service = load('system.service')
+
+REQUEST = dict(kind='align', lecture='a', params=dict(gauss=2))
+
+def test_identical_requests_share_a_job():
+    s = service.Service(queue_size=4)
+    job = s.submit(REQUEST)
+    # same request with its defaults written out
+    full = dict(REQUEST, lang='eng', scale='par', mode='full', params=dict(gauss=2, common=None))
+    assert s.submit(full) is job
+    assert s.submit(dict(REQUEST, lecture='b')) is not job
+    assert s.queue.qsize() == 2
+
+
+def test_ignored_key_param():
+    s = service.Service(queue_size=4)
+    job = s.submit(REQUEST)
+    assert s.submit(dict(REQUEST, params=dict(gauss=2, key='x'))) is job
+    assert s.submit(dict(REQUEST, params=dict(gauss=2, key=None))) is job
+    assert 'key' not in job.request['params']
+
+
+def test_failed_job_is_resubmitted():
+    s = service.Service(queue_size=4)
+    job = s.submit(REQUEST)
+    job.finish(error='RuntimeError: boom')
+    again = s.submit(REQUEST)
+    assert again is not job and again.status == 'queued'
+
+
+def test_queue_full():
+    s = service.Service(queue_size=1)
+    s.submit(REQUEST)
+    assert s.submit(REQUEST) is not None # coalesced, does not take a slot
+    with pytest.raises(queue.Full):
+        s.submit(dict(REQUEST, lecture='b'))
+
+
+def test_running_job_is_shared():
+    s = service.Service(queue_size=4)
+    started, release, runs = threading.Event(), threading.Event(), []
+    def run(job):
+        runs.append(job.id)
+        started.set()
+        release.wait(5)
+        return ['done']
+    s.run = run
+    s.start()
+    job = s.submit(REQUEST)
+    assert started.wait(5)
+    assert job.status == 'running' and s.submit(REQUEST) is job
+    release.set()
+    events = []
+    while not job.is_over():
+        events += job.wait_events(len(events), timeout=5)
+    assert job.result == ['done'] and s.submit(REQUEST) is job
+    assert runs == [job.id]
+
+
+def test_invalid_request():
+    s = service.Service()
+    for request in (dict(REQUEST, kind='ocr'), dict(REQUEST, lecture=3),
+                    dict(REQUEST, params=dict(beam=2)), dict(REQUEST, mode='nope')):
+        with pytest.raises(ValueError):
+            s.submit(request)
+    assert s.queue.qsize() == 0
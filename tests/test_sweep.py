@@ -0,0 +1,33 @@
+import pytest
+from conftest import load
+
+sweep = load('eval.code.sweep')
+
+def test_parse_values():
+    assert sweep.parse_values('none,1,2.5,None, x ') == [None, 1, 2.5, None, 'x']
+    assert sweep.parse_values('4') == [4]
+
+
+def test_grid():
+    configs = sweep.Sweep(['a'], dict(gauss=[None, 1, 2], common=[None, 0.5])).configs()
+    assert len(configs) == 6
+    assert {(c['gauss'], c['common']) for c in configs} == {(g, c) for g in (None, 1, 2) for c in (None, 0.5)}
+    for c in configs: # every param, the others with their defaults
+        assert set(c) == set(sweep.OCR_PARAMS) | set(sweep.ALIGN_PARAMS)
+        assert c['scale'] == 'par' and c['fuzzy'] is None
+
+
+def test_samples():
+    space = dict(gauss=[None, 1, 2, 4], common=[None, 0.5], scale=['par', 'line'])
+    grid = sweep.Sweep(['a'], space).configs()
+    sampled = sweep.Sweep(['a'], space, samples=5, seed=1).configs()
+    assert len(sampled) == 5 and all(c in grid for c in sampled)
+    assert len({tuple(sorted(c.items(), key=str)) for c in sampled}) == 5
+    assert sweep.Sweep(['a'], space, samples=5, seed=1).configs() == sampled
+    assert sweep.Sweep(['a'], space, samples=100).configs() == grid
+
+
+@pytest.mark.parametrize('param', ['beam', 'key'])
+def test_unknown_param(param):
+    with pytest.raises(ValueError):
+        sweep.Sweep(['a'], {param: [None, 1]})
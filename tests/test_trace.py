@@ -0,0 +1,101 @@
+import json
+import random
+import time
+import pytest
+from conftest import load
+
+trace = load('system.aux.trace')
+MyDiff = load('system.aux.mydiff').MyDiff
+
+@pytest.fixture
+def tracing():
+    trace.enable()
+    yield trace
+    trace.disable()
+    trace.enable() # clear the recorded spans
+    trace.disable()
+
+
+@trace.traced()
+def stage(n):
+    with trace.span('inner', n=n):
+        time.sleep(0.002)
+    with trace.span('inner', n=n + 1):
+        time.sleep(0.001)
+    return n
+
+
+def test_nested_spans(tracing):
+    assert stage(3) == 3 and stage.__name__ == 'stage'
+    events = trace.events()
+    assert [e['name'] for e in events] == ['inner', 'inner', 'stage']
+    inner, outer = events[:2], events[2]
+    assert outer['depth'] == 0 and all(e['depth'] == 1 for e in inner)
+    assert [e['args'] for e in inner] == [dict(n=3), dict(n=4)]
+    for e in inner:
+        assert outer['start'] <= e['start'] and e['start'] + e['duration'] <= outer['start'] + outer['duration']
+    assert outer['self_time'] == pytest.approx(outer['duration'] - sum(e['duration'] for e in inner))
+    rows = {row['name']: row for row in trace.summary()}
+    assert rows['inner']['count'] == 2 and rows['stage']['count'] == 1
+    assert rows['inner']['total'] == pytest.approx(sum(e['duration'] for e in inner))
+    assert rows['inner']['mean'] == pytest.approx(rows['inner']['total'] / 2)
+    assert len(trace.format_summary().splitlines()) == 3
+
+
+def test_export_chrome(tracing, tmp_path):
+    stage(1)
+    path = str(tmp_path / 'trace.json')
+    trace.export_chrome(path)
+    with open(path) as f:
+        obj = json.load(f)
+    events = obj['traceEvents']
+    assert len(events) == 3 and obj['displayTimeUnit'] == 'ms'
+    for e in events:
+        assert e['ph'] == 'X' and isinstance(e['name'], str)
+        assert e['ts'] >= 0 and e['dur'] >= 0
+        assert isinstance(e['pid'], int) and isinstance(e['tid'], int)
+        assert all(isinstance(v, str) for v in e['args'].values())
+    outer = next(e for e in events if e['name'] == 'stage')
+    for e in events:
+        assert outer['ts'] <= e['ts'] and e['ts'] + e['dur'] <= outer['ts'] + outer['dur'] + 1e-3
+
+
+def test_traced_cache(tracing):
+    cache = trace.TracedCache({})
+    cache['a'] = 1
+    assert 'a' in cache and 'b' not in cache and cache['a'] == 1
+    assert cache.get('b', 2) == 2 # other methods pass through
+    assert [(e['name'], e['args']) for e in trace.events()] == [('cache.put', dict(key='a')), ('cache.get', dict(key='a'))]
+
+
+def test_mydiff_levels(tracing):
+    rng = random.Random(0)
+    X, Y = [rng.choice('abc') for _ in range(64)], [rng.choice('abc') for _ in range(64)]
+    MyDiff(X, Y, lambda x, y: 1 if x == y else 0).solve()
+    names = {e['name'] for e in trace.events()}
+    assert 'MyDiff.solve' in names and 'MyDiff.level0' in names and 'MyDiff.level5' in names
+
+
+def test_disabled_records_nothing():
+    assert not trace.enabled
+    before = len(trace.events())
+    assert trace.span('x', n=1) is trace.span('y')
+    stage(2)
+    cache = trace.TracedCache({})
+    cache['a'] = 1
+    assert cache['a'] == 1
+    rng = random.Random(0)
+    X, Y = [rng.choice('abc') for _ in range(64)], [rng.choice('abc') for _ in range(64)]
+    MyDiff(X, Y, lambda x, y: 1 if x == y else 0).solve()
+    assert len(trace.events()) == before
+
+
+def test_disabled_builds_no_span_args(monkeypatch):
+    """Hirschberg builds neither the span name nor its args when tracing is
+    off (see MyDiff.Hirschberg)."""
+    calls = []
+    monkeypatch.setattr(trace, 'span', lambda *args, **kwargs: calls.append(args) or trace._NULL)
+    rng = random.Random(0)
+    X, Y = [rng.choice('abc') for _ in range(64)], [rng.choice('abc') for _ in range(64)]
+    MyDiff(X, Y, lambda x, y: 1 if x == y else 0).solve()
+    assert calls == []